@@ -0,0 +1,39 @@
+"""
+Hot queries of the account services, built once as lambda statements (see ``hot_query``).
+"""
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.models.account import Account, Tenant, User
+from database import hot_query
+
+
+@hot_query("account_by_email")
+def account_by_email(email: str) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(Account).where(Account.email == email))
+
+
+@hot_query("account_by_id")
+def account_by_id(account_id) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(Account).where(Account.id == account_id))
+
+
+@hot_query("tenant_by_id")
+def tenant_by_id(tenant_id) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(Tenant).where(Tenant.id == tenant_id))
+
+
+@hot_query("users_by_account")
+def users_by_account(account_id) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.account_id == account_id))
+
+
+@hot_query("tenant_user_by_account")
+def tenant_user_by_account(tenant_id, account_id) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.tenant_id == tenant_id, User.account_id == account_id))
+
+
+@hot_query("tenant_user_by_id")
+def tenant_user_by_id(tenant_id, user_id) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.tenant_id == tenant_id, User.id == user_id))
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Request
-from fastapi_async_sqlalchemy import db
+from fastapi import APIRouter, Query, Request
 
-from app.schemas import ResponseModel
+from app.schemas import CursorPage, ResponseModel
+from database import db, read_only
 from utils.security import get_account_id_from_request
 
 from .schemas import (
@@ -21,6 +21,7 @@ account_router = APIRouter(prefix="/account", tags=["Account"])
 
 # Account management routes
 @account_router.get("/me", response_model=ResponseModel[AccountResponse])
+@read_only
 async def get_account_info(request: Request):
     tenant_id = request.state.tenant_id
     account = await AccountService.get_account_info(db.session, request)
@@ -41,12 +42,21 @@ async def get_account_info(request: Request):
 
 
 @account_router.get("/tenants", response_model=ResponseModel[list[TenantResponse]])
+@read_only
 async def get_account_tenants(request: Request):
     account_id = get_account_id_from_request(request)
     tenants = await AccountService.get_account_tenants(db.session, account_id)
     return ResponseModel(data=tenants)
 
 
+@account_router.get("/tenants/page", response_model=ResponseModel[CursorPage[TenantResponse]])
+@read_only
+async def get_account_tenants_page(request: Request, cursor: str | None = None, limit: int = Query(20, ge=1, le=100)):
+    account_id = get_account_id_from_request(request)
+    tenants = await AccountService.get_account_tenants_page(db.session, account_id, cursor=cursor, limit=limit)
+    return ResponseModel(data=tenants)
+
+
 # Tenant routes
 @account_router.post("/tenants", response_model=ResponseModel[TenantResponse])
 async def create_tenant(payload: TenantCreateRequest, request: Request):
@@ -72,6 +82,18 @@ async def delete_tenant(tenant_id: str, request: Request):
 
 
 # User management routes
+@account_router.get("/tenants/{tenant_id}/users", response_model=ResponseModel[CursorPage[UserResponse]])
+@read_only
+async def list_tenant_users(
+    tenant_id: str, request: Request, cursor: str | None = None, limit: int = Query(20, ge=1, le=100)
+):
+    account_id = get_account_id_from_request(request)
+    users = await TenantService.list_users(
+        session=db.session, tenant_id=tenant_id, account_id=account_id, cursor=cursor, limit=limit
+    )
+    return ResponseModel(data=users)
+
+
 @account_router.post("/tenants/{tenant_id}/users", response_model=ResponseModel[UserResponse])
 async def add_tenant_user(tenant_id: str, payload: UserAddRequest, request: Request):
     account_id = get_account_id_from_request(request)
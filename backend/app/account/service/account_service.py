@@ -5,7 +5,9 @@ from fastapi import Request, status
 from loguru import logger
 from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from app.account.queries import account_by_email, users_by_account
 from app.account.schemas import TenantResponse
 from app.auth.schemas import (
     ActivateAccountVerifyRequest,
@@ -29,11 +31,14 @@ from app.models.account import (
     TenantUserRole,
     User,
 )
-from database import RedisRateLimiter
+from app.schemas import CursorPage
+from database import RedisRateLimiter, cached_query, commit_or_flush
 from tasks.email_tasks import (
-    send_activate_account_email_task,
-    send_reset_password_verification_email_task,
-    send_signup_verification_email_task,
+    ACTIVATE_ACCOUNT_EMAIL_TEMPLATE,
+    RESET_PASSWORD_VERIFICATION_EMAIL_TEMPLATE,
+    SIGNUP_VERIFICATION_EMAIL_TEMPLATE,
+    deliver_template_email,
+    email_idempotency_key,
 )
 from utils.datatime import utcnow
 from utils.security import create_token_pair, get_account_id_from_request, invalidate_refresh_token
@@ -122,11 +127,11 @@ class AccountService:
             session.add(account)
 
         # Commit account creation
-        await session.commit()
+        await commit_or_flush(session)
         logger.info(f"Successfully created new account for: {payload.email}")
 
         # For normal signup, send verification email
-        token = await AccountService.send_sign_up_verification_email(account, request)
+        token = await AccountService.send_sign_up_verification_email(session, account, request)
         return token
 
     @staticmethod
@@ -146,8 +151,7 @@ class AccountService:
             )
 
         # Find account
-        result = await session.execute(Account.select().where(Account.email == email))
-        account: Account | None = result.scalars().one_or_none()
+        account = await Account.first(session, email=email)
 
         if not account:
             raise AccountErrorCode.EMAIL_NOT_REGISTERED.exception(
@@ -165,9 +169,10 @@ class AccountService:
         return await AccountService._handle_successful_auth(session, account, request)
 
     @staticmethod
-    async def send_sign_up_verification_email(account: Account, request: Request) -> str:
+    async def send_sign_up_verification_email(session: AsyncSession, account: Account, request: Request) -> str:
         """
         Send a signup verification email with a verification token.
+        :param session: Database session
         :param account: Account object
         :return: Verification token
         """
@@ -178,11 +183,16 @@ class AccountService:
 
         code = "".join([str(secrets.randbelow(10)) for _ in range(6)])
         token = await token_manager.generate_signup_email_verification_token(account.email, code)
-        send_signup_verification_email_task.delay(
+        await deliver_template_email(
+            session,
+            SIGNUP_VERIFICATION_EMAIL_TEMPLATE,
             language=request.state.language or "en",
             to=account.email,
             code=code,
+            idempotency_key=email_idempotency_key(AccountTokenType.SIGNUP_EMAIL.value, account.email, token),
+            token=token,
         )
+        await commit_or_flush(session)
         await AccountService.signup_email_verification_limit.record_attempt(account.email)
         return token
 
@@ -202,8 +212,7 @@ class AccountService:
         Returns:
             Account: Verified account object
         """
-        result = await session.execute(Account.select().where(Account.email == email))
-        account: Account | None = result.scalars().one_or_none()
+        account = await Account.first(session, email=email)
 
         if not account or (password and not account.verify_password(password)):
             raise AccountErrorCode.INVALID_EMAIL_PASSWORD.exception(status_code=status.HTTP_404_NOT_FOUND)
@@ -221,7 +230,7 @@ class AccountService:
         Handle successful authentication by updating account info and generating tokens.
         """
         # Check if user belongs to any tenant
-        result = await session.execute(select(User).where(User.account_id == account.id))
+        result = await session.execute(users_by_account(account.id))
         user_tenants = result.scalars().all()
 
         if not user_tenants:
@@ -283,13 +292,14 @@ class AccountService:
         for key, value in data.items():
             if hasattr(account, key):
                 setattr(account, key, value)
-        await session.commit()
+        await commit_or_flush(session)
         return account
 
     @staticmethod
-    async def send_activate_account_email(account: Account, request: Request) -> str:
+    async def send_activate_account_email(session: AsyncSession, account: Account, request: Request) -> str:
         """
         Send an account activation email with a verification code.
+        :param session: Database session
         :param account: Account object
         :return: Verification token
         """
@@ -300,11 +310,16 @@ class AccountService:
 
         code = "".join([str(secrets.randbelow(10)) for _ in range(6)])
         token = await token_manager.generate_activate_account_token(account.email, code)
-        send_activate_account_email_task.delay(
+        await deliver_template_email(
+            session,
+            ACTIVATE_ACCOUNT_EMAIL_TEMPLATE,
             language=request.state.language or account.language or "en",
             to=account.email,
             code=code,
+            idempotency_key=email_idempotency_key(AccountTokenType.ACTIVATE_ACCOUNT_EMAIL.value, account.email, token),
+            token=token,
         )
+        await commit_or_flush(session)
         await AccountService.activate_account_limit.record_attempt(account.email)
         return token
 
@@ -316,7 +331,7 @@ class AccountService:
         :param payload: SignupRequest schema with email and name
         :return: Verification token
         """
-        result = await session.execute(Account.select().where(Account.email == payload.email))
+        result = await session.execute(account_by_email(payload.email))
 
         account: Account | None = result.scalars().one_or_none()
         if not account:
@@ -327,7 +342,7 @@ class AccountService:
             raise AccountErrorCode.ACCOUNT_ALREADY_ACTIVE.exception(
                 data={"email": payload.email}, status_code=status.HTTP_400_BAD_REQUEST
             )
-        token = await AccountService.send_activate_account_email(account, request)
+        token = await AccountService.send_activate_account_email(session, account, request)
         return token
 
     # endregion
@@ -343,7 +358,7 @@ class AccountService:
             )
 
         # Find account
-        result = await session.execute(Account.select().where(Account.email == payload.email))
+        result = await session.execute(account_by_email(payload.email))
         account: Account | None = result.scalars().one_or_none()
 
         if not account:
@@ -356,11 +371,16 @@ class AccountService:
         token = await token_manager.generate_reset_password_token(account.email, code)
 
         # Send email
-        send_reset_password_verification_email_task.delay(
+        await deliver_template_email(
+            session,
+            RESET_PASSWORD_VERIFICATION_EMAIL_TEMPLATE,
             language=request.state.language or account.language or "en",
             to=account.email,
             code=code,
+            idempotency_key=email_idempotency_key(AccountTokenType.RESET_PASSWORD_EMAIL.value, account.email, token),
+            token=token,
         )
+        await commit_or_flush(session)
 
         await AccountService.reset_password_limit.record_attempt(account.email)
         return token
@@ -384,7 +404,7 @@ class AccountService:
             )
 
         # Find and update account
-        result = await session.execute(Account.select().where(Account.email == email))
+        result = await session.execute(account_by_email(email))
         account: Account | None = result.scalars().one_or_none()
 
         if not account:
@@ -418,8 +438,7 @@ class AccountService:
         :return: New verification token
         """
         # Find account
-        result = await session.execute(Account.select().where(Account.email == email))
-        account: Account | None = result.scalars().one_or_none()
+        account = await Account.get_cached(session, email=email)
 
         if not account:
             raise AccountErrorCode.EMAIL_NOT_REGISTERED.exception(
@@ -428,9 +447,9 @@ class AccountService:
 
         # Send verification code based on type
         if code_type == AccountTokenType.SIGNUP_EMAIL:
-            return await AccountService.send_sign_up_verification_email(account, request)
+            return await AccountService.send_sign_up_verification_email(session, account, request)
         elif code_type == AccountTokenType.ACTIVATE_ACCOUNT_EMAIL:
-            return await AccountService.send_activate_account_email(account, request)
+            return await AccountService.send_activate_account_email(session, account, request)
         elif code_type == AccountTokenType.RESET_PASSWORD_EMAIL:
             return await AccountService.send_reset_password_email(session, ForgotPasswordRequest(email=email), request)
 
@@ -453,8 +472,7 @@ class AccountService:
             )
 
         # Find account
-        result = await session.execute(Account.select().where(Account.email == email))
-        account: Account | None = result.scalars().one_or_none()
+        account = await Account.first(session, email=email)
 
         if not account:
             raise AccountErrorCode.EMAIL_NOT_REGISTERED.exception(
@@ -482,10 +500,10 @@ class AccountService:
         account_id = get_account_id_from_request(request)
         if not account_id:
             raise AccountErrorCode.ACCOUNT_NOT_FOUND.exception(status_code=status.HTTP_404_NOT_FOUND)
-        result = await session.execute(Account.select().where(Account.id == account_id))
-        return result.scalars().one_or_none()
+        return await Account.get_cached(session, id=account_id)
 
     @staticmethod
+    @cached_query()
     async def get_account_tenants(session: AsyncSession, account_id: str) -> list[TenantResponse]:
         """
         Get all tenants and user roles associated with an account.
@@ -497,6 +515,37 @@ class AccountService:
 
         return [TenantResponse(id=str(tenant_id), name=tenant_name) for tenant_id, tenant_name in result]
 
+    @staticmethod
+    @cached_query()
+    async def get_account_tenants_page(
+        session: AsyncSession, account_id: str, cursor: str | None = None, limit: int = 20
+    ) -> CursorPage[TenantResponse]:
+        """
+        Get a page of the tenants associated with an account, in the order they were joined.
+        :param session: Database session
+        :param account_id: Account ID
+        :param cursor: Cursor of the page; None for the first page
+        :param limit: Maximum number of tenants per page
+        :return: Page of tenant responses
+        """
+        try:
+            users, next_cursor = await User.paginate(
+                session,
+                User.account_id == account_id,
+                cursor=cursor,
+                limit=limit,
+                stmt=select(User).options(joinedload(User.tenant)),
+            )
+        except ValueError as e:
+            raise CommonErrorCode.INVALID_ARGUMENT.exception(
+                data={"cursor": cursor}, status_code=status.HTTP_400_BAD_REQUEST
+            ) from e
+
+        return CursorPage(
+            items=[TenantResponse(id=str(user.tenant.id), name=user.tenant.name) for user in users],
+            next_cursor=next_cursor,
+        )
+
     # TODO
     @staticmethod
     async def oauth_login(session: AsyncSession, payload: OAuthLoginRequest, request: Request) -> tuple[str, str, str]:
@@ -541,12 +590,7 @@ class AccountService:
                 account.last_login_ip = request.client.host
 
                 if invite:
-                    result = await session.execute(
-                        select(User).where(User.account_id == account.id, User.tenant_id == invite.tenant_id)
-                    )
-                    existing_user = result.scalars().one_or_none()
-
-                    if not existing_user:
+                    if not await User.exists(session, account_id=account.id, tenant_id=invite.tenant_id):
                         user = User(
                             account_id=account.id,
                             tenant_id=invite.tenant_id,
@@ -565,7 +609,7 @@ class AccountService:
 
             else:
                 logger.info(f"Creating new OAuth account for email: {payload.email}")
-                result = await session.execute(select(Account).where(Account.email == payload.email))
+                result = await session.execute(account_by_email(payload.email))
                 account = result.scalars().one_or_none()
 
                 if not account:
@@ -592,15 +636,22 @@ class AccountService:
                         invite.used_at = utcnow().replace(tzinfo=None)
                         session.add(invite)
 
-                oauth_provider = OAuthProvider(
-                    provider_name=payload.provider,
-                    provider_id=payload.provider_user_id,
-                    access_token=payload.access_token,
-                    refresh_token=payload.refresh_token,
-                    profile_data=payload.profile_data,
-                    account_id=account.id,
+                # a concurrent login may have linked the provider meanwhile, refresh its tokens then
+                await OAuthProvider.upsert(
+                    session,
+                    [
+                        {
+                            "provider_name": payload.provider,
+                            "provider_id": payload.provider_user_id,
+                            "access_token": payload.access_token,
+                            "refresh_token": payload.refresh_token,
+                            "profile_data": payload.profile_data,
+                            "account_id": account.id,
+                        }
+                    ],
+                    conflict_cols=["provider_name", "provider_id"],
+                    update_cols=["access_token", "refresh_token", "profile_data"],
                 )
-                await oauth_provider.save(session)
 
             tokens = await AccountService._handle_successful_auth(session, account, request)
             logger.info(f"Successfully completed OAuth login for email: {payload.email}")
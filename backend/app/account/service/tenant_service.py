@@ -3,13 +3,15 @@ from datetime import timedelta
 
 from fastapi import status
 from loguru import logger
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.account.queries import tenant_by_id, tenant_user_by_account, tenant_user_by_id
 from app.account.schemas import TenantResponse, UserResponse
 from app.errors.account import AccountErrorCode
 from app.errors.common import CommonErrorCode
 from app.models.account import Account, Tenant, TenantInvite, TenantInviteStatus, TenantUserRole, User
+from app.schemas import CursorPage
+from database import commit_or_flush
 from utils.datatime import utcnow
 
 
@@ -40,7 +42,7 @@ class TenantService:
     @staticmethod
     async def get_tenant(session: AsyncSession, tenant_id: str) -> Tenant:
         """Get tenant by ID."""
-        result = await session.execute(select(Tenant).where(Tenant.id == tenant_id))
+        result = await session.execute(tenant_by_id(tenant_id))
         tenant = result.scalars().one_or_none()
         if not tenant:
             raise AccountErrorCode.TENANT_NOT_FOUND.exception(
@@ -81,7 +83,7 @@ class TenantService:
         # Delete tenant (cascade will handle users)
         tenant = await TenantService.get_tenant(session, tenant_id)
         await session.delete(tenant)
-        await session.commit()
+        await commit_or_flush(session)
         
         logger.info(f"Successfully deleted tenant {tenant_id}")
 
@@ -91,7 +93,7 @@ class TenantService:
     @staticmethod
     async def get_user_role(session: AsyncSession, tenant_id: str, account_id: str) -> User:
         """Get user's role in tenant."""
-        result = await session.execute(select(User).where(User.tenant_id == tenant_id, User.account_id == account_id))
+        result = await session.execute(tenant_user_by_account(tenant_id, account_id))
         user = result.scalars().one_or_none()
         if not user:
             raise AccountErrorCode.USER_NOT_IN_TENANT.exception(
@@ -119,8 +121,7 @@ class TenantService:
 
         # Generate unique invite code
         code = secrets.token_urlsafe(16)
-        exists = await session.execute(select(TenantInvite).where(TenantInvite.code == code))
-        if not exists.scalars().one_or_none():
+        if not await TenantInvite.exists(session, code=code):
             invite = TenantInvite(
                 tenant_id=tenant_id,
                 code=code,
@@ -140,7 +141,7 @@ class TenantService:
         tenant_id: str,
         account_id: str,
     ) -> User:
-        result = await session.execute(select(User).where(User.tenant_id == tenant_id, User.account_id == account_id))
+        result = await session.execute(tenant_user_by_account(tenant_id, account_id))
         user = result.scalars().one_or_none()
         if not user:
             raise AccountErrorCode.USER_NOT_IN_TENANT.exception(
@@ -148,6 +149,31 @@ class TenantService:
             )
         return user
 
+    @staticmethod
+    async def list_users(
+        session: AsyncSession, tenant_id: str, account_id: str, cursor: str | None = None, limit: int = 20
+    ) -> CursorPage[UserResponse]:
+        """List a page of the tenant's users, in the order they joined."""
+        # Only members can list the users of a tenant
+        await TenantService.get_user_role(session, tenant_id, account_id)
+
+        try:
+            users, next_cursor = await User.paginate(session, User.tenant_id == tenant_id, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise CommonErrorCode.INVALID_ARGUMENT.exception(
+                data={"cursor": cursor}, status_code=status.HTTP_400_BAD_REQUEST
+            ) from e
+
+        return CursorPage(
+            items=[
+                UserResponse(
+                    id=str(user.id), account_id=str(user.account_id), tenant_id=str(user.tenant_id), role=user.role
+                )
+                for user in users
+            ],
+            next_cursor=next_cursor,
+        )
+
     @staticmethod
     async def add_user(
         session: AsyncSession,
@@ -171,8 +197,7 @@ class TenantService:
             raise CommonErrorCode.PERMISSION_DENIED.exception(status_code=status.HTTP_403_FORBIDDEN)
 
         # Find account by email
-        result = await session.execute(select(Account).where(Account.email == new_user_email))
-        account = result.scalars().one_or_none()
+        account = await Account.get_cached(session, email=new_user_email)
         if not account:
             logger.warning(f"Failed to add user - email not registered: {new_user_email}")
             raise AccountErrorCode.EMAIL_NOT_REGISTERED.exception(
@@ -180,8 +205,7 @@ class TenantService:
             )
 
         # Check if user already exists in tenant
-        result = await session.execute(select(User).where(User.tenant_id == tenant_id, User.account_id == account.id))
-        if result.scalars().one_or_none():
+        if await User.exists(session, tenant_id=tenant_id, account_id=account.id):
             logger.warning(f"Failed to add user - already in tenant: {new_user_email}")
             raise AccountErrorCode.USER_ALREADY_IN_TENANT.exception(
                 data={"email": new_user_email}, status_code=status.HTTP_400_BAD_REQUEST
@@ -213,7 +237,7 @@ class TenantService:
             raise CommonErrorCode.PERMISSION_DENIED.exception(status_code=status.HTTP_403_FORBIDDEN)
 
         # Get target user
-        result = await session.execute(select(User).where(User.tenant_id == tenant_id, User.id == target_user_id))
+        result = await session.execute(tenant_user_by_id(tenant_id, target_user_id))
         target_user = result.scalars().one_or_none()
         if not target_user:
             logger.warning(f"Failed to update role - user not found: {target_user_id}")
@@ -254,7 +278,7 @@ class TenantService:
             raise CommonErrorCode.PERMISSION_DENIED.exception(status_code=status.HTTP_403_FORBIDDEN)
 
         # Get target user
-        result = await session.execute(select(User).where(User.tenant_id == tenant_id, User.id == target_user_id))
+        result = await session.execute(tenant_user_by_id(tenant_id, target_user_id))
         target_user = result.scalars().one_or_none()
         if not target_user:
             logger.warning(f"Failed to remove user - not found in tenant: {target_user_id}")
@@ -269,17 +293,13 @@ class TenantService:
 
         # Cannot remove the last owner
         if target_user.role == TenantUserRole.OWNER:
-            result = await session.execute(
-                select(User).where(User.tenant_id == tenant_id, User.role == TenantUserRole.OWNER)
-            )
-            owners = result.scalars().all()
-            if len(owners) <= 1:
+            if await User.count(session, tenant_id=tenant_id, role=TenantUserRole.OWNER) <= 1:
                 logger.warning(f"Cannot remove last owner {target_user_id} from tenant {tenant_id}")
                 raise AccountErrorCode.CANNOT_REMOVE_LAST_OWNER.exception(status_code=status.HTTP_400_BAD_REQUEST)
 
         # Remove user
         await session.delete(target_user)
-        await session.commit()
+        await commit_or_flush(session)
         
         logger.info(f"Successfully removed user {target_user_id} from tenant {tenant_id}")
         # endregion
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Request, Response
-from fastapi_async_sqlalchemy import db
 from loguru import logger
 
 from app.account.service.account_service import AccountService
 from app.schemas import ResponseModel
+from database import db
 from utils.security import (
     delete_refresh_token_from_cookie,
     get_refresh_token_from_cookie,
@@ -1,15 +1,18 @@
+import secrets
 from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, status
 from fastapi.responses import ORJSONResponse
 
-from app.errors import register_exception_handlers
+from app.errors import CommonErrorCode, register_exception_handlers
 from app_manager import app_manager
 from configs import funiq_ai_config
-from database import shutdown_database
+from database import get_pool_metrics, shutdown_database
 from middleware import install_global_middlewares
 from services.celery import init_celery
-from services.email_service import init_email_service
+from services.email_service import email_service, init_email_service
+from services.outbox import init_outbox_relay, outbox_relay
 from utils.i18n import register_all_translation_domains
 from utils.loguru_handler import setup_loguru
 from utils.sentry_handler import setup_sentry
@@ -48,13 +51,19 @@ def create_app() -> FastAPI:
     # Initialize services
     init_email_service(app)  # Email service
     init_celery(app)        # Celery task queue
+    init_outbox_relay(app)  # Outbox relay publishing tasks to Celery
 
     return app
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await email_service.start()
+    await outbox_relay.start()
     yield
+    await outbox_relay.stop()
+    await email_service.stop()
+    email_service.close()
     await shutdown_database()
 
 
@@ -68,6 +77,16 @@ def register_routes(app: FastAPI):
     def health_check():
         return {"status": "healthy"}
 
+    @app.get("/health/pools", tags=["Health Check"])
+    def pool_metrics(authorization: Optional[str] = Header(None)):
+        # The auth middleware skips /health*, the pool metrics require their own token
+        token = funiq_ai_config.POOL_METRICS_TOKEN
+        if not token:
+            raise CommonErrorCode.NOT_FOUND.exception(status_code=status.HTTP_404_NOT_FOUND)
+        if not secrets.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+            raise CommonErrorCode.UNAUTHORIZED.exception(status_code=status.HTTP_401_UNAUTHORIZED)
+        return get_pool_metrics()
+
 
 app = create_app()
 celery = app.state.celery
@@ -1,7 +1,7 @@
 import enum
 from datetime import datetime, timezone
 
-from sqlalchemy import JSON, ForeignKey, String, UniqueConstraint
+from sqlalchemy import JSON, ForeignKey, Index, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import DBBase, DBUUIDIDModelMixin
@@ -43,6 +43,9 @@ class Account(DBBase, DBUUIDIDModelMixin):
     Account stores global authentication information.
     """
 
+    __entity_cache__ = ("email",)
+    __entity_cache_exclude__ = ("password_hash",)
+
     name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     password_hash: Mapped[str | None] = mapped_column(String(255))
@@ -103,7 +106,12 @@ class User(DBBase, DBUUIDIDModelMixin):
     tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="users")
     invite: Mapped["TenantInvite | None"] = relationship("TenantInvite", foreign_keys=[invite_code])
 
-    __table_args__ = (UniqueConstraint("account_id", "tenant_id", name="unique_user_key"),)
+    __table_args__ = (
+        UniqueConstraint("account_id", "tenant_id", name="unique_user_key"),
+        # keyset pagination of an account's tenants and of a tenant's users
+        Index("ix_users_account_id_created_at_id", "account_id", "created_at", "id"),
+        Index("ix_users_tenant_id_created_at_id", "tenant_id", "created_at", "id"),
+    )
 
     @property
     def is_owner(self) -> bool:
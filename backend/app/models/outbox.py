@@ -0,0 +1,35 @@
+import enum
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import DBBase, DBUUIDIDModelMixin
+
+# ---------- Enums ----------
+
+
+class OutboxMessageStatus(str, enum.Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+
+
+# ---------- Models ----------
+
+
+class OutboxMessage(DBBase, DBUUIDIDModelMixin):
+    """
+    OutboxMessage stores a Celery task written in the same transaction as the business data.
+    A relay publishes pending messages to the broker and deletes them once published.
+    Failed messages, which could not be published or whose task failed permanently, form the
+    dead-letter queue.
+    """
+
+    __table_args__ = (Index("ix_outbox_messages_status_available_at", "status", "available_at"),)
+
+    task_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)  # Keyword arguments of the task
+    status: Mapped[OutboxMessageStatus] = mapped_column(String(50), default=OutboxMessageStatus.PENDING)
+    attempts: Mapped[int] = mapped_column(default=0)
+    available_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    last_error: Mapped[str | None] = mapped_column(String(2048))
@@ -1,4 +1,4 @@
-from typing import Generic, TypeVar
+from typing import Generic, Optional, TypeVar
 
 from pydantic import BaseModel
 
@@ -9,3 +9,8 @@ class ResponseModel(BaseModel, Generic[T]):
     code: str = "0"
     msg: str = "success"
     data: T
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
@@ -1,14 +1,20 @@
 from typer import Typer
 
 from .alembic import cli as alembic_cli
+from .celery import cli as celery_cli
 from .i18n import cli as i18n_cli
+from .outbox import cli as outbox_cli
 from .scripts import cli as scripts_cli
+from .templates import cli as templates_cli
 
 cli = Typer()
 
 cli.add_typer(alembic_cli, name="alembic")
+cli.add_typer(celery_cli, name="celery")
 cli.add_typer(i18n_cli, name="i18n")
+cli.add_typer(outbox_cli, name="outbox")
 cli.add_typer(scripts_cli, name="scripts")
+cli.add_typer(templates_cli, name="templates")
 
 if __name__ == "__main__":
     cli()
\ No newline at end of file
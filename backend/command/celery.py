@@ -0,0 +1,32 @@
+from celery import Celery
+from typer import Typer
+
+from configs import funiq_ai_config
+from services.celery import get_queue_metrics
+from tasks.email_tasks import email_idempotency_keys
+
+cli = Typer()
+
+
+@cli.command()
+def queues():
+    """Show the depth and wait time of the mail queues."""
+    celery_app = Celery(broker=funiq_ai_config.CELERY_BROKER_URL)
+    metrics = get_queue_metrics(celery_app, [funiq_ai_config.MAIL_PRIORITY_QUEUE, funiq_ai_config.MAIL_BULK_QUEUE])
+    for queue, queue_metrics in metrics.items():
+        print(
+            f"{queue}: depth={queue_metrics['depth']} started={queue_metrics['started']} "
+            f"avg_wait={queue_metrics['avg_wait_seconds']:.3f}s last_wait={queue_metrics['last_wait_seconds']:.3f}s"
+        )
+
+
+@cli.command()
+def duplicates():
+    """Show the duplicate emails suppressed by the idempotency keys, per email type."""
+    counts = email_idempotency_keys.get_suppressed_counts()
+    if not counts:
+        print("No duplicate emails were suppressed.")
+        return
+
+    for scope, count in sorted(counts.items()):
+        print(f"{scope}: suppressed={count}")
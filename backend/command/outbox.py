@@ -0,0 +1,51 @@
+import asyncio
+import contextlib
+from typing import Annotated, Optional
+
+import typer
+from fastapi import FastAPI
+from typer import Typer
+
+import tasks.email_tasks  # noqa: F401  registers the tasks published by the relay
+from services.celery import create_celery_app
+from services.outbox import get_dead_letters, replay_dead_letters, run_outbox_relay
+
+cli = Typer()
+
+
+@cli.command("list")
+def list_dead_letters(limit: int = 50):
+    """List failed outbox messages (the dead-letter queue), most recent first."""
+    messages = get_dead_letters(limit)
+    if not messages:
+        print("The dead-letter queue is empty.")
+        return
+
+    for message in messages:
+        # messages dead-lettered before codes were kept out of the outbox may still hold one
+        payload = {key: "***" if key == "code" else value for key, value in message.payload.items()}
+        print(f"{message.id}  {message.updated_at:%Y-%m-%d %H:%M:%S}  {message.task_name}  attempts={message.attempts}")
+        print(f"    payload: {payload}")
+        print(f"    error:   {message.last_error}")
+
+
+@cli.command()
+def replay(
+    ids: Annotated[Optional[list[str]], typer.Argument(help="IDs of the messages to replay")] = None,
+    all_: Annotated[bool, typer.Option("--all", help="Replay every failed message")] = False,
+):
+    """Queue failed outbox messages for publishing again by the outbox relay."""
+    if not ids and not all_:
+        print("Pass the IDs of the messages to replay, or --all.")
+        raise typer.Exit(1)
+
+    replayed = replay_dead_letters(None if all_ else ids)
+    print(f"Queued {replayed} messages for replay.")
+
+
+@cli.command()
+def relay():
+    """Publish outbox messages to the broker, for deployments without the relay of the web process."""
+    print("Relaying outbox messages, press Ctrl+C to stop.")
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run_outbox_relay(create_celery_app(FastAPI(title="FuniqAI"))))
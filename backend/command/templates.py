@@ -0,0 +1,22 @@
+import time
+
+from typer import Typer
+
+from utils.i18n import register_all_translation_domains, translation_registry
+from utils.template_renderer import template_renderer
+
+cli = Typer()
+
+
+@cli.command()
+def compile():
+    """Precompile all templates for every supported locale into the bytecode cache."""
+    if not template_renderer.bytecode_cache_dir:
+        print("TEMPLATE_BYTECODE_CACHE_DIR is not set, nothing to precompile.")
+        return
+
+    register_all_translation_domains()
+    start_at = time.perf_counter()
+    compiled = template_renderer.precompile(sorted(translation_registry.supported_locales))
+    latency = time.perf_counter() - start_at
+    print(f"Compiled {compiled} templates into {template_renderer.bytecode_cache_dir} in {latency:.2f}s")
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -17,4 +17,40 @@ class CeleryConfig(BaseSettings):
     CELERY_RESULT_BACKEND: str = Field(
         ...,
         description="URL of the backend for storing task results. ",
-    )
\ No newline at end of file
+    )
+
+    CELERY_TASK_SERIALIZER: Literal["orjson", "json"] = Field("orjson", description="Serializer of task messages")
+    CELERY_RESULT_SERIALIZER: Literal["orjson", "json"] = Field(
+        "orjson", description="Serializer of stored task results"
+    )
+    CELERY_TASK_IGNORE_RESULT: bool = Field(
+        True, description="Skip storing task results unless a task opts in with ignore_result=False"
+    )
+    CELERY_TASK_ACKS_LATE: bool = Field(
+        True, description="Acknowledge messages after the task ran, so tasks of a lost worker are redelivered"
+    )
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = Field(
+        4, description="Messages reserved per worker process; short I/O-bound tasks benefit from a few"
+    )
+    CELERY_BROKER_POOL_LIMIT: int = Field(10, description="Maximum broker connections pooled per process")
+    CELERY_WORKER_POOL: Literal["prefork", "threads", "solo"] = Field(
+        "threads", description="Execution pool of the worker; threads suit I/O-bound queues such as mail"
+    )
+    CELERY_WORKER_CONCURRENCY: int = Field(
+        32, description="Concurrent tasks per worker; threads for the threads pool, processes for prefork"
+    )
+
+    OUTBOX_RELAY_ENABLED: bool = Field(
+        True,
+        description="Run the outbox relay publishing queued tasks in the web process; otherwise run 'cli outbox relay'",
+    )
+    OUTBOX_RELAY_BATCH_SIZE: int = Field(100, description="Maximum outbox messages published per relay batch")
+    OUTBOX_RELAY_POLL_INTERVAL: float = Field(
+        1.0, description="Seconds the outbox relay waits for new messages between polls"
+    )
+    OUTBOX_RELAY_MAX_ATTEMPTS: int = Field(
+        10, description="Publish attempts before an outbox message is marked as failed"
+    )
+    OUTBOX_RELAY_RETRY_BACKOFF: float = Field(
+        2.0, description="Base delay in seconds of the exponential backoff between publish attempts"
+    )
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -16,6 +18,45 @@ class DatabaseConfig(BaseSettings):
     SYNC_DATABASE_POOL_SIZE: int = Field(5, description="Database connection pool size")
     ASYNC_DATABASE_URL: str = Field(..., description="Asynchronous database URL")
     ASYNC_DATABASE_POOL_SIZE: int = Field(5, description="Async database connection pool size")
+    DATABASE_REPLICA_URLS: list[str] = Field(
+        [], description="Asynchronous URLs of read replicas; reads of read-only sessions are routed to them"
+    )
+    DATABASE_REPLICA_EJECT_SECONDS: float = Field(30, description="Seconds a failing replica is skipped for")
+    DATABASE_REPLICA_STICKY_SECONDS: float = Field(
+        5, description="Seconds the reads of a session stick to the primary after it committed a write"
+    )
+    DATABASE_REPLICA_READS_OUTSIDE_WRITES: bool = Field(
+        False, description="Also route the reads of unmarked sessions to replicas until their first write"
+    )
+    DATABASE_BULK_LOAD_CHUNK_SIZE: int = Field(10000, description="Rows sent per chunk by DBBase.bulk_load")
+    DATABASE_UNIT_OF_WORK: bool = Field(
+        True,
+        description="Commit the request session once when the request succeeds, instead of in every model helper",
+    )
+    DATABASE_READ_ONLY_SAFE_METHODS: bool = Field(
+        True, description="Run the session of GET and HEAD requests in read-only transactions that are rolled back"
+    )
+    DATABASE_QUERY_CACHE_SIZE: int = Field(
+        500, description="Compiled SQL statements cached per engine, shared by all the query shapes of the app"
+    )
+    DATABASE_PREPARED_STATEMENT_CACHE_SIZE: int = Field(
+        500, description="Prepared statements cached per asyncpg connection"
+    )
+    DATABASE_PGBOUNCER_TRANSACTION_MODE: bool = Field(
+        False, description="Connect through PgBouncer in transaction mode: disable the prepared statement caches"
+    )
+    DATABASE_PRE_PING_IDLE_SECONDS: float = Field(
+        30, description="Pooled connections idle for longer are pinged on checkout, 0 to ping on every checkout"
+    )
+    POOL_CHECKOUT_WAIT_WARNING_MS: float = Field(
+        100, description="Database and Redis pool checkouts waiting longer are logged as warnings"
+    )
+    POOL_METRICS_LOG_INTERVAL: float = Field(
+        60, description="Seconds between the logged snapshots of the connection pools, 0 to disable"
+    )
+    POOL_METRICS_TOKEN: Optional[str] = Field(
+        None, description="Bearer token required by GET /health/pools, which is disabled when unset"
+    )
 
 
 class RedisConfig(BaseSettings):
@@ -24,4 +65,12 @@ class RedisConfig(BaseSettings):
     """
 
     REDIS_URL: str = Field(..., description="Redis server URL")
-    REDIS_MAX_CONNECTIONS: int = Field(5, description="Maximum Redis connections")
\ No newline at end of file
+    REDIS_MAX_CONNECTIONS: int = Field(5, description="Maximum Redis connections")
+    ENTITY_CACHE_ENABLED: bool = Field(True, description="Cache the models opting in with __entity_cache__")
+    ENTITY_CACHE_TTL: int = Field(300, description="Seconds an entity cache entry lives in Redis")
+    ENTITY_CACHE_LOCAL_SIZE: int = Field(1024, description="Entity cache entries kept in process, 0 to disable")
+    ENTITY_CACHE_LOCAL_TTL: float = Field(
+        5, description="Seconds an entity cache entry lives in process, where other processes cannot invalidate it"
+    )
+    QUERY_CACHE_ENABLED: bool = Field(True, description="Cache the results of the cached_query service methods")
+    QUERY_CACHE_TTL: int = Field(60, description="Seconds a query cache entry lives in Redis")
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -15,4 +17,44 @@ class MailConfig(BaseSettings):
     SMTP_USE_TLS: bool = Field(True, description="Enable TLS for SMTP")
     SMTP_OPPORTUNISTIC_TLS: bool = Field(
         False, description="Enable opportunistic TLS for SMTP"
-    )
\ No newline at end of file
+    )
+    SMTP_POOL_SIZE: int = Field(
+        4, description="Maximum pooled SMTP connections per process, 0 opens a connection per message"
+    )
+    SMTP_POOL_IDLE_TIMEOUT: float = Field(60, description="Seconds before an idle pooled SMTP connection is closed")
+    SMTP_POOL_KEEPALIVE_INTERVAL: float = Field(
+        10, description="Seconds of idleness after which a pooled SMTP connection is checked with NOOP"
+    )
+    MAIL_DELIVERY_BACKEND: Literal["celery", "async"] = Field(
+        "celery",
+        description="Deliver emails through Celery tasks or in-process with asyncio SMTP (the async-mail extra)",
+    )
+    MAIL_ASYNC_CONCURRENCY: int = Field(4, description="Maximum concurrent deliveries of the async mail backend")
+    MAIL_ASYNC_QUEUE_SIZE: int = Field(
+        1000, description="Maximum queued emails of the async mail backend before senders are slowed down"
+    )
+    MAIL_PRIORITY_QUEUE: str = Field(
+        "mail_priority", description="Celery queue of latency-critical emails such as verification codes"
+    )
+    MAIL_BULK_QUEUE: str = Field("mail", description="Celery queue of all other emails")
+    MAIL_SEND_RATE_LIMITS: dict[str, float] = Field(
+        {},
+        description="Messages per second allowed across all workers per sender domain, '*' matches any domain",
+    )
+    TEMPLATE_CACHE_SIZE: int = Field(128, description="Maximum number of compiled (locale, template) pairs in memory")
+    TEMPLATE_BYTECODE_CACHE_DIR: Optional[str] = Field(
+        "cache/templates", description="Directory of the shared Jinja2 bytecode cache, disabled if empty"
+    )
+    MAIL_TASK_MAX_RETRIES: int = Field(
+        5, description="Retries of an email task after a transient SMTP error before it is dead-lettered"
+    )
+    MAIL_TASK_RETRY_BACKOFF: int = Field(
+        2, description="Base delay in seconds of the exponential backoff between email task retries"
+    )
+    MAIL_TASK_RETRY_BACKOFF_MAX: int = Field(600, description="Maximum delay in seconds between email task retries")
+    EMAIL_IDEMPOTENCY_TTL: int = Field(
+        3600, description="Seconds an email idempotency key suppresses duplicate sends of the same email"
+    )
+    EMAIL_IDEMPOTENCY_LEASE: int = Field(
+        300, description="Seconds a send in progress holds its idempotency key before a redelivery may claim it"
+    )
@@ -2,20 +2,37 @@ import importlib
 import pkgutil
 
 from .core import (
+    IdempotencyKeyBusyError,
+    RedisIdempotencyKeys,
     RedisRateLimiter,
+    RedisTokenBucket,
+    RequestSessionFactory,
     SessionFactory,
     engine,
     get_session,
     init_database,
     provide_session,
     redis,
+    replica_engines,
     shutdown_database,
     sync_engine,
     sync_redis,
     transactional_session,
     update_database_schema,
 )
-from .models import DBBase, DBIntIDModelMixin, DBModelMixin, DBUUIDIDModelMixin
+from .hot_queries import hot_queries, hot_query
+from .models import (
+    UNIT_OF_WORK_SESSION_KEY,
+    DBBase,
+    DBIntIDModelMixin,
+    DBModelMixin,
+    DBUUIDIDModelMixin,
+    commit_or_flush,
+)
+from .pool_metrics import get_pool_metrics
+from .query_cache import QueryCache, cached_query
+from .request_session import RequestSessionMiddleware, db
+from .routing import READ_ONLY_SESSION_KEY, RoutingSession, mark_read_only, read_only
 
 
 def load_models(package_name: str) -> None:
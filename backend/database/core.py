@@ -1,26 +1,57 @@
 import contextlib
 import functools
+import hashlib
 import logging
 import time
+import uuid
 from inspect import signature
-from typing import Any, AsyncGenerator, Callable
+from typing import Any, AsyncGenerator, Callable, Optional
 
 from redis import Redis as SyncRedis
-from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from configs import funiq_ai_config
 from utils.json import json_dumps, json_loads
 
-from .models import DBBase
+from .entity_cache import EntityCache
+from .models import UNIT_OF_WORK_SESSION_KEY, DBBase
+from .pool_metrics import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedBlockingConnectionPool,
+    InstrumentedQueuePool,
+    instrument_engine,
+)
+from .pre_ping import install_idle_pre_ping
+from .query_cache import QueryCache
+from .routing import ReplicaSet, RoutingSession
+
+
+def asyncpg_connect_args() -> dict:
+    """
+    Connect arguments of the asyncpg engines, sizing their prepared statement caches.
+
+    Behind PgBouncer in transaction mode, consecutive transactions may run on different server
+    connections, so statements are neither cached nor reused and get unique names.
+    """
+    if funiq_ai_config.DATABASE_PGBOUNCER_TRANSACTION_MODE:
+        return {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": funiq_ai_config.DATABASE_PREPARED_STATEMENT_CACHE_SIZE}
+
 
 # Database engine and session factory
 sync_engine = create_engine(
     url=funiq_ai_config.SYNC_DATABASE_URL,
     echo=funiq_ai_config.DATABASE_ECHO,
     pool_size=funiq_ai_config.SYNC_DATABASE_POOL_SIZE,
-    pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool,
+    query_cache_size=funiq_ai_config.DATABASE_QUERY_CACHE_SIZE,
     json_serializer=json_dumps,
     json_deserializer=json_loads,
 )
@@ -29,23 +60,60 @@ engine: AsyncEngine = create_async_engine(
     url=funiq_ai_config.ASYNC_DATABASE_URL,
     echo=funiq_ai_config.DATABASE_ECHO,
     pool_size=funiq_ai_config.ASYNC_DATABASE_POOL_SIZE,
-    pool_pre_ping=True,
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    query_cache_size=funiq_ai_config.DATABASE_QUERY_CACHE_SIZE,
+    connect_args=asyncpg_connect_args(),
     json_serializer=json_dumps,
     json_deserializer=json_loads,
 )
 
+replica_engines: list[AsyncEngine] = [
+    create_async_engine(
+        url=url,
+        echo=funiq_ai_config.DATABASE_ECHO,
+        pool_size=funiq_ai_config.ASYNC_DATABASE_POOL_SIZE,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        query_cache_size=funiq_ai_config.DATABASE_QUERY_CACHE_SIZE,
+        connect_args=asyncpg_connect_args(),
+        json_serializer=json_dumps,
+        json_deserializer=json_loads,
+    )
+    for url in funiq_ai_config.DATABASE_REPLICA_URLS
+]
+
+instrument_engine(sync_engine, "database_sync")
+instrument_engine(engine.sync_engine, "database")
+for i, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine.sync_engine, f"database_replica_{i}")
+for pooled_engine in [sync_engine, engine.sync_engine, *(replica.sync_engine for replica in replica_engines)]:
+    install_idle_pre_ping(pooled_engine, funiq_ai_config.DATABASE_PRE_PING_IDLE_SECONDS)
+
+RoutingSession.replicas = ReplicaSet(replica_engines, eject_seconds=funiq_ai_config.DATABASE_REPLICA_EJECT_SECONDS)
+RoutingSession.sticky_seconds = funiq_ai_config.DATABASE_REPLICA_STICKY_SECONDS
+RoutingSession.reads_outside_writes = funiq_ai_config.DATABASE_REPLICA_READS_OUTSIDE_WRITES
+
 SessionFactory = async_sessionmaker(
     bind=engine,
     autoflush=False,
     expire_on_commit=False,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
+)
+
+# Sessions of the requests (db.session)
+RequestSessionFactory = async_sessionmaker(
+    bind=engine,
+    expire_on_commit=False,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
 )
 
 # Redis clients
 redis: Redis = Redis(
-    connection_pool=BlockingConnectionPool.from_url(
+    connection_pool=InstrumentedBlockingConnectionPool.from_url(
         url=funiq_ai_config.REDIS_URL,
         max_connections=funiq_ai_config.REDIS_MAX_CONNECTIONS,
+        metrics_name="redis",
     )
 )
 
@@ -54,6 +122,18 @@ sync_redis: SyncRedis = SyncRedis.from_url(
     max_connections=funiq_ai_config.REDIS_MAX_CONNECTIONS,
 )
 
+if funiq_ai_config.ENTITY_CACHE_ENABLED:
+    DBBase.entity_cache = EntityCache(
+        redis,
+        sync_redis,
+        ttl=funiq_ai_config.ENTITY_CACHE_TTL,
+        local_size=funiq_ai_config.ENTITY_CACHE_LOCAL_SIZE,
+        local_ttl=funiq_ai_config.ENTITY_CACHE_LOCAL_TTL,
+    )
+
+if funiq_ai_config.QUERY_CACHE_ENABLED:
+    QueryCache.current = QueryCache(redis, sync_redis, ttl=funiq_ai_config.QUERY_CACHE_TTL)
+
 
 async def init_database():
     """
@@ -79,6 +159,8 @@ async def shutdown_database():
         await redis.close()
         sync_redis.close()
         await engine.dispose()
+        for replica_engine in replica_engines:
+            await replica_engine.dispose()
     except Exception as e:
         print(f"Error during shutdown: {e}")
 
@@ -96,8 +178,12 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 async def transactional_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Provide a database session within a transactional scope.
+
+    The session runs as a unit of work: model helpers only flush, and the transaction is
+    committed once when the block exits.
     """
     async with SessionFactory() as session:
+        session.info[UNIT_OF_WORK_SESSION_KEY] = True
         try:
             yield session
             await session.commit()
@@ -236,3 +322,181 @@ class RedisRateLimiter:
         key = self.generate_key(identifier)
         await redis.delete(key)
         self.logger.info(f"Rate limit reset for identifier: {identifier}")
+
+
+class IdempotencyKeyBusyError(Exception):
+    """Raised when another process holds the in-progress lease of an idempotency key."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Idempotency key '{key}' is in progress, retry after {retry_after:.2f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class RedisIdempotencyKeys:
+    """
+    Redis-backed idempotency keys shared by all processes, used to perform a side effect
+    (e.g., sending an email) at most once per key within a time window.
+
+    A key is claimed with a short in-progress lease, and marked done only once the operation
+    succeeded. A process that dies in between leaves the lease to expire, after which a
+    redelivered operation can claim the key again instead of being suppressed as a duplicate.
+    The claim sets a missing key or inspects an existing one in a single Lua script, so a lease
+    expiring meanwhile cannot be mistaken for a completed operation.
+    """
+
+    PENDING = b"pending"
+    DONE = b"done"
+
+    # Returns 1 if the key was claimed, 0 if it is done, otherwise the seconds left on its lease
+    CLAIM_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value then
+  redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+  return 1
+end
+if value == ARGV[2] then
+  return 0
+end
+return -math.max(redis.call('TTL', KEYS[1]), 1)
+"""
+
+    def __init__(self, prefix: str = "redis_idempotency", ttl: int = 3600, lease: int = 300):
+        """
+        Initialize the idempotency keys.
+
+        :param prefix: Redis key prefix.
+        :param ttl: Seconds a completed key suppresses duplicates.
+        :param lease: Seconds a claimed key stays in progress before another process may claim it.
+        """
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lease = lease
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._claim_script = sync_redis.register_script(self.CLAIM_SCRIPT)
+
+    def generate_key(self, *parts: str) -> str:
+        """
+        Derive an idempotency key from the parts identifying an operation.
+
+        :param parts: Values identifying the operation (e.g., token type, email, token).
+        :return: Idempotency key, without secrets in clear text.
+        """
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def _get_redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def claim(self, key: str, scope: str = "default") -> bool:
+        """
+        Atomically claim a key, with an in-progress lease, before performing the operation it identifies.
+
+        :param key: Idempotency key.
+        :param scope: Name the suppressed duplicate is counted under (e.g., task name).
+        :return: True if the key was claimed, False if the operation is a duplicate.
+        :raises IdempotencyKeyBusyError: If another process is performing the operation.
+        """
+        claimed = int(self._claim_script(keys=[self._get_redis_key(key)], args=[self.PENDING, self.DONE, self.lease]))
+        if claimed == 1:
+            return True
+        if claimed < 0:
+            raise IdempotencyKeyBusyError(key, -claimed)
+
+        sync_redis.hincrby(f"{self.prefix}:suppressed", scope, 1)
+        self.logger.info(f"Suppressed duplicate operation for scope: {scope}")
+        return False
+
+    def complete(self, key: str):
+        """
+        Mark a claimed key done once the operation succeeded, suppressing duplicates for the TTL.
+
+        A failure is logged only: the operation was performed, and the lease expiring lets at
+        worst one duplicate through.
+
+        :param key: Idempotency key.
+        """
+        try:
+            sync_redis.set(self._get_redis_key(key), self.DONE, ex=self.ttl)
+        except RedisError as e:
+            self.logger.warning(f"Failed to complete idempotency key, its lease expires in {self.lease}s: {e!s}")
+
+    def release(self, key: str):
+        """
+        Release a claimed key so that a failed operation can be retried.
+
+        :param key: Idempotency key.
+        """
+        sync_redis.delete(self._get_redis_key(key))
+
+    def get_suppressed_counts(self) -> dict[str, int]:
+        """
+        Get the number of suppressed duplicates per scope.
+
+        :return: Mapping of scope to suppressed duplicates.
+        """
+        counts = sync_redis.hgetall(f"{self.prefix}:suppressed")
+        return {(scope.decode() if isinstance(scope, bytes) else scope): int(count) for scope, count in counts.items()}
+
+
+class RedisTokenBucket:
+    """
+    A Redis-based token bucket shared by all processes, used to shape the rate of an
+    operation by key (e.g., sends per sender domain).
+
+    The bucket is refilled and drawn from in a single Lua script using the Redis server
+    clock, so concurrent workers on different hosts see a consistent rate.
+    """
+
+    SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= requested then
+  tokens = tokens - requested
+else
+  wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+    def __init__(self, prefix: str = "redis_token_bucket", rate: float = 1, capacity: Optional[float] = None):
+        """
+        Initialize the token bucket.
+
+        :param prefix: Redis key prefix.
+        :param rate: Tokens added per second.
+        :param capacity: Maximum tokens in the bucket (burst size), defaults to one second of tokens.
+        """
+        self.prefix = prefix
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._script = sync_redis.register_script(self.SCRIPT)
+
+    def generate_key(self, identifier: str) -> str:
+        """
+        Generate a unique Redis key for a given identifier (e.g., sender domain).
+
+        :param identifier: Unique identifier of the bucket.
+        :return: Redis key.
+        """
+        return f"{self.prefix}:{identifier}"
+
+    def try_acquire(self, identifier: str, tokens: float = 1) -> float:
+        """
+        Take tokens from the bucket if enough are available.
+
+        :param identifier: Unique identifier of the bucket.
+        :param tokens: Number of tokens to take, at most ``capacity``.
+        :return: 0 if the tokens were taken, otherwise the seconds until they will be available.
+        """
+        wait = self._script(keys=[self.generate_key(identifier)], args=[self.rate, self.capacity, tokens])
+        return float(wait)
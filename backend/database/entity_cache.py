@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Optional, Type, TypeVar
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapper, Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from utils.json import json_dumps, json_loads
+
+from .models import DBBase
+from .routing import reads_from_replica
+
+T = TypeVar("T", bound=DBBase)
+
+# Session.info set of the entity cache keys written by the transaction, deleted once it commits
+_INVALIDATIONS_SESSION_KEY = "entity_cache_invalidations"
+
+
+def _restore_value(python_type: Optional[type], value: Any) -> Any:
+    if value is None or python_type is None:
+        return value
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def _python_type(column) -> Optional[type]:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+class _ModelCodec:
+    """
+    Compact form of a cached model: the JSON list of its column values, in mapper order, without
+    the columns of ``__entity_cache_exclude__``.
+    """
+
+    def __init__(self, model: Type[DBBase]):
+        mapper: Mapper = sa_inspect(model)
+        self.model = model
+        self.mapper = mapper
+        self.attrs = [
+            (attr.key, _python_type(attr.columns[0]))
+            for attr in mapper.column_attrs
+            if attr.key not in model.__entity_cache_exclude__
+        ]
+        self.pk_keys = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+        self.unique_keys = tuple(model.__entity_cache__ or ())
+        # a schema change starts new keys instead of reading entries of the old layout
+        signature = hashlib.sha256(",".join(key for key, _ in self.attrs).encode()).hexdigest()[:8]
+        self.prefix = f"entity:{model.__tablename__}:{signature}"
+
+    def key(self, attr: str, value: Any) -> str:
+        return f"{self.prefix}:{attr}={value}"
+
+    def keys_of(self, obj: DBBase, include_previous: bool = False) -> set[str]:
+        """Keys of an instance, and with include_previous of its values before the flush."""
+        state = sa_inspect(obj)
+        keys = set()
+        for attr in [*self.pk_keys, *self.unique_keys]:
+            history = state.attrs[attr].history
+            values = [*history.unchanged, *history.added]
+            if include_previous:
+                values += history.deleted
+            keys.update(self.key(attr, value) for value in values if value is not None)
+        return keys
+
+    def dumps(self, obj: DBBase) -> str:
+        return json_dumps([getattr(obj, key) for key, _ in self.attrs])
+
+    def loads(self, payload: str | bytes) -> DBBase:
+        obj = self.mapper.class_manager.new_instance()
+        for (key, python_type), value in zip(self.attrs, json_loads(payload)):
+            set_committed_value(obj, key, _restore_value(python_type, value))
+        make_transient_to_detached(obj)
+        return obj
+
+
+class EntityCache:
+    """
+    Cache-aside cache of model instances by primary key and declared unique columns, in
+    Redis with a small in-process LRU in front.
+
+    A model opts in with ``__entity_cache__``, the names of its unique columns also used as
+    keys (an empty tuple for the primary key only), and is read with ``Model.get_cached``.
+    Columns listed in ``__entity_cache_exclude__`` are not cached and stay unloaded on a hit,
+    so credentials are read with ``Model.first``.
+    Updates and deletes through the ORM invalidate the entries once the session commits;
+    bulk helpers (``update_by``, ``bulk_update_by_pk``, ``delete_by``, ``upsert``) bypass the
+    ORM and leave the entries to expire. Entries of the in-process LRU are not invalidated by
+    the commits of other processes, so they live for ``local_ttl`` seconds only.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        sync_redis: SyncRedis,
+        ttl: int = 300,
+        local_size: int = 1024,
+        local_ttl: float = 5,
+    ):
+        """
+        Initialize the entity cache.
+
+        :param redis: Redis client reading and filling the cache.
+        :param sync_redis: Redis client deleting invalidated entries after a commit outside of
+            an event loop.
+        :param ttl: Seconds an entry lives in Redis.
+        :param local_size: Entries kept in the in-process LRU, 0 to disable it.
+        :param local_ttl: Seconds an entry lives in the in-process LRU.
+        """
+        self.redis = redis
+        self.sync_redis = sync_redis
+        self.ttl = ttl
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self._local: OrderedDict[str, tuple[float, str | bytes]] = OrderedDict()
+        self._codecs: dict[type, _ModelCodec] = {}
+        # deletes scheduled after commits on the event loop, referenced until they are done
+        self._pending: set[asyncio.Task] = set()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def codec(self, model: Type[DBBase]) -> _ModelCodec:
+        codec = self._codecs.get(model)
+        if codec is None:
+            codec = self._codecs[model] = _ModelCodec(model)
+        return codec
+
+    async def get(self, session: AsyncSession, model: Type[T], **kwargs) -> Optional[T]:
+        """
+        Get an instance by its primary key or a declared unique column, from the cache or the
+        database. A cached instance is merged into the session without a query.
+
+        :param session: Database session.
+        :param model: Model that opted in with ``__entity_cache__``.
+        :param kwargs: A single primary key or declared unique column and its value.
+        :return: Instance attached to the session, or None if there is no such row.
+        """
+        codec = self.codec(model)
+        ((attr, value),) = kwargs.items()
+        if attr not in codec.pk_keys and attr not in codec.unique_keys:
+            raise ValueError(f"{model.__name__}.{attr} is not an entity cache key")
+
+        key = codec.key(attr, value)
+        payload = self._get_local(key)
+        if payload is None:
+            payload = await self._get_redis(key)
+            if payload is not None:
+                self._set_local(key, payload)
+        if payload is not None:
+            return await self._attach(session, codec, payload)
+
+        obj = await model.first(session, **kwargs)
+        if obj is not None and self._may_fill(session, codec, obj):
+            await self._fill(codec, obj)
+        return obj
+
+    @staticmethod
+    def _may_fill(session: AsyncSession, codec: _ModelCodec, obj: DBBase) -> bool:
+        # neither a row written by the uncommitted transaction, nor one a lagging replica read
+        if reads_from_replica(session):
+            return False
+        return codec.keys_of(obj).isdisjoint(session.info.get(_INVALIDATIONS_SESSION_KEY, ()))
+
+    async def _attach(self, session: AsyncSession, codec: _ModelCodec, payload: str | bytes) -> DBBase:
+        obj = codec.loads(payload)
+        # the session already holds the row, possibly with unflushed changes
+        existing = session.identity_map.get(sa_inspect(obj).key)
+        if existing is not None:
+            return existing
+        return await session.merge(obj, load=False)
+
+    async def _fill(self, codec: _ModelCodec, obj: DBBase):
+        payload = codec.dumps(obj)
+        keys = codec.keys_of(obj)
+        for key in keys:
+            self._set_local(key, payload)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(key, payload, ex=self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Entity cache fill failed: {e!s}")
+
+    async def _get_redis(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.redis.get(key)
+        except RedisError as e:
+            self.logger.warning(f"Entity cache read failed: {e!s}")
+            return None
+
+    def _get_local(self, key: str) -> Optional[str | bytes]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return payload
+
+    def _set_local(self, key: str, payload: str | bytes):
+        if not self.local_size:
+            return
+        self._local[key] = (time.monotonic() + self.local_ttl, payload)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    def invalidate(self, keys: set[str]):
+        """
+        Delete entries from the in-process LRU and from Redis. On an event loop the Redis delete
+        runs in a task, so the commit does not block the loop on a round trip.
+
+        :param keys: Entity cache keys.
+        """
+        for key in keys:
+            self._local.pop(key, None)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                self.sync_redis.delete(*keys)
+            except RedisError as e:
+                self._invalidation_failed(e)
+            return
+        task = loop.create_task(self._delete(keys))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _delete(self, keys: set[str]):
+        try:
+            await self.redis.delete(*keys)
+        except RedisError as e:
+            self._invalidation_failed(e)
+
+    def _invalidation_failed(self, e: RedisError):
+        self.logger.warning(f"Entity cache invalidation failed, entries expire in {self.ttl}s: {e!s}")
+
+
+@event.listens_for(DBBase, "after_insert", propagate=True)
+@event.listens_for(DBBase, "after_update", propagate=True)
+@event.listens_for(DBBase, "after_delete", propagate=True)
+def _collect_invalidations(mapper: Mapper, connection, target: DBBase):
+    entity_cache = DBBase.entity_cache
+    if entity_cache is None or mapper.class_.__entity_cache__ is None:
+        return
+    session = sa_inspect(target).session
+    keys = entity_cache.codec(mapper.class_).keys_of(target, include_previous=True)
+    session.info.setdefault(_INVALIDATIONS_SESSION_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    keys = session.info.pop(_INVALIDATIONS_SESSION_KEY, None)
+    if keys and DBBase.entity_cache is not None:
+        DBBase.entity_cache.invalidate(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session):
+    session.info.pop(_INVALIDATIONS_SESSION_KEY, None)
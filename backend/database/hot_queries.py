@@ -0,0 +1,29 @@
+from typing import Callable
+
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+# Builders of the registered hot queries by name
+hot_queries: dict[str, Callable[..., StatementLambdaElement]] = {}
+
+
+def hot_query(name: str):
+    """
+    Decorator: register a builder of a frequently executed query under a name.
+
+    The builder returns a ``lambda_stmt``: the statement is constructed and its cache key
+    computed once, later calls only extract the new parameter values from the lambda
+    closure, and the compiled form is reused from the engine's compiled cache.
+
+    Closure variables must only be parameter values; anything that changes the SQL (a
+    column, an optional criterion) must be a separate query.
+
+    :param name: Unique name of the query.
+    """
+
+    def decorator(fn: Callable[..., StatementLambdaElement]) -> Callable[..., StatementLambdaElement]:
+        if name in hot_queries:
+            raise ValueError(f"Hot query {name!r} is already registered")
+        hot_queries[name] = fn
+        return fn
+
+    return decorator
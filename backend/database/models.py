@@ -1,22 +1,53 @@
-
+import base64
+import binascii
+import os
+import time
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Generic, Type, TypeVar, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Generic,
+    Iterable,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import inflect
 import stringcase
-from sqlalchemy import Integer, delete, func, insert, update
+from sqlalchemy import Integer, Row, column, delete, func, insert, literal, text, tuple_, update, values
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
 from sqlalchemy.sql import Select
 from sqlalchemy_utils import generic_repr
 
+from configs import funiq_ai_config
+from utils.json import json_dumps, json_loads
+
+if TYPE_CHECKING:
+    from .entity_cache import EntityCache
+
 # Type variable for the generic DBBase
 T = TypeVar("T", bound="DBBase")
 ID = TypeVar("ID", bound=Union[int, uuid.UUID])
 
+# PostgreSQL accepts at most this many bind parameters per statement
+POSTGRES_MAX_PARAMETERS = 32767
+
+# Session.info flag: the session is committed once by its owner, helpers only flush
+UNIT_OF_WORK_SESSION_KEY = "unit_of_work"
+
 
 def resolve_table_name(name: str) -> str:
     p = inflect.engine()
@@ -26,6 +57,88 @@ def resolve_table_name(name: str) -> str:
     return "_".join(parts)
 
 
+async def commit_or_flush(session: AsyncSession) -> None:
+    """
+    Commit the session, or only flush it when it runs as a unit of work.
+
+    A unit-of-work session is committed once by whoever opened it (the request middleware or
+    ``transactional_session``), so pending changes are flushed to get generated values and
+    constraint errors early, without ending the transaction.
+    """
+    if session.info.get(UNIT_OF_WORK_SESSION_KEY):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def iter_chunks(
+    rows: Union[Iterable[dict[str, Any]], AsyncIterable[dict[str, Any]]], chunk_size: int
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Group rows from a sync or async iterable into lists of at most ``chunk_size`` rows.
+
+    :param rows: Iterable or async iterable of rows.
+    :param chunk_size: Maximum number of rows per chunk.
+    :return: Async iterator of row chunks.
+    """
+    chunk = []
+    if isinstance(rows, AsyncIterable):
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    else:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUID version 7 (RFC 9562).
+
+    The 48 most significant bits hold the Unix time in milliseconds and the rest is random,
+    so new keys land at the right edge of the primary key index instead of a random page.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version
+    value = value & ~(0x3 << 62) | 0x2 << 62  # variant
+    return uuid.UUID(int=value)
+
+
+def encode_cursor(obj: "DBBase") -> str:
+    """
+    Build the opaque pagination cursor pointing after a record.
+
+    :param obj: Last record of a page, with ``created_at`` and ``id`` attributes.
+    :return: URL-safe cursor string.
+    """
+    payload = json_dumps([obj.created_at.isoformat(), str(obj.id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, id_type: type) -> tuple[datetime, Any]:
+    """
+    Decode a pagination cursor built by ``encode_cursor``.
+
+    :param cursor: Cursor string.
+    :param id_type: Python type of the model's primary key.
+    :return: The ``created_at`` and ``id`` of the record the cursor points after.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, ident = json_loads(payload)
+        return datetime.fromisoformat(created_at), id_type(ident)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+
+
 @generic_repr
 class DBBase(AsyncAttrs, DeclarativeBase):
     """
@@ -37,6 +150,13 @@ class DBBase(AsyncAttrs, DeclarativeBase):
         """Automatically generate table names based on class names."""
         return resolve_table_name(self.__name__)
 
+    # Opt-in to the entity cache: unique columns also used as cache keys, besides the primary key
+    __entity_cache__: ClassVar[Optional[tuple[str, ...]]] = None
+    # Columns never written to the entity cache, such as secrets; they are unloaded on a hit
+    __entity_cache_exclude__: ClassVar[tuple[str, ...]] = ()
+    # Entity cache shared by the models, set up by database.core
+    entity_cache: ClassVar[Optional["EntityCache"]] = None
+
     @classmethod
     async def get(cls: Type[T], session: AsyncSession, ident: Any, **kwargs) -> Union[T, None]:
         """Retrieve a record by its primary key."""
@@ -49,10 +169,83 @@ class DBBase(AsyncAttrs, DeclarativeBase):
         return result.scalars().all()
 
     @classmethod
-    async def exists(cls: Type[T], session: AsyncSession, **kwargs) -> bool:
-        """Check if any record exists matching the given conditions."""
-        result = await session.execute(select(func.count()).filter_by(**kwargs))
-        return result.scalar() > 0
+    async def exists(cls: Type[T], session: AsyncSession, *criteria: Any, **kwargs) -> bool:
+        """Check if any record exists matching the given conditions, with ``SELECT EXISTS``."""
+        subquery = select(literal(1)).select_from(cls).where(*criteria).filter_by(**kwargs).limit(1)
+        result = await session.execute(select(subquery.exists()))
+        return result.scalar_one()
+
+    @classmethod
+    async def count(cls: Type[T], session: AsyncSession, *criteria: Any, **kwargs) -> int:
+        """Count the records matching the given conditions."""
+        result = await session.execute(select(func.count()).select_from(cls).where(*criteria).filter_by(**kwargs))
+        return result.scalar_one()
+
+    @classmethod
+    async def estimated_count(cls: Type[T], session: AsyncSession) -> int:
+        """
+        Estimate the number of records from the planner statistics (``pg_class.reltuples``).
+
+        The estimate is refreshed by VACUUM/ANALYZE, so it is cheap on large tables but lags
+        behind recent writes. Falls back to an exact count if the table was never analyzed.
+        """
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+            {"table_name": cls.__table__.fullname},
+        )
+        estimate = result.scalar_one_or_none()
+        if estimate is None or estimate < 0:
+            return await cls.count(session)
+        return estimate
+
+    @classmethod
+    async def paginate(
+        cls: Type[T],
+        session: AsyncSession,
+        *criteria: Any,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        stmt: Optional[Select] = None,
+        **kwargs,
+    ) -> tuple[list[T], Optional[str]]:
+        """
+        Retrieve a page of records ordered by (created_at, id), using keyset pagination.
+
+        Pages are selected with ``WHERE (created_at, id) > cursor`` instead of an OFFSET, so with
+        an index ending in (created_at, id) every page costs the same whatever its depth. Only
+        for models with ``created_at`` and ``id`` columns (see ``DBModelMixin``).
+
+        :param session: Database session.
+        :param criteria: SQL conditions the records match.
+        :param cursor: Cursor returned with the previous page; None for the first page.
+        :param limit: Maximum number of records per page.
+        :param stmt: Base select of the model entity (e.g. with joins or loader options).
+        :param kwargs: Equality conditions the records match.
+        :return: The records of the page, and the cursor of the next page (None on the last page).
+        :raises ValueError: If the cursor is malformed.
+        """
+        stmt = (stmt if stmt is not None else select(cls)).where(*criteria).filter_by(**kwargs)
+        if cursor:
+            created_at, ident = decode_cursor(cursor, cls.id.type.python_type)
+            stmt = stmt.where(tuple_(cls.created_at, cls.id) > tuple_(created_at, ident))
+
+        # one extra record tells whether another page follows
+        result = await session.execute(stmt.order_by(cls.created_at, cls.id).limit(limit + 1))
+        items = list(result.scalars().all())
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor(items[-1])
+
+    @classmethod
+    async def get_cached(cls: Type[T], session: AsyncSession, **kwargs) -> Union[T, None]:
+        """
+        Retrieve a record by its primary key or a unique column declared in ``__entity_cache__``,
+        through the entity cache when the model opted in (see ``EntityCache``).
+        """
+        if cls.entity_cache is None or cls.__entity_cache__ is None:
+            return await cls.first(session, **kwargs)
+        return await cls.entity_cache.get(session, cls, **kwargs)
 
     @classmethod
     async def first(cls: Type[T], session: AsyncSession, **kwargs) -> Union[T, None]:
@@ -65,31 +258,211 @@ class DBBase(AsyncAttrs, DeclarativeBase):
         """Delete records matching the given conditions."""
         stmt = delete(cls).filter_by(**kwargs)
         result = await session.execute(stmt)
-        await session.commit()
+        await commit_or_flush(session)
         return result.rowcount
 
     @classmethod
     async def bulk_insert(cls: Type[T], session: AsyncSession, objs: list[dict[str, Any]]) -> None:
         """Insert multiple records in bulk."""
         await session.execute(insert(cls).values(objs))
-        await session.commit()
+        await commit_or_flush(session)
 
     @classmethod
-    async def update_by(
-        cls: Type[T], session: AsyncSession, updates: dict[str, Any], **kwargs
+    async def bulk_load(
+        cls: Type[T],
+        session: AsyncSession,
+        rows: Union[Iterable[dict[str, Any]], AsyncIterable[dict[str, Any]]],
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[int], Any]] = None,
     ) -> int:
+        """
+        Stream rows into the table, chunk by chunk.
+
+        Unlike ``bulk_insert``, rows are consumed lazily, so only one chunk is held in memory.
+        On asyncpg, chunks are sent with ``COPY`` (``copy_records_to_table``), with the
+        Python-side column defaults (ids, timestamps) filled in; other drivers run a chunked
+        executemany, batched by SQLAlchemy's insertmanyvalues. All chunks are loaded in the
+        session's transaction.
+
+        :param session: Database session.
+        :param rows: Iterable or async iterable of rows, keyed by attribute name.
+        :param chunk_size: Rows per chunk; defaults to DATABASE_BULK_LOAD_CHUNK_SIZE.
+        :param progress: Called with the total number of rows loaded after each chunk.
+        :return: Number of rows loaded.
+        """
+        chunk_size = chunk_size or funiq_ai_config.DATABASE_BULK_LOAD_CHUNK_SIZE
+        connection = await session.connection()
+        use_copy = connection.dialect.driver == "asyncpg"
+        if use_copy:
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+
+        loaded = 0
+        async for chunk in iter_chunks(rows, chunk_size):
+            if use_copy:
+                columns, records = cls._build_copy_records(chunk, connection.dialect)
+                await driver_connection.copy_records_to_table(
+                    cls.__table__.name, records=records, columns=columns, schema_name=cls.__table__.schema
+                )
+            else:
+                await session.execute(insert(cls), chunk)
+            loaded += len(chunk)
+            if progress:
+                progress(loaded)
+
+        await commit_or_flush(session)
+        return loaded
+
+    @classmethod
+    def _build_copy_records(cls, chunk: list[dict[str, Any]], dialect) -> tuple[list[str], list[tuple]]:
+        """
+        Convert rows to ``COPY`` records, applying Python-side defaults and bind processors.
+
+        :param chunk: Rows keyed by attribute name.
+        :param dialect: Dialect of the connection the records are copied over.
+        :return: Column names and the records aligned with them.
+        """
+        # a column absent from every row and without a Python default is left to the database
+        keys = set().union(*chunk)
+        fields = []
+        for attr in sa_inspect(cls).column_attrs:
+            column = attr.columns[0]
+            default = column.default
+            if default is not None and not (default.is_callable or default.is_scalar):
+                default = None
+            if attr.key in keys or default is not None:
+                processor = column.type.dialect_impl(dialect).bind_processor(dialect)
+                fields.append((attr.key, column.name, default, processor))
+
+        records = []
+        for row in chunk:
+            record = []
+            for key, _, default, processor in fields:
+                if key in row:
+                    value = row[key]
+                elif default is None:
+                    value = None
+                else:
+                    value = default.arg(None) if default.is_callable else default.arg
+                record.append(processor(value) if processor else value)
+            records.append(tuple(record))
+        return [name for _, name, _, _ in fields], records
+
+    @classmethod
+    async def update_by(cls: Type[T], session: AsyncSession, updates: dict[str, Any], **kwargs) -> int:
         """Update records matching the given conditions."""
         stmt = update(cls).filter_by(**kwargs).values(updates)
         result = await session.execute(stmt)
-        await session.commit()
+        await commit_or_flush(session)
         return result.rowcount
 
     @classmethod
     async def bulk_update(cls: Type[T], session: AsyncSession, objs: list[T]) -> None:
-        """Bulk update records by adding them to the session."""
+        """Bulk update records by adding them to the session (one UPDATE per object)."""
         for obj in objs:
             session.add(obj)
-        await session.commit()
+        await commit_or_flush(session)
+
+    @classmethod
+    async def bulk_update_by_pk(
+        cls: Type[T], session: AsyncSession, rows: list[dict[str, Any]], returning: Optional[Sequence[Any]] = None
+    ) -> Union[int, list[Row]]:
+        """
+        Update many records by primary key with a single ``UPDATE ... FROM (VALUES ...)``.
+
+        Every row holds the primary key and the same set of attributes to update. Rows beyond
+        the bind parameter limit of one statement are sent in further statements. Instances
+        already loaded in the session are not refreshed.
+
+        :param session: Database session.
+        :param rows: Rows keyed by attribute name, each including the primary key.
+        :param returning: Columns to return for every updated record.
+        :return: The returned rows if ``returning`` is given, otherwise the number of updated records.
+        """
+        if not rows:
+            return [] if returning else 0
+
+        mapper = sa_inspect(cls)
+        pk_keys = [mapper.get_property_by_column(pk).key for pk in mapper.primary_key]
+        keys = set(rows[0])
+        if any(set(row) != keys for row in rows):
+            raise ValueError("All rows must have the same keys")
+        if not keys.issuperset(pk_keys):
+            raise ValueError(f"Rows must include the primary key: {', '.join(pk_keys)}")
+        update_keys = [key for key in rows[0] if key not in pk_keys]
+        if not update_keys:
+            raise ValueError("Rows have no attribute to update")
+
+        table = cls.__table__
+        columns = [mapper.columns[key] for key in pk_keys + update_keys]
+        chunk_size = POSTGRES_MAX_PARAMETERS // len(columns)
+
+        returned, rowcount = [], 0
+        for start in range(0, len(rows), chunk_size):
+            data = values(*(column(c.name, c.type) for c in columns), name="updates").data(
+                [tuple(row[key] for key in pk_keys + update_keys) for row in rows[start : start + chunk_size]]
+            )
+            stmt = (
+                update(table)
+                .where(*(table.c[c.name] == data.c[c.name] for c in columns[: len(pk_keys)]))
+                .values({c.name: data.c[c.name] for c in columns[len(pk_keys) :]})
+            )
+            if returning:
+                result = await session.execute(stmt.returning(*returning))
+                returned.extend(result.all())
+            else:
+                result = await session.execute(stmt)
+                rowcount += result.rowcount
+
+        await commit_or_flush(session)
+        return returned if returning else rowcount
+
+    @classmethod
+    async def upsert(
+        cls: Type[T],
+        session: AsyncSession,
+        rows: list[dict[str, Any]],
+        conflict_cols: Sequence[str],
+        update_cols: Optional[Sequence[str]] = None,
+        returning: Optional[Sequence[Any]] = None,
+    ) -> Union[int, list[Row]]:
+        """
+        Insert records, updating the existing ones with PostgreSQL ``ON CONFLICT``.
+
+        Rows are sent as one batched multi-row INSERT (insertmanyvalues), with Python-side
+        defaults applied. Columns with an ``onupdate`` default (e.g. ``updated_at``) are
+        refreshed on conflict.
+
+        :param session: Database session.
+        :param rows: Rows keyed by attribute name.
+        :param conflict_cols: Columns of the unique constraint or index that detects conflicts.
+        :param update_cols: Columns overwritten on conflict; defaults to every other column of
+                            the rows, and an empty list turns the upsert into ``DO NOTHING``.
+        :param returning: Columns to return for every inserted or updated record.
+        :return: The returned rows if ``returning`` is given, otherwise the number of affected records.
+        """
+        if not rows:
+            return [] if returning else 0
+
+        if update_cols is None:
+            update_cols = [key for key in rows[0] if key not in conflict_cols]
+
+        stmt = pg_insert(cls)
+        if update_cols:
+            mapper = sa_inspect(cls)
+            set_ = {mapper.columns[key].name: stmt.excluded[mapper.columns[key].name] for key in update_cols}
+            for c in cls.__table__.columns:
+                if c.onupdate is not None and c.name not in set_:
+                    set_[c.name] = stmt.excluded[c.name]
+            stmt = stmt.on_conflict_do_update(index_elements=list(conflict_cols), set_=set_)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_cols))
+
+        # the rowcount of a batched executemany is not reliable, count the returned keys instead
+        result = await session.execute(stmt.returning(*(returning or cls.__table__.primary_key.columns)), rows)
+        returned = result.all()
+
+        await commit_or_flush(session)
+        return returned if returning else len(returned)
 
     def to_dict(self) -> dict[str, Any]:
         """Convert the current instance into a dictionary."""
@@ -98,12 +471,12 @@ class DBBase(AsyncAttrs, DeclarativeBase):
     async def save(self, session: AsyncSession) -> None:
         """Save the current instance to the database."""
         session.add(self)
-        await session.commit()
+        await commit_or_flush(session)
 
     async def delete(self, session: AsyncSession) -> None:
         """Delete the current instance from the database."""
         await session.delete(self)
-        await session.commit()
+        await commit_or_flush(session)
 
     def update(self, updates: dict[str, Any]) -> None:
         """Update the current instance with the given dictionary of updates."""
@@ -135,19 +508,20 @@ class DBModelMixin(Generic[ID]):
     id: Mapped[ID]
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
     updated_at: Mapped[datetime] = mapped_column(
-        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), 
-        onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None)
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+        onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
     )
 
     def refresh_updated_at(self) -> None:
         """Manually refresh the updated_at field to the current timestamp."""
         self.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-        
-        
+
+
 class DBIntIDModelMixin(DBModelMixin[int]):
     """
     Model implementation using an auto-incrementing integer as the primary key ID.
     """
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
 
@@ -155,4 +529,5 @@ class DBUUIDIDModelMixin(DBModelMixin[uuid.UUID]):
     """
     Model implementation using a UUID as the primary key ID.
     """
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
\ No newline at end of file
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
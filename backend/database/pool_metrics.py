@@ -0,0 +1,279 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Callable, Optional
+
+from loguru import logger
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from configs import funiq_ai_config
+
+# Upper bounds in milliseconds of the checkout wait and connect latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# ConnectionRecord.info key of the time a new connection started connecting
+_CONNECT_STARTED_KEY = "pool_metrics_connect_started"
+
+
+class Histogram:
+    """Cumulative latency histogram in milliseconds, like a Prometheus histogram."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+
+    def to_dict(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum_ms": round(self.sum, 3), "buckets": buckets}
+
+
+class PoolMetrics:
+    """
+    Telemetry of a connection pool: checkout waits, timeouts, connects and overflow use.
+    Counters are updated under a lock, the sync engines check out from several threads.
+
+    A checkout waiting longer than ``POOL_CHECKOUT_WAIT_WARNING_MS`` and a checkout timeout
+    are logged right away; a snapshot of the pool is logged every
+    ``POOL_METRICS_LOG_INTERVAL`` seconds. Log records carry the snapshot as ``extra``.
+    """
+
+    def __init__(self, name: str, get_usage: Callable[[], dict]):
+        """
+        Initialize the pool metrics.
+
+        :param name: Name the pool is reported under.
+        :param get_usage: Returns the current ``size``, ``checked_out``, ``idle`` and ``overflow``
+                          connections of the pool.
+        """
+        self.name = name
+        self.get_usage = get_usage
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_errors = 0
+        self.overflow_connects = 0
+        self.invalidations = 0
+        # checkouts that pinged the connection, and the ping round trips saved by skipping it
+        self.pre_pings = 0
+        self.pre_pings_skipped = 0
+        self.checkout_wait = Histogram()
+        self.connect_latency = Histogram()
+        self._logged_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str):
+        """
+        Add one to a counter.
+
+        :param counter: Name of the counter attribute, e.g. ``invalidations``.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def observe_checkout(self, wait: float, overflow: bool = False):
+        """
+        Record a checkout.
+
+        :param wait: Seconds the checkout waited, including connecting a new connection.
+        :param overflow: Whether the checkout opened an overflow connection.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait.observe(wait * 1000)
+            if overflow:
+                self.overflow_connects += 1
+        if wait * 1000 >= funiq_ai_config.POOL_CHECKOUT_WAIT_WARNING_MS:
+            self._log("WARNING", f"Pool {self.name}: checkout waited {wait * 1000:.0f}ms")
+        elif funiq_ai_config.POOL_METRICS_LOG_INTERVAL and (
+            time.monotonic() - self._logged_at >= funiq_ai_config.POOL_METRICS_LOG_INTERVAL
+        ):
+            self._log("INFO", f"Pool {self.name}: metrics")
+
+    def observe_timeout(self, wait: float):
+        """
+        Record a checkout that timed out.
+
+        :param wait: Seconds the checkout waited.
+        """
+        self.increment("timeouts")
+        self._log("ERROR", f"Pool {self.name}: checkout timed out after {wait * 1000:.0f}ms")
+
+    def observe_connect(self, latency: float):
+        """
+        Record a new connection.
+
+        :param latency: Seconds the connection took to establish.
+        """
+        with self._lock:
+            self.connects += 1
+            self.connect_latency.observe(latency * 1000)
+
+    def snapshot(self) -> dict:
+        """
+        Get the current usage and the counters of the pool.
+
+        :return: Pool usage, counters and latency histograms.
+        """
+        with self._lock:
+            counters = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "connect_errors": self.connect_errors,
+                "overflow_connects": self.overflow_connects,
+                "invalidations": self.invalidations,
+                "pre_pings": self.pre_pings,
+                "pre_pings_skipped": self.pre_pings_skipped,
+                "checkout_wait_ms": self.checkout_wait.to_dict(),
+                "connect_latency_ms": self.connect_latency.to_dict(),
+            }
+        return {**self.get_usage(), **counters}
+
+    def _log(self, level: str, message: str):
+        self._logged_at = time.monotonic()
+        logger.bind(pool=self.name, pool_metrics=self.snapshot()).log(level, message)
+
+
+# Metrics of the instrumented pools by name
+pool_metrics: dict[str, PoolMetrics] = {}
+
+
+def get_pool_metrics() -> dict[str, dict]:
+    """
+    Get a snapshot of every instrumented pool.
+
+    :return: Mapping of pool name to its usage, counters and latency histograms.
+    """
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+
+class _InstrumentedQueuePoolMixin:
+    """Time the checkouts of a queue pool; see ``instrument_engine``."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+
+        overflow = self.overflow()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.observe_checkout(time.perf_counter() - started, overflow=self.overflow() > max(overflow, 0))
+        return connection
+
+    def recreate(self):
+        # Engine.dispose() replaces the pool
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedQueuePoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedQueuePoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    """
+    Collect the pool metrics of an engine created with an instrumented pool class.
+
+    :param engine: Engine, the ``sync_engine`` of an async engine.
+    :param name: Name the pool is reported under.
+    :return: Metrics of the pool.
+    """
+
+    def get_usage() -> dict:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        }
+
+    metrics = pool_metrics[name] = PoolMetrics(name, get_usage)
+    engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "do_connect")
+    def _start_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info[_CONNECT_STARTED_KEY] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _connected(dbapi_connection, connection_record):
+        started = connection_record.info.pop(_CONNECT_STARTED_KEY, None)
+        if started is not None:
+            metrics.observe_connect(time.perf_counter() - started)
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidated(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context: ExceptionContext):
+        # errors raised while connecting have no connection
+        if context.connection is None:
+            metrics.increment("connect_errors")
+
+    return metrics
+
+
+class InstrumentedBlockingConnectionPool(BlockingConnectionPool):
+    """Redis blocking connection pool reporting its metrics as ``metrics_name``."""
+
+    def __init__(self, *args, metrics_name: str = "redis", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = pool_metrics[metrics_name] = PoolMetrics(metrics_name, self._get_usage)
+
+    def _get_usage(self) -> dict:
+        return {
+            "size": self.max_connections,
+            "checked_out": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "overflow": 0,
+        }
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except RedisConnectionError as e:
+            if isinstance(e.__cause__, asyncio.TimeoutError):
+                self.metrics.observe_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.observe_checkout(time.perf_counter() - started)
+        return connection
+
+    async def ensure_connection(self, connection):
+        if connection.is_connected:
+            return await super().ensure_connection(connection)
+
+        started = time.perf_counter()
+        try:
+            await super().ensure_connection(connection)
+        except Exception:
+            self.metrics.increment("connect_errors")
+            raise
+        self.metrics.observe_connect(time.perf_counter() - started)
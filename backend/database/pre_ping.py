@@ -0,0 +1,81 @@
+import time
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.exc import DBAPIError, DisconnectionError
+from sqlalchemy.orm import Session
+
+# ConnectionRecord.info key of the time the connection was returned to the pool
+_CHECKED_IN_AT_KEY = "checked_in_at"
+
+
+def install_idle_pre_ping(engine: Engine, idle_seconds: float):
+    """
+    Ping pooled connections on checkout only when they may have gone stale, instead of on
+    every checkout like ``pool_pre_ping``.
+
+    A connection is pinged when it sat idle in the pool for ``idle_seconds`` or longer, or
+    when a disconnect was detected since it was returned. New connections are never pinged.
+    A connection that fails its ping is replaced; a stale connection that was not pinged
+    fails its first statement, which ``DisconnectRetrySession`` retries once.
+
+    The pings done and skipped are counted in the pool metrics (see ``instrument_engine``).
+
+    :param engine: Engine created without ``pool_pre_ping``, the ``sync_engine`` of an async engine.
+    :param idle_seconds: Idle seconds after which a connection is pinged, 0 to ping on every checkout.
+    """
+    last_disconnect = 0.0
+
+    @event.listens_for(engine, "checkin")
+    def _stamp_checkin(dbapi_connection, connection_record):
+        connection_record.info[_CHECKED_IN_AT_KEY] = time.monotonic()
+
+    @event.listens_for(engine, "handle_error")
+    def _record_disconnect(context: ExceptionContext):
+        nonlocal last_disconnect
+        if context.is_disconnect:
+            last_disconnect = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_stale_connection(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.pop(_CHECKED_IN_AT_KEY, None)
+        if checked_in_at is None:
+            # just connected
+            return
+
+        metrics = getattr(engine.pool, "metrics", None)
+        if time.monotonic() - checked_in_at < idle_seconds and checked_in_at > last_disconnect:
+            if metrics is not None:
+                metrics.increment("pre_pings_skipped")
+            return
+
+        if metrics is not None:
+            metrics.increment("pre_pings")
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except engine.dialect.loaded_dbapi.Error as e:
+            if engine.dialect.is_disconnect(e, dbapi_connection, None):
+                # the pool replaces the connection and checks out again
+                raise DisconnectionError("Pooled connection failed its pre-ping") from e
+            raise
+
+
+class DisconnectRetrySession(Session):
+    """
+    Session retrying once the first statement of a transaction that failed because its
+    connection was lost.
+
+    Nothing ran in the transaction yet, and the server aborted it with the connection, so
+    the statement is retried on a new connection. Sessions with unflushed changes are not
+    retried, as the failed autoflush may have left them half flushed.
+    """
+
+    def execute(self, statement, *args, **kwargs):
+        first_statement = not self.in_transaction() and not self.new and not self.dirty and not self.deleted
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except DBAPIError as e:
+            if not (first_statement and e.connection_invalidated):
+                raise
+        self.rollback()
+        return super().execute(statement, *args, **kwargs)
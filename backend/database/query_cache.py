@@ -0,0 +1,260 @@
+import asyncio
+import functools
+import hashlib
+import logging
+from contextvars import ContextVar
+from inspect import signature
+from itertools import chain
+from typing import Any, Awaitable, Callable, ClassVar, Optional, TypeVar, get_type_hints
+
+import orjson
+from pydantic import TypeAdapter
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session, object_mapper
+from sqlalchemy.sql.util import find_tables
+
+from utils.json import json_dumps, json_loads
+
+from .routing import reads_from_replica
+
+R = TypeVar("R")
+
+# Tables read by the statements of the cached call in progress, None outside of one
+_reads: ContextVar[Optional[set[str]]] = ContextVar("query_cache_reads", default=None)
+# Session.info set of the tables written by the transaction, whose versions are bumped once it commits
+_WRITES_SESSION_KEY = "query_cache_writes"
+
+
+class QueryCache:
+    """
+    Cache of the results of service methods, tagged with the tables their statements read.
+
+    Every table has a version in Redis, bumped once a session that wrote to it commits: flushes
+    and ORM-enabled insert / update / delete statements, the bulk helpers included. An entry
+    keeps the versions of its tables when it was computed, and is a miss in every process once
+    one of them moved. Writes outside of a session (the sync engine's connections) and reads
+    through ``text()`` are not seen. Results are not cached while the transaction has uncommitted
+    writes to their tables or reads from a replica.
+    """
+
+    # Query cache used by the cached_query methods, set up by database.core
+    current: ClassVar[Optional["QueryCache"]] = None
+
+    def __init__(self, redis: Redis, sync_redis: SyncRedis, ttl: int = 60, prefix: str = "query_cache"):
+        """
+        Initialize the query cache.
+
+        :param redis: Redis client reading and filling the cache.
+        :param sync_redis: Redis client bumping the table versions after a commit outside of an
+            event loop.
+        :param ttl: Seconds an entry lives in Redis.
+        :param prefix: Prefix of the Redis keys.
+        """
+        self.redis = redis
+        self.sync_redis = sync_redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.versions_key = f"{prefix}:versions"
+        # bumps scheduled after commits on the event loop, referenced until they are done
+        self._pending: set[asyncio.Task] = set()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def key(self, name: str, arguments: dict[str, Any]) -> str:
+        """
+        Key of a call: the cached method and its arguments, normalized by name.
+
+        :param name: Qualified name of the method.
+        :param arguments: Arguments of the call, without the session.
+        """
+        digest = hashlib.sha256(json_dumps(arguments, default=str, option=orjson.OPT_SORT_KEYS).encode()).hexdigest()
+        return f"{self.prefix}:{name}:{digest}"
+
+    async def call(
+        self,
+        session: AsyncSession,
+        key: str,
+        adapter: TypeAdapter,
+        fn: Callable[[], Awaitable[R]],
+        ttl: Optional[int] = None,
+    ) -> R:
+        """
+        Return the cached result of a call, or run it and cache its result.
+
+        :param session: Database session of the call.
+        :param key: Key of the call.
+        :param adapter: Type adapter of the result.
+        :param fn: Runs the call.
+        :param ttl: Seconds the entry lives in Redis, defaults to the cache TTL.
+        :return: Result of the call.
+        """
+        entry, versions = await self._lookup(key)
+        if entry is not None and all(versions.get(table, 0) == version for table, version in entry["tags"].items()):
+            _add_reads(entry["tags"])
+            return adapter.validate_python(entry["value"])
+
+        token = _reads.set(set())
+        try:
+            result = await fn()
+            tables = _reads.get()
+        finally:
+            _reads.reset(token)
+        _add_reads(tables)
+
+        if tables and self._may_fill(session, tables):
+            # versions read before the call: a write committed meanwhile makes the entry stale at once
+            tags = {table: versions.get(table, 0) for table in tables}
+            await self._fill(key, {"tags": tags, "value": adapter.dump_python(result, mode="json")}, ttl)
+        return result
+
+    @staticmethod
+    def _may_fill(session: AsyncSession, tables: set[str]) -> bool:
+        if reads_from_replica(session):
+            return False
+        return tables.isdisjoint(session.info.get(_WRITES_SESSION_KEY, ()))
+
+    async def _lookup(self, key: str) -> tuple[Optional[dict], dict[str, int]]:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.hgetall(self.versions_key)
+                payload, versions = await pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Query cache read failed: {e!s}")
+            return None, {}
+        versions = {_decode(table): int(version) for table, version in versions.items()}
+        return (json_loads(payload) if payload is not None else None), versions
+
+    async def _fill(self, key: str, entry: dict, ttl: Optional[int]):
+        try:
+            await self.redis.set(key, json_dumps(entry), ex=ttl or self.ttl)
+        except RedisError as e:
+            self.logger.warning(f"Query cache fill failed: {e!s}")
+
+    def bump(self, tables: set[str]):
+        """
+        Bump the versions of tables, turning the entries that read them into misses. On an event
+        loop the bump runs in a task, so the commit does not block the loop on a round trip.
+
+        :param tables: Names of the written tables.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                with self.sync_redis.pipeline(transaction=False) as pipe:
+                    for table in tables:
+                        pipe.hincrby(self.versions_key, table, 1)
+                    pipe.execute()
+            except RedisError as e:
+                self._bump_failed(e)
+            return
+        task = loop.create_task(self._bump(tables))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _bump(self, tables: set[str]):
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for table in tables:
+                    pipe.hincrby(self.versions_key, table, 1)
+                await pipe.execute()
+        except RedisError as e:
+            self._bump_failed(e)
+
+    def _bump_failed(self, e: RedisError):
+        self.logger.warning(f"Query cache invalidation failed, entries expire in {self.ttl}s: {e!s}")
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _add_reads(tables):
+    reads = _reads.get()
+    if reads is not None:
+        reads.update(tables)
+
+
+def cached_query(ttl: Optional[int] = None):
+    """
+    Decorator: cache the result of a service method taking a ``session``, by its other
+    arguments, until a table its statements read is written (see ``QueryCache``).
+
+    The result is stored as JSON through the method's return annotation, which must be a type
+    pydantic can validate (a response model, a ``CursorPage``...). Methods raising an error
+    are not cached.
+
+    :param ttl: Seconds an entry lives in Redis, defaults to ``QUERY_CACHE_TTL``.
+    """
+
+    def decorator(fn: Callable[..., Awaitable[R]]) -> Callable[..., Awaitable[R]]:
+        fn_signature = signature(fn)
+        if "session" not in fn_signature.parameters:
+            raise ValueError(f"{fn.__qualname__} has no session parameter")
+        adapter = TypeAdapter(get_type_hints(fn)["return"])
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> R:
+            cache = QueryCache.current
+            if cache is None:
+                return await fn(*args, **kwargs)
+            bound = fn_signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            session = arguments.pop("session")
+            return await cache.call(session, cache.key(name, arguments), adapter, lambda: fn(*args, **kwargs), ttl)
+
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _collect_reads(conn, cursor, statement, parameters, context, executemany):
+    reads = _reads.get()
+    if reads is None or context.compiled is None:
+        return
+    # the compile state holds the statement as sent, with the eager loads joined in
+    compile_state = context.compiled.compile_state
+    stmt = compile_state.statement if compile_state is not None else context.compiled.statement
+    reads.update(str(table.name) for table in find_tables(stmt))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_writes(session: Session, flush_context):
+    if QueryCache.current is None:
+        return
+    tables = {
+        str(table.name)
+        for obj in chain(session.new, session.dirty, session.deleted)
+        for table in object_mapper(obj).tables
+    }
+    if tables:
+        session.info.setdefault(_WRITES_SESSION_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_writes(orm_execute_state: ORMExecuteState):
+    if QueryCache.current is None:
+        return
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table
+        orm_execute_state.session.info.setdefault(_WRITES_SESSION_KEY, set()).add(str(table.name))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session):
+    tables = session.info.pop(_WRITES_SESSION_KEY, None)
+    if tables and QueryCache.current is not None:
+        QueryCache.current.bump(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session: Session):
+    session.info.pop(_WRITES_SESSION_KEY, None)
@@ -0,0 +1,98 @@
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.types import ASGIApp
+
+
+class _RequestSessionState:
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+        self.session: Optional[AsyncSession] = None
+        self.on_create: list[Callable[[AsyncSession], None]] = []
+
+
+_state: ContextVar[Optional[_RequestSessionState]] = ContextVar("request_session_state", default=None)
+
+
+class _RequestSessionProxy:
+    """
+    Access to the session of the current request (``db.session``).
+
+    The session is created when a handler first uses it, so requests that never touch the
+    database cost neither a session nor a pooled connection.
+    """
+
+    @staticmethod
+    def _get_state() -> _RequestSessionState:
+        state = _state.get()
+        if state is None:
+            raise RuntimeError("No request session: RequestSessionMiddleware is not installed")
+        return state
+
+    @property
+    def session(self) -> AsyncSession:
+        """Return the session of the current request, creating it on first use."""
+        state = self._get_state()
+        if state.session is None:
+            state.session = state.session_factory()
+            for callback in state.on_create:
+                callback(state.session)
+        return state.session
+
+    @property
+    def has_session(self) -> bool:
+        """Whether the current request has used its session."""
+        return self._get_state().session is not None
+
+    def on_session(self, callback: Callable[[AsyncSession], None]):
+        """
+        Prepare the session of the current request without creating it.
+
+        :param callback: Called with the session when it is created, or right away if it exists.
+        """
+        state = self._get_state()
+        if state.session is None:
+            state.on_create.append(callback)
+        else:
+            callback(state.session)
+
+
+db = _RequestSessionProxy()
+
+
+class RequestSessionMiddleware(BaseHTTPMiddleware):
+    """
+    Provide ``db.session`` to the request, and close it, returning its connection to the
+    pool, as soon as the handler responded. An unhandled exception rolls the session back.
+
+    Install it inside the middlewares that do not use the database (authentication, CORS,
+    i18n), so the connection is not held while the response passes through them, and the
+    requests they answer never reach it.
+    """
+
+    def __init__(self, app: ASGIApp, session_factory: async_sessionmaker):
+        """
+        Initialize the middleware.
+
+        :param app: ASGI application.
+        :param session_factory: Factory of the request sessions.
+        """
+        super().__init__(app)
+        self.session_factory = session_factory
+
+    async def dispatch(self, request: Request, call_next):
+        state = _RequestSessionState(self.session_factory)
+        token = _state.set(state)
+        try:
+            return await call_next(request)
+        except Exception:
+            if state.session is not None:
+                await state.session.rollback()
+            raise
+        finally:
+            if state.session is not None:
+                await state.session.close()
+            _state.reset(token)
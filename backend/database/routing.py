@@ -0,0 +1,186 @@
+import functools
+import itertools
+import logging
+import math
+import time
+from typing import Any, Callable, Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from .pre_ping import DisconnectRetrySession
+from .request_session import db
+
+# Session.info flag: the session runs read-only transactions, and its SELECTs may be served by a replica
+READ_ONLY_SESSION_KEY = "read_only"
+# Session.info wall-clock time until which reads stick to the primary (inf while a write is uncommitted)
+PRIMARY_UNTIL_SESSION_KEY = "primary_until"
+# Session.info replica engine pinned for the current transaction
+_REPLICA_SESSION_KEY = "replica"
+
+
+class ReplicaSet:
+    """
+    Read replicas picked round-robin, ejecting the ones that fail.
+
+    A replica whose connection fails or is dropped is skipped for ``eject_seconds``, then
+    tried again by the next session that picks it.
+    """
+
+    def __init__(self, replicas: list[AsyncEngine], eject_seconds: float = 30):
+        """
+        Initialize the replica set.
+
+        :param replicas: Async engines of the replicas.
+        :param eject_seconds: Seconds a failing replica is skipped for.
+        """
+        self.replicas = [replica.sync_engine for replica in replicas]
+        self.eject_seconds = eject_seconds
+        self._ejected_until: dict[Engine, float] = {}
+        self._counter = itertools.count()
+        for replica in self.replicas:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def next(self) -> Optional[Engine]:
+        """Return the next healthy replica, or None if all of them are ejected."""
+        start = next(self._counter)
+        now = time.monotonic()
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if self._ejected_until.get(replica, 0) <= now:
+                return replica
+        return None
+
+    def eject(self, replica: Engine):
+        """Skip a replica for ``eject_seconds``."""
+        self._ejected_until[replica] = time.monotonic() + self.eject_seconds
+        logging.warning(f"Ejecting database replica {replica.url!r} for {self.eject_seconds:.0f}s")
+
+    def _on_error(self, context: ExceptionContext):
+        # a failed connect has no connection yet; a disconnect means the server went away
+        if context.is_disconnect or context.connection is None:
+            self.eject(context.engine)
+
+
+class RoutingSession(DisconnectRetrySession):
+    """
+    Session sending reads to the replicas and everything else to the primary.
+
+    A ``SELECT`` goes to a replica when the session is marked read-only (see ``read_only``),
+    or with ``reads_outside_writes`` as long as the session has not written. Flushes, DML,
+    locking reads (``FOR UPDATE``) and textual SQL always use the primary. Once a session
+    writes, its reads stick to the primary until ``sticky_seconds`` after the commit, so a
+    request reads its own writes despite replication lag. A transaction reads from a single
+    replica.
+    """
+
+    replicas: Optional[ReplicaSet] = None
+    sticky_seconds: float = 5
+    # reads before the first write may be stale, so check-then-write code must not rely on them
+    reads_outside_writes: bool = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kw)
+        if isinstance(clause, StatementLambdaElement):
+            # route hot queries by the statement they produce
+            clause = clause._resolved
+        bind = self._route(primary, clause)
+        if self.info.get(READ_ONLY_SESSION_KEY):
+            return read_only_engine(bind)
+        return bind
+
+    def _route(self, primary: Engine, clause) -> Engine:
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info[PRIMARY_UNTIL_SESSION_KEY] = math.inf
+            return primary
+        if not self.replicas or not self._is_replica_read(clause):
+            return primary
+
+        replica = self.info.get(_REPLICA_SESSION_KEY)
+        if replica is None:
+            replica = self.info[_REPLICA_SESSION_KEY] = self.replicas.next()
+        return replica or primary
+
+    def _is_replica_read(self, clause) -> bool:
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return False
+        if self.info.get(PRIMARY_UNTIL_SESSION_KEY, 0) > time.time():
+            return False
+        return self.info.get(READ_ONLY_SESSION_KEY, self.reads_outside_writes)
+
+
+def reads_from_replica(session: Session | AsyncSession) -> bool:
+    """Whether the current transaction of the session reads from a replica."""
+    return session.info.get(_REPLICA_SESSION_KEY) is not None
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_sticky_primary_window(session: RoutingSession):
+    session.info.pop(_REPLICA_SESSION_KEY, None)
+    if session.info.get(PRIMARY_UNTIL_SESSION_KEY) == math.inf:
+        session.info[PRIMARY_UNTIL_SESSION_KEY] = time.time() + session.sticky_seconds
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_uncommitted_write(session: RoutingSession):
+    session.info.pop(_REPLICA_SESSION_KEY, None)
+    if session.info.get(PRIMARY_UNTIL_SESSION_KEY) == math.inf:
+        session.info.pop(PRIMARY_UNTIL_SESSION_KEY)
+
+
+_read_only_engines: dict[Engine, Engine] = {}
+
+
+def read_only_engine(engine: Engine) -> Engine:
+    """
+    Return a variant of the engine whose transactions begin with ``BEGIN READ ONLY``.
+
+    The mode is part of the BEGIN statement, so it costs no extra round trip, and it is reset
+    when the connection returns to the pool. Serializable transactions are also DEFERRABLE,
+    so they never wait for or cause serialization failures.
+    """
+    variant = _read_only_engines.get(engine)
+    if variant is None:
+        options = {"postgresql_readonly": True}
+        if engine.get_execution_options().get("isolation_level") == "SERIALIZABLE":
+            options["postgresql_deferrable"] = True
+        # cached, so the session keeps a single connection per engine
+        variant = _read_only_engines.setdefault(engine, engine.execution_options(**options))
+    return variant
+
+
+def mark_read_only(session: Session | AsyncSession):
+    """
+    Run the session's transactions read-only: they may be served by a replica, the session
+    never flushes, and PostgreSQL rejects any write. Mark the session before its first query.
+    """
+    session.info[READ_ONLY_SESSION_KEY] = True
+    session.autoflush = False
+
+
+@event.listens_for(Session, "before_flush")
+def _forbid_read_only_flush(session: Session, flush_context, instances):
+    if session.info.get(READ_ONLY_SESSION_KEY):
+        raise InvalidRequestError("Cannot flush a read-only session")
+
+
+def read_only(fn: Callable[..., Any]):
+    """
+    Decorator: run the request session of a route read-only (see ``mark_read_only``).
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        mark_read_only(db.session)
+        return await fn(*args, **kwargs)
+
+    return wrapper
@@ -4,8 +4,16 @@ set -e  # if any command fails, exit
 
 case "${MODE}" in
   worker)
-    echo "[INFO] Starting Celery Worker..."
-    exec celery -A app.main.celery worker --loglevel info -Q ${CELERY_QUEUES:-mail}
+    echo "[INFO] Starting Celery Worker (pool: ${CELERY_WORKER_POOL:-threads})..."
+    # verification codes are listed first, so they are taken before bulk mail
+    exec celery -A app.main.celery worker --loglevel info -Q ${CELERY_QUEUES:-mail_priority,mail} \
+      -P ${CELERY_WORKER_POOL:-threads} -c ${CELERY_WORKER_CONCURRENCY:-32}
+    ;;
+
+  priority_worker)
+    echo "[INFO] Starting high-priority Celery Worker (pool: ${CELERY_WORKER_POOL:-threads})..."
+    exec celery -A app.main.celery worker --loglevel info -n priority@%h -Q ${CELERY_PRIORITY_QUEUES:-mail_priority} \
+      -P ${CELERY_WORKER_POOL:-threads} -c ${CELERY_PRIORITY_WORKER_CONCURRENCY:-8}
     ;;
 
   beat)
@@ -13,13 +21,18 @@ case "${MODE}" in
     exec celery -A app.main.celery beat --loglevel info
     ;;
 
+  outbox_relay)
+    echo "[INFO] Starting the outbox relay..."
+    exec python cli.py outbox relay
+    ;;
+
   web)
     echo "[INFO] Starting FastAPI..."
     exec python app.py
     ;;
 
   *)
-    echo "[ERROR] Invalid MODE: '${MODE}'. Supported modes are: web, worker, beat."
+    echo "[ERROR] Invalid MODE: '${MODE}'. Supported modes are: web, worker, priority_worker, beat, outbox_relay."
     exit 1
     ;;
 esac
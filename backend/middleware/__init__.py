@@ -4,17 +4,22 @@ Manage global middlewares
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_async_sqlalchemy import SQLAlchemyMiddleware
 from starlette_csrf import CSRFMiddleware
 
 from configs import funiq_ai_config
-from database import engine
+from database import RequestSessionFactory, RequestSessionMiddleware
 from middleware.auth import TokenRefreshMiddleware
 from middleware.i18n import I18nMiddleware
 from middleware.request_context import RequestContextMiddleware
+from middleware.unit_of_work import UnitOfWorkMiddleware
 
 
 def install_global_middlewares(app: FastAPI):
+    # must be before RequestSessionMiddleware, which provides the request session it commits
+    app.add_middleware(UnitOfWorkMiddleware)
+    # innermost, so requests answered by the other middlewares never reach it, and the session
+    # connection returns to the pool before the response passes through them
+    app.add_middleware(RequestSessionMiddleware, session_factory=RequestSessionFactory)
     app.add_middleware(TokenRefreshMiddleware)
     # must be after TokenRefreshMiddleware, ensure return response is correct(including CORS headers)
     app.add_middleware(
@@ -27,4 +32,3 @@ def install_global_middlewares(app: FastAPI):
     )
     app.add_middleware(RequestContextMiddleware)
     app.add_middleware(I18nMiddleware)
-    app.add_middleware(SQLAlchemyMiddleware, custom_engine=engine)
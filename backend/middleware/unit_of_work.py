@@ -0,0 +1,76 @@
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from configs import funiq_ai_config
+from database import READ_ONLY_SESSION_KEY, UNIT_OF_WORK_SESSION_KEY, db, mark_read_only
+
+# Session.info counter of the commits issued while handling a request
+COMMIT_COUNT_SESSION_KEY = "commit_count"
+# methods whose request session runs read-only with DATABASE_READ_ONLY_SAFE_METHODS
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+
+
+class UnitOfWorkMiddleware(BaseHTTPMiddleware):
+    """
+    Run the request session as a unit of work.
+
+    Model helpers only flush, and the session is committed once after the route returns.
+    A handled client error (4xx) still commits what was flushed before it was raised, as the
+    per-helper commits did, but drops unflushed changes; a server error rolls the request
+    back. Must be installed inside ``RequestSessionMiddleware``, which provides and closes the
+    session and rolls back on unhandled exceptions.
+
+    With ``DATABASE_READ_ONLY_SAFE_METHODS``, GET and HEAD requests run read-only (see
+    ``mark_read_only``), and their transaction is rolled back, which is cheaper than a
+    commit and cannot persist anything.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        read_only = funiq_ai_config.DATABASE_READ_ONLY_SAFE_METHODS and request.method in READ_ONLY_METHODS
+
+        def begin(session: AsyncSession):
+            session.info[COMMIT_COUNT_SESSION_KEY] = 0
+            if funiq_ai_config.DATABASE_UNIT_OF_WORK:
+                session.info[UNIT_OF_WORK_SESSION_KEY] = True
+            if read_only:
+                mark_read_only(session)
+
+        # the session is only created if the route uses it
+        db.on_session(begin)
+        response = await call_next(request)
+        if not db.has_session:
+            return response
+
+        session = db.session
+        # a request that never queried the database has nothing to end
+        if session.info.get(READ_ONLY_SESSION_KEY) and session.in_transaction():
+            await session.rollback()
+        elif funiq_ai_config.DATABASE_UNIT_OF_WORK and session.in_transaction():
+            if response.status_code >= 500:
+                await session.rollback()
+            else:
+                if response.status_code >= 400:
+                    _discard_unflushed_changes(session)
+                await session.commit()
+
+        logger.debug(
+            f"UnitOfWorkMiddleware: {request.method} {request.url.path} "
+            f"committed {session.info.get(COMMIT_COUNT_SESSION_KEY, 0)} time(s)"
+        )
+        return response
+
+
+def _discard_unflushed_changes(session: AsyncSession):
+    for obj in list(session.new):
+        session.expunge(obj)
+    session.expire_all()
+
+
+@event.listens_for(Session, "after_commit")
+def _count_commit(session: Session):
+    if COMMIT_COUNT_SESSION_KEY in session.info:
+        session.info[COMMIT_COUNT_SESSION_KEY] += 1
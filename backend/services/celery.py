@@ -1,7 +1,28 @@
-from celery import Celery
+import time
+from datetime import datetime
+from typing import Optional
+
+from celery import Celery, Task
+from celery.signals import before_task_publish, task_prerun
 from fastapi import FastAPI
+from kombu import serialization
 
 from configs import funiq_ai_config
+from database import sync_redis
+from utils.json import json_dumps, json_loads
+
+QUEUE_METRICS_PREFIX = "celery_queue_metrics"
+
+
+def register_orjson_serializer():
+    """Register the 'orjson' serializer with kombu."""
+    serialization.register(
+        "orjson",
+        json_dumps,
+        json_loads,
+        content_type="application/x-orjson",
+        content_encoding="utf-8",
+    )
 
 
 def create_celery_app(app: FastAPI) -> Celery:
@@ -11,6 +32,7 @@ def create_celery_app(app: FastAPI) -> Celery:
     :param app: FastAPI application instance.
     :return: Configured Celery app instance.
     """
+    register_orjson_serializer()
 
     celery_app = Celery(
         app.title,
@@ -18,6 +40,24 @@ def create_celery_app(app: FastAPI) -> Celery:
         backend=funiq_ai_config.CELERY_RESULT_BACKEND,
         broker_connection_retry_on_startup=True,
     )
+    task_serializer = funiq_ai_config.CELERY_TASK_SERIALIZER
+    result_serializer = funiq_ai_config.CELERY_RESULT_SERIALIZER
+    celery_app.conf.update(
+        task_serializer=task_serializer,
+        result_serializer=result_serializer,
+        # keep accepting plain JSON so messages published before a serializer change still run
+        accept_content=sorted({task_serializer, result_serializer, "json"}),
+        result_accept_content=sorted({result_serializer, "json"}),
+        task_ignore_result=funiq_ai_config.CELERY_TASK_IGNORE_RESULT,
+        task_acks_late=funiq_ai_config.CELERY_TASK_ACKS_LATE,
+        task_reject_on_worker_lost=funiq_ai_config.CELERY_TASK_ACKS_LATE,
+        worker_prefetch_multiplier=funiq_ai_config.CELERY_WORKER_PREFETCH_MULTIPLIER,
+        broker_pool_limit=funiq_ai_config.CELERY_BROKER_POOL_LIMIT,
+        worker_pool=funiq_ai_config.CELERY_WORKER_POOL,
+        worker_concurrency=funiq_ai_config.CELERY_WORKER_CONCURRENCY,
+        # a worker consuming several queues drains them in the order given to -Q
+        broker_transport_options={"queue_order_strategy": "priority"},
+    )
 
     return celery_app
 
@@ -31,3 +71,69 @@ def init_celery(app: FastAPI):
     """
     celery_app = create_celery_app(app)
     app.state.celery = celery_app
+
+
+def get_queue_metrics(celery_app: Celery, queues: list[str]) -> dict[str, dict]:
+    """
+    Get the depth and wait time of Celery queues.
+
+    :param celery_app: Celery app whose broker holds the queues.
+    :param queues: Names of the queues.
+    :return: Per queue, the number of waiting messages (``depth``), the number of started tasks
+             (``started``) and their average and last wait in seconds between publish and start.
+    """
+    metrics = {}
+    with celery_app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in queues:
+            try:
+                depth = channel.queue_declare(queue, passive=True).message_count
+            except Exception:
+                # the queue has not been declared yet
+                depth = 0
+
+            stats = sync_redis.hgetall(f"{QUEUE_METRICS_PREFIX}:{queue}")
+            started = int(stats.get(b"started", 0))
+            wait_total = float(stats.get(b"wait_seconds_total", 0))
+            metrics[queue] = {
+                "depth": depth,
+                "started": started,
+                "avg_wait_seconds": wait_total / started if started else 0.0,
+                "last_wait_seconds": float(stats.get(b"last_wait_seconds", 0)),
+            }
+    return metrics
+
+
+@before_task_publish.connect
+def stamp_published_at(headers: Optional[dict] = None, **kwargs):
+    """Stamp outgoing task messages with their publish time to measure queue wait."""
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+@task_prerun.connect
+def record_queue_wait(task: Optional[Task] = None, **kwargs):
+    """Record how long a task waited in its queue before a worker started it."""
+    request = task.request if task else None
+    published_at = getattr(request, "published_at", None)
+    queue = (getattr(request, "delivery_info", None) or {}).get("routing_key")
+    if not published_at or not queue:
+        return
+
+    # a delayed task (countdown/eta) only starts waiting once it is due
+    wait = time.time() - published_at
+    if request.eta:
+        wait = min(wait, max(0.0, time.time() - _to_timestamp(request.eta)))
+
+    key = f"{QUEUE_METRICS_PREFIX}:{queue}"
+    with sync_redis.pipeline(transaction=False) as pipeline:
+        pipeline.hincrby(key, "started", 1)
+        pipeline.hincrbyfloat(key, "wait_seconds_total", wait)
+        pipeline.hset(key, "last_wait_seconds", wait)
+        pipeline.execute()
+
+
+def _to_timestamp(eta) -> float:
+    if isinstance(eta, str):
+        eta = datetime.fromisoformat(eta)
+    return eta.timestamp()
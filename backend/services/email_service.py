@@ -1,24 +1,69 @@
+import asyncio
+import threading
+from collections import Counter
+from email.utils import parseaddr
 from typing import Optional
 
+from celery.signals import worker_process_shutdown
 from fastapi import FastAPI
 from pydantic import EmailStr
 
 from configs import funiq_ai_config
+from database import RedisTokenBucket
+from utils.async_smtp import AsyncMailQueue, AsyncSMTPClient
 from utils.smtp import SMTPClient
 
 
+class SendRateLimitError(Exception):
+    """Raised when the send rate of a sender domain is exhausted."""
+
+    def __init__(self, domain: str, retry_after: float):
+        super().__init__(f"Send rate of '{domain}' exceeded, retry after {retry_after:.2f}s")
+        self.domain = domain
+        self.retry_after = retry_after
+
+
 class EmailService:
+    """
+    Email delivery shared by request handlers and Celery tasks.
+
+    The service is safe to share between the threads of an I/O-bound worker
+    pool: it is initialized once, and the pooled SMTP client hands out one connection per
+    concurrent send.
+    """
+
     def __init__(self):
+        self._init_lock = threading.Lock()
         self._client = None
+        self._async_client = None
+        self._async_queue = None
         self._default_send_from = None
+        self._send_rate_limiters: dict[str, RedisTokenBucket] = {}
 
     @property
     def is_initialized(self) -> bool:
         """Check if the email client is initialized."""
         return self._client is not None
 
+    @property
+    def is_async_enabled(self) -> bool:
+        """Check if emails are delivered in-process by the async backend."""
+        return self._async_queue is not None
+
     def init(self):
-        """Initialize the email client."""
+        """Initialize the email client; later calls are no-ops."""
+        with self._init_lock:
+            if self._client is None:
+                self._init()
+
+    @staticmethod
+    def _get_smtp_pool_size() -> int:
+        """Size the SMTP pool so every thread of a threads-pool worker can hold a connection."""
+        if funiq_ai_config.SMTP_POOL_SIZE and funiq_ai_config.CELERY_WORKER_POOL == "threads":
+            return max(funiq_ai_config.SMTP_POOL_SIZE, funiq_ai_config.CELERY_WORKER_CONCURRENCY)
+        return funiq_ai_config.SMTP_POOL_SIZE
+
+    def _init(self):
         if funiq_ai_config.MAIL_DEFAULT_SEND_FROM:
             self._default_send_from = funiq_ai_config.MAIL_DEFAULT_SEND_FROM
 
@@ -34,13 +79,33 @@ class EmailService:
             _from=funiq_ai_config.MAIL_DEFAULT_SEND_FROM,
             use_tls=funiq_ai_config.SMTP_USE_TLS,
             opportunistic_tls=funiq_ai_config.SMTP_OPPORTUNISTIC_TLS,
+            pool_size=self._get_smtp_pool_size(),
+            pool_idle_timeout=funiq_ai_config.SMTP_POOL_IDLE_TIMEOUT,
+            pool_keepalive_interval=funiq_ai_config.SMTP_POOL_KEEPALIVE_INTERVAL,
         )
+        self._send_rate_limiters = {
+            domain: RedisTokenBucket(prefix="mail_send_rate", rate=rate)
+            for domain, rate in funiq_ai_config.MAIL_SEND_RATE_LIMITS.items()
+        }
+        if funiq_ai_config.MAIL_DELIVERY_BACKEND == "async":
+            self._async_client = AsyncSMTPClient(
+                server=funiq_ai_config.SMTP_SERVER,
+                port=funiq_ai_config.SMTP_PORT,
+                username=funiq_ai_config.SMTP_USERNAME,
+                password=funiq_ai_config.SMTP_PASSWORD,
+                _from=funiq_ai_config.MAIL_DEFAULT_SEND_FROM,
+                use_tls=funiq_ai_config.SMTP_USE_TLS,
+                opportunistic_tls=funiq_ai_config.SMTP_OPPORTUNISTIC_TLS,
+                max_concurrency=funiq_ai_config.MAIL_ASYNC_CONCURRENCY,
+            )
+            self._async_queue = AsyncMailQueue(
+                lambda mail: self.send_async(**mail),
+                workers=funiq_ai_config.MAIL_ASYNC_CONCURRENCY,
+                max_size=funiq_ai_config.MAIL_ASYNC_QUEUE_SIZE,
+            )
 
-    def send(self, to: EmailStr, subject: str, html: str, from_: Optional[str] = None):
-        """Send an email."""
-        if not self._client:
-            raise ValueError("Email client is not initialized")
-
+    def _build_mail(self, to: EmailStr, subject: str, html: str, from_: Optional[str] = None) -> dict:
+        """Validate an email and build the message passed to the SMTP client."""
         if not from_:
             from_ = self._default_send_from
 
@@ -56,14 +121,133 @@ class EmailService:
         if not html:
             raise ValueError("Email content is not set")
 
-        self._client.send(
-            {
-                "from": from_,
-                "to": to,
-                "subject": subject,
-                "html": html,
-            }
-        )
+        return {
+            "from": from_,
+            "to": to,
+            "subject": subject,
+            "html": html,
+        }
+
+    def _get_send_rate_limiter(self, domain: str) -> Optional[RedisTokenBucket]:
+        """Return the send rate limiter of a sender domain, if its rate is limited."""
+        return self._send_rate_limiters.get(domain) or self._send_rate_limiters.get("*")
+
+    @staticmethod
+    def _get_sender_domain(mail: dict) -> str:
+        # the sender may carry a display name, e.g. 'no-reply <no-reply@funiq.ai>'
+        return parseaddr(mail["from"])[1].rpartition("@")[2].lower()
+
+    def send(self, to: EmailStr, subject: str, html: str, from_: Optional[str] = None):
+        """
+        Send an email.
+
+        :raises SendRateLimitError: If the sender domain's send rate is exhausted; the
+                                       email was not sent and can be retried later.
+        """
+        if not self._client:
+            raise ValueError("Email client is not initialized")
+
+        mail = self._build_mail(to, subject, html, from_)
+        domain = self._get_sender_domain(mail)
+        limiter = self._get_send_rate_limiter(domain)
+        if limiter and (retry_after := limiter.try_acquire(domain)):
+            raise SendRateLimitError(domain, retry_after)
+
+        self._client.send(mail)
+
+    def send_many(self, emails: list[dict]) -> list[Optional[Exception]]:
+        """
+        Send several emails over a single SMTP session.
+
+        Emails are sent in chunks no larger than the smallest send rate burst. Like ``send``,
+        the batch does not wait for an exhausted send rate: the emails from the first chunk
+        over the rate on are not sent, and get a ``SendRateLimitError`` to be deferred. An
+        unexpected error likewise fails only the emails not sent yet.
+
+        :param emails: Emails with ``to``, ``subject``, ``html`` and optional ``from_`` keys.
+        :return: Per-email error, aligned with ``emails``; None for delivered emails.
+        """
+        if not self._client:
+            raise ValueError("Email client is not initialized")
+
+        errors: list[Optional[Exception]] = [None] * len(emails)
+        mails, indexes = [], []
+        for index, email in enumerate(emails):
+            try:
+                mails.append(self._build_mail(**email))
+                indexes.append(index)
+            except ValueError as e:
+                errors[index] = e
+
+        chunk_size = min((limiter.capacity for limiter in self._send_rate_limiters.values()), default=len(mails))
+        chunk_size = max(1, int(chunk_size))
+        for start in range(0, len(mails), chunk_size):
+            chunk = mails[start : start + chunk_size]
+            try:
+                error = self._acquire_send_rate(chunk)
+                if error is None:
+                    chunk_errors = self._client.send_many(chunk)
+            except Exception as e:
+                error = e
+            if error is not None:
+                # the earlier chunks were sent, only this one and the next ones fail
+                for index in indexes[start:]:
+                    errors[index] = error
+                break
+            for index, chunk_error in zip(indexes[start : start + chunk_size], chunk_errors, strict=True):
+                errors[index] = chunk_error
+        return errors
+
+    def _acquire_send_rate(self, mails: list[dict]) -> Optional[SendRateLimitError]:
+        """Take the send rate tokens of a chunk of emails, or return the error of the first exhausted domain."""
+        for domain, count in Counter(self._get_sender_domain(mail) for mail in mails).items():
+            limiter = self._get_send_rate_limiter(domain)
+            if limiter and (retry_after := limiter.try_acquire(domain, count)):
+                return SendRateLimitError(domain, retry_after)
+        return None
+
+    async def send_async(self, to: EmailStr, subject: str, html: str, from_: Optional[str] = None):
+        """
+        Send an email without blocking the event loop.
+
+        :raises SendRateLimitError: If the sender domain's send rate is exhausted; the
+                                       email was not sent and can be retried later.
+        """
+        if not self._async_client:
+            raise ValueError("Async email client is not initialized")
+
+        mail = self._build_mail(to, subject, html, from_)
+        domain = self._get_sender_domain(mail)
+        limiter = self._get_send_rate_limiter(domain)
+        # the limiter's Redis client blocks, keep it off the event loop
+        if limiter and (retry_after := await asyncio.to_thread(limiter.try_acquire, domain)):
+            raise SendRateLimitError(domain, retry_after)
+
+        await self._async_client.send(mail)
+
+    async def enqueue(self, to: EmailStr, subject: str, html: str, from_: Optional[str] = None):
+        """Queue an email for in-process delivery by ``send_async``, waiting while the queue is full."""
+        if not self._async_queue:
+            raise ValueError("Async email client is not initialized")
+
+        # validate now, so the caller gets the error rather than the queue worker
+        self._build_mail(to, subject, html, from_)
+        await self._async_queue.put({"to": to, "subject": subject, "html": html, "from_": from_})
+
+    async def start(self):
+        """Start the in-process delivery workers of the async backend."""
+        if self._async_queue:
+            self._async_queue.start()
+
+    async def stop(self):
+        """Deliver queued emails and stop the async backend."""
+        if self._async_queue:
+            await self._async_queue.stop()
+
+    def close(self):
+        """Close pooled SMTP connections."""
+        if self._client:
+            self._client.close()
 
 
 # Initialize the email service in FastAPI
@@ -74,3 +258,9 @@ def init_email_service(app: FastAPI):
     """Initialize the email service with FastAPI."""
     email_service.init()
     app.state.email_service = email_service
+
+
+@worker_process_shutdown.connect
+def close_email_service(**kwargs):
+    """Close the SMTP connections pooled by a Celery worker process."""
+    email_service.close()
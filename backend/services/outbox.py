@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from celery import Celery
+from fastapi import FastAPI
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.outbox import OutboxMessage, OutboxMessageStatus
+from configs import funiq_ai_config
+from database import sync_engine, transactional_session
+from utils.datatime import utcnow
+
+# Session.info flag telling the after-commit hook that the transaction wrote outbox messages
+OUTBOX_PENDING_SESSION_KEY = "outbox_pending"
+
+
+def add_outbox_message(session: AsyncSession, task_name: str, kwargs: dict) -> OutboxMessage:
+    """
+    Queue a Celery task in the outbox as part of the session's transaction.
+
+    The task is published by the outbox relay once the transaction commits, and is dropped
+    if it rolls back.
+
+    :param session: Database session the message is written in.
+    :param task_name: Registered name of the Celery task.
+    :param kwargs: JSON-serializable keyword arguments of the task.
+    :return: The pending outbox message.
+    """
+    message = OutboxMessage(task_name=task_name, payload=kwargs)
+    session.add(message)
+    session.info[OUTBOX_PENDING_SESSION_KEY] = True
+    return message
+
+
+def add_dead_letter(task_name: str, kwargs: dict, error: str) -> OutboxMessage:
+    """
+    Record a task that failed permanently as a 'failed' outbox message, so it can be
+    inspected and replayed.
+
+    :param task_name: Registered name of the Celery task.
+    :param kwargs: JSON-serializable keyword arguments of the task.
+    :param error: Error the task failed with.
+    :return: The failed outbox message.
+    """
+    message = OutboxMessage(
+        task_name=task_name, payload=kwargs, status=OutboxMessageStatus.FAILED, last_error=error[:2048]
+    )
+    with Session(sync_engine) as session:
+        session.add(message)
+        session.commit()
+    return message
+
+
+def get_dead_letters(limit: int = 50) -> list[OutboxMessage]:
+    """
+    Get failed outbox messages, most recent first.
+
+    :param limit: Maximum number of messages to return.
+    :return: Failed outbox messages.
+    """
+    with Session(sync_engine) as session:
+        result = session.execute(
+            select(OutboxMessage)
+            .where(OutboxMessage.status == OutboxMessageStatus.FAILED)
+            .order_by(OutboxMessage.updated_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+def replay_dead_letters(ids: Optional[list[str]] = None) -> int:
+    """
+    Move failed outbox messages back to pending, so the relay publishes them again.
+
+    :param ids: IDs of the messages to replay; all failed messages if None.
+    :return: Number of replayed messages.
+    """
+    stmt = (
+        update(OutboxMessage)
+        .where(OutboxMessage.status == OutboxMessageStatus.FAILED)
+        .values(
+            status=OutboxMessageStatus.PENDING,
+            attempts=0,
+            available_at=utcnow().replace(tzinfo=None),
+            updated_at=utcnow().replace(tzinfo=None),
+        )
+    )
+    if ids is not None:
+        stmt = stmt.where(OutboxMessage.id.in_(ids))
+    with Session(sync_engine) as session:
+        result = session.execute(stmt)
+        session.commit()
+        return result.rowcount
+
+
+class OutboxRelay:
+    """
+    Background relay publishing pending outbox messages to the Celery broker.
+
+    Messages are claimed in batches with ``SELECT ... FOR UPDATE SKIP LOCKED``, so several
+    processes can relay the same table. Published messages are deleted; a failed publish is
+    retried with exponential backoff until ``max_attempts`` is reached, after which the
+    message is kept with the 'failed' status. Delivery is at-least-once.
+
+    The 'failed' messages double as the dead-letter queue of the email tasks, see
+    ``add_dead_letter`` and ``cli outbox replay``.
+    """
+
+    def __init__(self):
+        self._celery_app: Optional[Celery] = None
+        self.batch_size = 100
+        self.poll_interval = 1.0
+        self.max_attempts = 10
+        self.retry_backoff = 2.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_initialized(self) -> bool:
+        """Check if the relay is bound to a Celery app."""
+        return self._celery_app is not None
+
+    def init(self, celery_app: Celery):
+        """Bind the relay to a Celery app and load its settings."""
+        self._celery_app = celery_app
+        self.batch_size = funiq_ai_config.OUTBOX_RELAY_BATCH_SIZE
+        self.poll_interval = funiq_ai_config.OUTBOX_RELAY_POLL_INTERVAL
+        self.max_attempts = funiq_ai_config.OUTBOX_RELAY_MAX_ATTEMPTS
+        self.retry_backoff = funiq_ai_config.OUTBOX_RELAY_RETRY_BACKOFF
+
+    def _publish(self, messages: list[tuple[str, dict]]) -> list[Optional[Exception]]:
+        """
+        Publish tasks to the broker over a single producer connection.
+
+        :param messages: (task name, kwargs) pairs to publish.
+        :return: Per-message error, aligned with ``messages``; None for published messages.
+        """
+        errors: list[Optional[Exception]] = []
+        with self._celery_app.producer_or_acquire() as producer:
+            for task_name, kwargs in messages:
+                try:
+                    self._celery_app.tasks[task_name].apply_async(kwargs=kwargs, producer=producer)
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(e)
+        return errors
+
+    async def relay_once(self) -> int:
+        """
+        Publish one batch of due outbox messages.
+
+        :return: Number of messages claimed, published or not.
+        """
+        if not self._celery_app:
+            raise ValueError("Outbox relay is not initialized")
+
+        async with transactional_session() as session:
+            now = utcnow().replace(tzinfo=None)
+            result = await session.execute(
+                select(OutboxMessage)
+                .where(OutboxMessage.status == OutboxMessageStatus.PENDING, OutboxMessage.available_at <= now)
+                .order_by(OutboxMessage.available_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = result.scalars().all()
+            if not messages:
+                return 0
+
+            # the broker client blocks, keep it off the event loop
+            try:
+                errors = await asyncio.to_thread(self._publish, [(m.task_name, m.payload) for m in messages])
+            except Exception as e:
+                errors = [e] * len(messages)
+
+            published_ids = []
+            for message, error in zip(messages, errors, strict=True):
+                if error is None:
+                    published_ids.append(message.id)
+                    continue
+
+                message.attempts += 1
+                message.last_error = str(error)[:2048]
+                if message.attempts >= self.max_attempts:
+                    message.status = OutboxMessageStatus.FAILED
+                    logging.error(f"Giving up publishing outbox message {message.id} ({message.task_name}): {error!s}")
+                else:
+                    delay = self.retry_backoff * 2 ** (message.attempts - 1)
+                    message.available_at = now + timedelta(seconds=delay)
+                    logging.warning(
+                        f"Failed to publish outbox message {message.id}, retrying in {delay:.0f}s: {error!s}"
+                    )
+
+            if published_ids:
+                await session.execute(
+                    delete(OutboxMessage)
+                    .where(OutboxMessage.id.in_(published_ids))
+                    .execution_options(synchronize_session=False)
+                )
+
+        return len(messages)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                relayed = await self.relay_once()
+            except Exception as e:
+                logging.exception(f"Outbox relay failed: {e!s}")
+                relayed = 0
+
+            # a full batch means more messages are probably waiting
+            if relayed >= self.batch_size:
+                continue
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+
+    def wake(self):
+        """Wake the relay up after outbox messages were committed; safe to call from any thread."""
+        if self._task and self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self):
+        """Start relaying in the background of the running event loop."""
+        if not self._celery_app or self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the relay; unpublished messages stay in the outbox."""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+outbox_relay = OutboxRelay()
+
+
+def init_outbox_relay(app: FastAPI):
+    """Bind the outbox relay to the Celery app of FastAPI, if enabled."""
+    if funiq_ai_config.OUTBOX_RELAY_ENABLED:
+        outbox_relay.init(app.state.celery)
+    else:
+        logging.warning("The outbox relay of the web process is disabled, run 'cli outbox relay' to publish tasks")
+    app.state.outbox_relay = outbox_relay
+
+
+async def run_outbox_relay(celery_app: Celery):
+    """
+    Run the outbox relay until cancelled, outside of the web process (see ``cli outbox relay``).
+
+    Without the after-commit wake-ups of the web process, new messages are picked up on the
+    next poll, every OUTBOX_RELAY_POLL_INTERVAL seconds.
+
+    :param celery_app: Celery app the tasks are published with.
+    """
+    outbox_relay.init(celery_app)
+    await outbox_relay.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await outbox_relay.stop()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_outbox_relay(session: Session):
+    """Publish outbox messages as soon as the transaction that wrote them commits."""
+    if session.info.pop(OUTBOX_PENDING_SESSION_KEY, False):
+        outbox_relay.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_outbox_flag(session: Session):
+    session.info.pop(OUTBOX_PENDING_SESSION_KEY, None)
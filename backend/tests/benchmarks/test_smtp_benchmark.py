@@ -0,0 +1,46 @@
+import socket
+
+import pytest
+
+from utils.smtp import SMTPClient
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+MESSAGES_PER_ROUND = 50
+
+
+class _DiscardHandler:
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture(scope="module")
+def smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    controller = aiosmtpd_controller.Controller(_DiscardHandler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller.hostname, port
+    controller.stop()
+
+
+def _send_round(client: SMTPClient):
+    mail = {"to": "recipient@example.com", "subject": "Benchmark", "html": "<p>Benchmark</p>"}
+    for _ in range(MESSAGES_PER_ROUND):
+        client.send(mail)
+
+
+@pytest.mark.parametrize("pool_size", [0, 1], ids=["connection-per-message", "pooled"])
+def test_smtp_send_throughput(benchmark, smtp_server, pool_size):
+    host, port = smtp_server
+    client = SMTPClient(
+        server=host, port=port, username="", password="", _from="sender@example.com", pool_size=pool_size
+    )
+    benchmark.extra_info["messages_per_round"] = MESSAGES_PER_ROUND
+    benchmark.pedantic(_send_round, args=(client,), rounds=5, warmup_rounds=1)
+    client.close()
+
+    if benchmark.stats:
+        benchmark.extra_info["messages_per_second"] = MESSAGES_PER_ROUND / benchmark.stats.stats.mean
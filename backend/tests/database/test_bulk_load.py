@@ -0,0 +1,73 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.models.account import Account, AccountStatus
+from database.models import iter_chunks
+
+
+def mock_session(driver: str):
+    connection = MagicMock()
+    connection.dialect = asyncpg_dialect() if driver == "asyncpg" else MagicMock(driver=driver)
+    raw_connection = MagicMock()
+    raw_connection.driver_connection.copy_records_to_table = AsyncMock()
+    connection.get_raw_connection = AsyncMock(return_value=raw_connection)
+
+    session = MagicMock()
+    session.info = {}
+    session.connection = AsyncMock(return_value=connection)
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+    return session, raw_connection.driver_connection
+
+
+def account_rows(count: int):
+    for i in range(count):
+        yield {"name": f"user{i}", "email": f"user{i}@example.com"}
+
+
+async def async_account_rows(count: int):
+    for row in account_rows(count):
+        yield row
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("rows", [account_rows, async_account_rows], ids=["iterable", "async-iterable"])
+async def test_iter_chunks(rows):
+    chunks = [chunk async for chunk in iter_chunks(rows(5), 2)]
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_copies_chunks_with_defaults():
+    session, driver_connection = mock_session("asyncpg")
+    progress = MagicMock()
+
+    loaded = await Account.bulk_load(session, async_account_rows(5), chunk_size=2, progress=progress)
+
+    assert loaded == 5
+    assert driver_connection.copy_records_to_table.await_count == 3
+    assert [call.args[0] for call in progress.call_args_list] == [2, 4, 5]
+    session.commit.assert_awaited_once()
+
+    call = driver_connection.copy_records_to_table.await_args_list[0]
+    assert call.args == ("accounts",)
+    record = dict(zip(call.kwargs["columns"], call.kwargs["records"][0], strict=True))
+    assert record["name"] == "user0"
+    assert record["status"] == AccountStatus.ACTIVE
+    assert record["id"] is not None
+    assert record["created_at"] is not None
+    assert "password_hash" not in record
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_falls_back_to_chunked_insert():
+    session, driver_connection = mock_session("psycopg")
+
+    loaded = await Account.bulk_load(session, account_rows(3), chunk_size=2)
+
+    assert loaded == 3
+    driver_connection.copy_records_to_table.assert_not_awaited()
+    assert [len(call.args[1]) for call in session.execute.await_args_list] == [2, 1]
@@ -0,0 +1,95 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.models.account import Account, OAuthProvider
+
+
+def mock_session(returned=None, rowcount=0):
+    result = MagicMock()
+    result.all.return_value = returned or []
+    result.rowcount = rowcount
+    session = MagicMock()
+    session.info = {}
+    session.execute = AsyncMock(return_value=result)
+    session.commit = AsyncMock()
+    return session
+
+
+def compiled_sql(session, call_index=0) -> str:
+    stmt = session.execute.await_args_list[call_index].args[0]
+    return str(stmt.compile(dialect=asyncpg_dialect()))
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_by_pk_sends_one_statement():
+    session = mock_session(rowcount=2)
+    rows = [{"id": uuid.uuid4(), "language": "en"}, {"id": uuid.uuid4(), "language": "zh_CN"}]
+
+    assert await Account.bulk_update_by_pk(session, rows) == 2
+
+    session.execute.assert_awaited_once()
+    sql = compiled_sql(session)
+    assert "UPDATE accounts SET language=updates.language" in sql
+    assert "FROM (VALUES" in sql
+    assert "WHERE accounts.id = updates.id" in sql
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_by_pk_returning_and_chunks():
+    session = mock_session(returned=[("row",)])
+    rows = [{"id": uuid.uuid4(), "language": "en"} for _ in range(3)]
+
+    with patch("database.models.POSTGRES_MAX_PARAMETERS", 4):
+        returned = await Account.bulk_update_by_pk(session, rows, returning=[Account.id])
+
+    # 2 columns per row and 4 parameters per statement
+    assert session.execute.await_count == 2
+    assert returned == [("row",), ("row",)]
+    assert "RETURNING accounts.id" in compiled_sql(session)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [{"language": "en"}],
+        [{"id": uuid.uuid4()}],
+        [{"id": uuid.uuid4(), "language": "en"}, {"id": uuid.uuid4(), "name": "user"}],
+    ],
+    ids=["without-pk", "nothing-to-update", "different-keys"],
+)
+async def test_bulk_update_by_pk_rejects_invalid_rows(rows):
+    with pytest.raises(ValueError):
+        await Account.bulk_update_by_pk(mock_session(), rows)
+
+
+@pytest.mark.asyncio
+async def test_upsert_updates_on_conflict():
+    session = mock_session(returned=[(uuid.uuid4(),)])
+    row = {"provider_name": "google", "provider_id": "1", "access_token": "token", "account_id": uuid.uuid4()}
+
+    affected = await OAuthProvider.upsert(
+        session, [row], conflict_cols=["provider_name", "provider_id"], update_cols=["access_token"]
+    )
+
+    assert affected == 1
+    assert session.execute.await_args.args[1] == [row]
+    sql = compiled_sql(session)
+    assert "ON CONFLICT (provider_name, provider_id) DO UPDATE SET" in sql
+    assert "access_token = excluded.access_token" in sql
+    assert "updated_at = excluded.updated_at" in sql
+    assert "account_id = excluded.account_id" not in sql
+    assert "RETURNING o_auth_providers.id" in sql
+
+
+@pytest.mark.asyncio
+async def test_upsert_without_update_cols_does_nothing_on_conflict():
+    session = mock_session()
+
+    await Account.upsert(session, [{"name": "user", "email": "user@example.com"}], conflict_cols=["email"], update_cols=[])
+
+    assert "ON CONFLICT (email) DO NOTHING" in compiled_sql(session)
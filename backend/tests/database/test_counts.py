@@ -0,0 +1,62 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.models.account import TenantUserRole, User
+
+
+def mock_session(*scalars):
+    session = MagicMock()
+    results = []
+    for scalar in scalars:
+        result = MagicMock()
+        result.scalar_one.return_value = scalar
+        result.scalar_one_or_none.return_value = scalar
+        results.append(result)
+    session.execute = AsyncMock(side_effect=results)
+    return session
+
+
+def compiled_sql(session, call_index=0) -> str:
+    stmt = session.execute.await_args_list[call_index].args[0]
+    return " ".join(str(stmt.compile(dialect=asyncpg_dialect())).split())
+
+
+@pytest.mark.asyncio
+async def test_exists_selects_exists():
+    session = mock_session(True)
+
+    assert await User.exists(session, User.role == TenantUserRole.OWNER, tenant_id="tenant") is True
+
+    sql = compiled_sql(session)
+    assert sql.startswith("SELECT EXISTS (SELECT")
+    assert "FROM users WHERE users.role = $2::VARCHAR AND users.tenant_id = $3::UUID LIMIT" in sql
+
+
+@pytest.mark.asyncio
+async def test_count_is_bound_to_model():
+    session = mock_session(3)
+
+    assert await User.count(session, tenant_id="tenant") == 3
+
+    assert compiled_sql(session) == "SELECT count(*) AS count_1 FROM users WHERE users.tenant_id = $1::UUID"
+
+
+@pytest.mark.asyncio
+async def test_estimated_count_reads_planner_statistics():
+    session = mock_session(1200)
+
+    assert await User.estimated_count(session) == 1200
+
+    assert "pg_class" in str(session.execute.await_args.args[0])
+    assert session.execute.await_args.args[1] == {"table_name": "users"}
+
+
+@pytest.mark.asyncio
+async def test_estimated_count_falls_back_to_count_before_analyze():
+    session = mock_session(-1, 7)
+
+    assert await User.estimated_count(session) == 7
+
+    assert "count(*)" in compiled_sql(session, 1)
@@ -0,0 +1,157 @@
+import asyncio
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.models.account import Account
+from database.entity_cache import EntityCache, _collect_invalidations, _discard_invalidations, _invalidate_after_commit
+from database.models import DBBase
+
+
+def make_account(**kwargs) -> Account:
+    account = Account(
+        id=uuid.uuid4(), name="alice", email="alice@example.com", last_login_at=datetime(2024, 1, 2, 3, 4, 5), **kwargs
+    )
+    # a loaded row has every column set
+    for attr in sa_inspect(Account).column_attrs:
+        if attr.key not in sa_inspect(account).dict:
+            setattr(account, attr.key, None)
+    make_transient_to_detached(account)
+    return account
+
+
+@pytest.fixture
+def redis():
+    redis = MagicMock()
+    redis.get = AsyncMock(return_value=None)
+    # commands are queued synchronously on a pipeline, only execute is awaited
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis
+
+
+@pytest.fixture
+def cache(redis):
+    return EntityCache(redis, MagicMock(), ttl=60)
+
+
+@pytest.fixture
+def session():
+    session = MagicMock(info={}, identity_map={})
+    session.merge = AsyncMock(side_effect=lambda obj, load: obj)
+    return session
+
+
+def test_codec_round_trip(cache):
+    account = make_account()
+    codec = cache.codec(Account)
+
+    restored = codec.loads(codec.dumps(account))
+
+    assert sa_inspect(restored).detached
+    assert (restored.id, restored.email, restored.last_login_at) == (account.id, account.email, account.last_login_at)
+
+
+async def test_secrets_are_not_cached(cache, redis, session):
+    account = make_account(password_hash="$2b$12$secret")
+
+    with patch.object(Account, "first", AsyncMock(return_value=account)):
+        await cache.get(session, Account, email=account.email)
+
+    pipe = redis.pipeline.return_value.__aenter__.return_value
+    payloads = {call.args[1] for call in pipe.set.call_args_list}
+    assert all("secret" not in payload for payload in payloads)
+    restored = cache.codec(Account).loads(payloads.pop())
+    assert "password_hash" in sa_inspect(restored).unloaded
+
+
+async def test_hit_is_merged_without_a_query(cache, redis, session):
+    account = make_account()
+    redis.get.return_value = cache.codec(Account).dumps(account).encode()
+
+    with patch.object(Account, "first") as first:
+        cached = await cache.get(session, Account, email=account.email)
+
+    first.assert_not_called()
+    assert cached.id == account.id
+    assert session.merge.await_args.kwargs == {"load": False}
+
+
+async def test_miss_fills_redis_and_local_cache(cache, redis, session):
+    account = make_account()
+
+    with patch.object(Account, "first", AsyncMock(return_value=account)):
+        assert await cache.get(session, Account, email=account.email) is account
+        await cache.get(session, Account, id=account.id)
+
+    pipe = redis.pipeline.return_value.__aenter__.return_value
+    assert {call.args[0] for call in pipe.set.call_args_list} == cache.codec(Account).keys_of(account)
+    # the second lookup is served by the in-process LRU
+    redis.get.assert_awaited_once()
+
+
+async def test_replica_reads_do_not_fill(cache, redis, session):
+    with (
+        patch.object(Account, "first", AsyncMock(return_value=make_account())),
+        patch("database.entity_cache.reads_from_replica", return_value=True),
+    ):
+        await cache.get(session, Account, email="alice@example.com")
+
+    redis.pipeline.assert_not_called()
+
+
+async def test_only_cache_keys_are_accepted(cache, session):
+    with pytest.raises(ValueError):
+        await cache.get(session, Account, name="alice")
+
+
+def test_commit_invalidates_old_and_new_keys(cache):
+    session = Session()
+    account = make_account()
+    session.add(account)
+    account.email = "bob@example.com"
+    codec = cache.codec(Account)
+
+    with patch.object(DBBase, "entity_cache", cache):
+        _collect_invalidations(sa_inspect(Account), None, account)
+        _invalidate_after_commit(session)
+
+    cache.sync_redis.delete.assert_called_once()
+    assert set(cache.sync_redis.delete.call_args.args) == {
+        codec.key("id", account.id),
+        codec.key("email", "alice@example.com"),
+        codec.key("email", "bob@example.com"),
+    }
+
+
+async def test_commit_on_the_event_loop_deletes_in_a_task(cache, redis):
+    redis.delete = AsyncMock()
+    session = Session()
+    account = make_account()
+    session.add(account)
+
+    with patch.object(DBBase, "entity_cache", cache):
+        _collect_invalidations(sa_inspect(Account), None, account)
+        _invalidate_after_commit(session)
+        await asyncio.gather(*cache._pending)
+
+    cache.sync_redis.delete.assert_not_called()
+    assert set(redis.delete.await_args.args) == cache.codec(Account).keys_of(account)
+
+
+def test_rollback_discards_invalidations(cache):
+    session = Session()
+    account = make_account()
+    session.add(account)
+
+    with patch.object(DBBase, "entity_cache", cache):
+        _collect_invalidations(sa_inspect(Account), None, account)
+        _discard_invalidations(session)
+        _invalidate_after_commit(session)
+
+    cache.sync_redis.delete.assert_not_called()
@@ -0,0 +1,30 @@
+import uuid
+
+import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.account.queries import tenant_user_by_account
+from database import hot_queries, hot_query
+
+
+def test_hot_queries_are_registered_by_name():
+    assert hot_queries["tenant_user_by_account"] is tenant_user_by_account
+
+    with pytest.raises(ValueError):
+        hot_query("tenant_user_by_account")(lambda: None)
+
+
+def test_hot_query_binds_new_parameters_to_the_cached_statement():
+    tenant_id, account_id = uuid.uuid4(), uuid.uuid4()
+    first, second = tenant_user_by_account(uuid.uuid4(), uuid.uuid4()), tenant_user_by_account(tenant_id, account_id)
+
+    first_key, second_key = first._generate_cache_key(), second._generate_cache_key()
+    assert first_key.key == second_key.key
+
+    # the SQL compiled for the first call runs the second one with its own parameters
+    compiled = first.compile(dialect=asyncpg_dialect(), cache_key=first_key)
+    assert "WHERE users.tenant_id = $1::UUID AND users.account_id = $2::UUID" in str(compiled)
+    assert compiled.construct_params(extracted_parameters=second_key.bindparams) == {
+        "tenant_id_1": tenant_id,
+        "account_id_1": account_id,
+    }
@@ -0,0 +1,76 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+from app.models.account import User
+from database.models import decode_cursor, encode_cursor, uuid7
+
+
+def make_users(count: int) -> list[User]:
+    created_at = datetime(2026, 1, 1)
+    return [User(id=uuid7(), created_at=created_at + timedelta(seconds=i)) for i in range(count)]
+
+
+def mock_session(items):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = items
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def compiled_sql(session) -> str:
+    stmt = session.execute.await_args.args[0]
+    return " ".join(str(stmt.compile(dialect=asyncpg_dialect())).split())
+
+
+def test_uuid7_is_time_ordered():
+    first = uuid7()
+    time.sleep(0.002)
+    second = uuid7()
+
+    assert first.version == second.version == 7
+    assert first.variant == uuid.RFC_4122
+    assert first < second
+
+
+def test_cursor_round_trip():
+    user = make_users(1)[0]
+
+    assert decode_cursor(encode_cursor(user), uuid.UUID) == (user.created_at, user.id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WyJ4Il0", ""])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, uuid.UUID)
+
+
+@pytest.mark.asyncio
+async def test_paginate_first_page_returns_next_cursor():
+    users = make_users(3)
+    session = mock_session(users)
+
+    items, next_cursor = await User.paginate(session, tenant_id="tenant", limit=2)
+
+    assert items == users[:2]
+    assert decode_cursor(next_cursor, uuid.UUID) == (users[1].created_at, users[1].id)
+    sql = compiled_sql(session)
+    assert "ORDER BY users.created_at, users.id LIMIT $2::INTEGER" in sql
+    assert "(users.created_at, users.id) >" not in sql
+
+
+@pytest.mark.asyncio
+async def test_paginate_seeks_after_cursor_on_last_page():
+    users = make_users(3)
+    session = mock_session(users[2:])
+
+    items, next_cursor = await User.paginate(session, cursor=encode_cursor(users[1]), limit=2)
+
+    assert items == users[2:]
+    assert next_cursor is None
+    assert "WHERE (users.created_at, users.id) > ($1::TIMESTAMP WITHOUT TIME ZONE, $2::UUID)" in compiled_sql(session)
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from redis.asyncio.connection import ConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from database.pool_metrics import (
+    Histogram,
+    InstrumentedBlockingConnectionPool,
+    PoolMetrics,
+    InstrumentedQueuePool,
+    get_pool_metrics,
+    instrument_engine,
+    pool_metrics,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_registry():
+    registered = dict(pool_metrics)
+    yield
+    pool_metrics.clear()
+    pool_metrics.update(registered)
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram(buckets=(1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.to_dict() == {"count": 4, "sum_ms": 56.5, "buckets": {"1": 2, "10": 3, "+Inf": 4}}
+
+
+def test_counters_add_up_across_threads():
+    metrics = PoolMetrics("test", dict)
+
+    def observe(_):
+        for _ in range(1000):
+            metrics.observe_checkout(0, overflow=True)
+            metrics.increment("invalidations")
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(observe, range(8)))
+
+    snapshot = metrics.snapshot()
+    assert (snapshot["checkouts"], snapshot["overflow_connects"], snapshot["invalidations"]) == (8000, 8000, 8000)
+    assert snapshot["checkout_wait_ms"]["count"] == 8000
+
+
+def test_engine_pool_reports_checkouts_overflow_and_timeouts():
+    engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.01)
+    metrics = instrument_engine(engine, "test")
+
+    first, second = engine.connect(), engine.connect()
+    first.execute(text("SELECT 1"))
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    snapshot = get_pool_metrics()["test"]
+    assert snapshot["checked_out"] == 2
+    assert snapshot["overflow"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["overflow_connects"] == 1
+    assert snapshot["connects"] == 2
+    assert snapshot["connect_latency_ms"]["count"] == 2
+    assert snapshot["timeouts"] == 1
+
+    first.close()
+    second.close()
+    assert metrics.snapshot()["idle"] == 1
+
+    # the pool replacing the disposed one keeps reporting
+    engine.dispose()
+    engine.connect().close()
+    assert metrics.checkouts == 3
+
+
+def test_slow_checkouts_are_logged():
+    engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool)
+    instrument_engine(engine, "test")
+
+    with patch("database.pool_metrics.funiq_ai_config") as config, patch("database.pool_metrics.logger") as logger:
+        config.POOL_CHECKOUT_WAIT_WARNING_MS = 0
+        engine.connect().close()
+
+    logger.bind.assert_called_once()
+    assert logger.bind.call_args.kwargs["pool"] == "test"
+    assert logger.bind.return_value.log.call_args.args[0] == "WARNING"
+
+
+@pytest.mark.asyncio
+async def test_redis_pool_reports_checkouts_and_timeouts():
+    pool = InstrumentedBlockingConnectionPool(max_connections=1, timeout=0.01, metrics_name="test_redis")
+
+    with patch.object(ConnectionPool, "ensure_connection", AsyncMock()):
+        connection = await pool.get_connection()
+        with pytest.raises(RedisConnectionError):
+            await pool.get_connection()
+
+    snapshot = get_pool_metrics()["test_redis"]
+    assert snapshot["size"] == 1
+    assert snapshot["checked_out"] == 1
+    assert snapshot["checkouts"] == 1
+    assert snapshot["connects"] == 1
+    assert snapshot["timeouts"] == 1
+
+    await pool.release(connection)
+    assert pool.metrics.snapshot()["idle"] == 1
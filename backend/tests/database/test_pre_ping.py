@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from database.pool_metrics import InstrumentedQueuePool, instrument_engine, pool_metrics
+from database.pre_ping import DisconnectRetrySession, install_idle_pre_ping
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=1)
+    instrument_engine(engine, "test")
+    install_idle_pre_ping(engine, idle_seconds=30)
+    engine.dialect.do_ping = MagicMock()
+    yield engine
+    pool_metrics.pop("test")
+
+
+def checkout(engine):
+    engine.connect().close()
+
+
+def test_recently_used_connections_are_not_pinged(engine):
+    checkout(engine)
+    checkout(engine)
+
+    engine.dialect.do_ping.assert_not_called()
+    assert engine.pool.metrics.pre_pings_skipped == 1
+
+
+def test_idle_connections_are_pinged(engine):
+    checkout(engine)
+
+    with patch("database.pre_ping.time.monotonic", return_value=10**9):
+        checkout(engine)
+
+    engine.dialect.do_ping.assert_called_once()
+    assert engine.pool.metrics.pre_pings == 1
+
+
+def test_connections_are_pinged_after_a_disconnect(engine):
+    checkout(engine)
+    engine.dialect.dispatch.handle_error(MagicMock(is_disconnect=True))
+
+    checkout(engine)
+
+    engine.dialect.do_ping.assert_called_once()
+
+
+def test_failed_ping_replaces_the_connection(engine):
+    checkout(engine)
+    engine.dialect.do_ping.side_effect = engine.dialect.loaded_dbapi.OperationalError("closed")
+    engine.dialect.is_disconnect = MagicMock(return_value=True)
+
+    with patch("database.pre_ping.time.monotonic", return_value=10**9):
+        checkout(engine)
+
+    assert engine.pool.metrics.connects == 2
+
+
+def lost_connection() -> DBAPIError:
+    return DBAPIError("SELECT 1", {}, Exception("connection closed"), connection_invalidated=True)
+
+
+def test_first_statement_is_retried_once_on_disconnect(engine):
+    session = DisconnectRetrySession(bind=engine)
+
+    with patch.object(Session, "execute", side_effect=[lost_connection(), "result"]) as execute:
+        assert session.execute(text("SELECT 1")) == "result"
+
+    assert execute.call_count == 2
+
+
+def test_later_statements_are_not_retried(engine):
+    session = DisconnectRetrySession(bind=engine)
+    session.execute(text("SELECT 1"))
+
+    with patch.object(Session, "execute", side_effect=[lost_connection(), "result"]):
+        with pytest.raises(DBAPIError):
+            session.execute(text("SELECT 1"))
@@ -0,0 +1,139 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.account import Account, Tenant, User
+from database.models import DBBase
+from database.query_cache import QueryCache, cached_query
+from utils.json import json_loads
+
+engine = create_engine("sqlite://")
+DBBase.metadata.create_all(engine, tables=[Tenant.__table__, Account.__table__, User.__table__])
+
+
+class TenantNames(BaseModel):
+    names: list[str]
+
+
+@pytest.fixture
+def cache():
+    redis = MagicMock()
+    # commands are queued synchronously on a pipeline, only execute is awaited
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[None, {b"users": b"3", b"tenants": b"1"}])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    redis.set = AsyncMock()
+    cache = QueryCache(redis, MagicMock(), ttl=60)
+    with patch.object(QueryCache, "current", cache):
+        yield cache
+
+
+@pytest.fixture
+def session():
+    with Session(engine) as session:
+        yield session
+
+
+@cached_query()
+async def tenant_names(session: Session, account_id: uuid.UUID) -> TenantNames:
+    users = session.scalars(select(User).options(joinedload(User.tenant)).where(User.account_id == account_id))
+    return TenantNames(names=[user.tenant.name for user in users])
+
+
+def cached_entry(cache: QueryCache) -> str:
+    return cache.redis.set.await_args.args[1]
+
+
+async def test_miss_is_tagged_with_the_tables_read(cache, session):
+    assert await tenant_names(session, uuid.uuid4()) == TenantNames(names=[])
+
+    pipe = cache.redis.pipeline.return_value.__aenter__.return_value
+    pipe.get.assert_called_once_with(cache.redis.set.await_args.args[0])
+    pipe.hgetall.assert_called_once_with("query_cache:versions")
+    assert cache.redis.set.await_args.kwargs == {"ex": 60}
+    assert json_loads(cached_entry(cache)) == {"tags": {"tenants": 1, "users": 3}, "value": {"names": []}}
+
+
+async def test_hit_skips_the_call(cache, session):
+    await tenant_names(session, uuid.uuid4())
+    pipe = cache.redis.pipeline.return_value.__aenter__.return_value
+    pipe.execute.return_value[0] = cached_entry(cache)
+    cache.redis.set.reset_mock()
+
+    with patch.object(Session, "scalars") as scalars:
+        assert await tenant_names(session, uuid.uuid4()) == TenantNames(names=[])
+
+    scalars.assert_not_called()
+    cache.redis.set.assert_not_called()
+
+
+async def test_entry_is_stale_once_a_table_version_moved(cache, session):
+    await tenant_names(session, uuid.uuid4())
+    pipe = cache.redis.pipeline.return_value.__aenter__.return_value
+    pipe.execute.return_value = [cached_entry(cache), {b"users": b"4", b"tenants": b"1"}]
+
+    with patch.object(Session, "scalars", return_value=[]) as scalars:
+        await tenant_names(session, uuid.uuid4())
+
+    scalars.assert_called_once()
+
+
+def test_arguments_are_part_of_the_key(cache):
+    account_id = uuid.uuid4()
+
+    assert cache.key("m", {"account_id": account_id, "limit": 20}) == cache.key(
+        "m", {"limit": 20, "account_id": account_id}
+    )
+    assert cache.key("m", {"account_id": account_id}) != cache.key("m", {"account_id": uuid.uuid4()})
+
+
+def test_commit_bumps_the_tables_written(cache, session):
+    session.add(Tenant(name="acme"))
+    session.flush()
+    session.execute(update(Account).where(Account.email == "alice@example.com").values(name="alice"))
+
+    session.commit()
+
+    pipe = cache.sync_redis.pipeline.return_value.__enter__.return_value
+    assert sorted(call.args for call in pipe.hincrby.call_args_list) == [
+        ("query_cache:versions", "accounts", 1),
+        ("query_cache:versions", "tenants", 1),
+    ]
+    pipe.execute.assert_called_once()
+
+
+async def test_commit_on_the_event_loop_bumps_in_a_task(cache, session):
+    session.add(Tenant(name="acme"))
+    session.flush()
+
+    session.commit()
+    await asyncio.gather(*cache._pending)
+
+    cache.sync_redis.pipeline.assert_not_called()
+    pipe = cache.redis.pipeline.return_value.__aenter__.return_value
+    pipe.hincrby.assert_called_once_with("query_cache:versions", "tenants", 1)
+    pipe.execute.assert_awaited()
+
+
+def test_rollback_discards_the_writes(cache, session):
+    session.add(Tenant(name="acme"))
+    session.flush()
+
+    session.rollback()
+    session.commit()
+
+    cache.sync_redis.pipeline.assert_not_called()
+
+
+async def test_results_depending_on_uncommitted_writes_are_not_cached(cache, session):
+    session.add(Tenant(name="acme"))
+    session.flush()
+
+    await tenant_names(session, uuid.uuid4())
+
+    cache.redis.set.assert_not_called()
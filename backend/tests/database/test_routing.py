@@ -0,0 +1,135 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine, lambda_stmt, select, update
+from sqlalchemy.exc import InvalidRequestError
+
+from app.models.account import Account
+from database.routing import (
+    PRIMARY_UNTIL_SESSION_KEY,
+    READ_ONLY_SESSION_KEY,
+    ReplicaSet,
+    RoutingSession,
+    _discard_uncommitted_write,
+    _start_sticky_primary_window,
+    mark_read_only,
+    read_only_engine,
+)
+
+primary = create_engine("sqlite://")
+replica_a = create_engine("sqlite://")
+replica_b = create_engine("sqlite://")
+# binds of read-only sessions
+read_only_primary, read_only_a, read_only_b = map(read_only_engine, (primary, replica_a, replica_b))
+
+
+@pytest.fixture
+def replicas():
+    replica_set = ReplicaSet([MagicMock(sync_engine=replica_a), MagicMock(sync_engine=replica_b)], eject_seconds=30)
+    with patch.object(RoutingSession, "replicas", replica_set):
+        yield replica_set
+
+
+def make_session(read_only=True) -> RoutingSession:
+    session = RoutingSession(bind=primary)
+    if read_only:
+        mark_read_only(session)
+    return session
+
+
+def test_without_replicas_everything_uses_primary():
+    assert make_session().get_bind(clause=select(Account)) is read_only_primary
+
+
+def test_read_only_sessions_read_from_replicas_round_robin(replicas):
+    first, second = make_session(), make_session()
+
+    assert first.get_bind(clause=select(Account)) is read_only_a
+    # a transaction keeps reading from the same replica
+    assert first.get_bind(clause=select(Account)) is read_only_a
+    assert second.get_bind(clause=select(Account)) is read_only_b
+
+
+def test_lambda_statements_are_routed_by_their_statement(replicas):
+    session = make_session()
+
+    assert session.get_bind(clause=lambda_stmt(lambda: select(Account))) is read_only_a
+    assert session.get_bind(clause=lambda_stmt(lambda: update(Account).values(language="en"))) is read_only_primary
+
+
+def test_unmarked_sessions_read_from_primary(replicas):
+    session = make_session(read_only=False)
+
+    assert session.get_bind(clause=select(Account)) is primary
+    with patch.object(RoutingSession, "reads_outside_writes", True):
+        assert session.get_bind(clause=select(Account)) is replica_a
+
+
+def test_writes_and_locking_reads_use_primary(replicas):
+    session = make_session()
+
+    assert session.get_bind(clause=select(Account).with_for_update()) is read_only_primary
+    assert session.get_bind(clause=update(Account).values(language="en")) is read_only_primary
+    # the session reads its own uncommitted write
+    assert session.get_bind(clause=select(Account)) is read_only_primary
+
+
+def test_reads_stick_to_primary_after_commit(replicas):
+    session = make_session()
+    session.get_bind(clause=update(Account).values(language="en"))
+
+    with patch("database.routing.time.time", return_value=1000):
+        _start_sticky_primary_window(session)
+    assert session.info[PRIMARY_UNTIL_SESSION_KEY] == 1000 + RoutingSession.sticky_seconds
+
+    with patch("database.routing.time.time", return_value=1001):
+        assert session.get_bind(clause=select(Account)) is read_only_primary
+    with patch("database.routing.time.time", return_value=1000 + RoutingSession.sticky_seconds + 1):
+        assert session.get_bind(clause=select(Account)) is read_only_a
+
+
+def test_rolled_back_write_does_not_stick(replicas):
+    session = make_session()
+    session.get_bind(clause=update(Account).values(language="en"))
+
+    _discard_uncommitted_write(session)
+
+    assert session.get_bind(clause=select(Account)) is read_only_a
+
+
+def test_failing_replica_is_ejected(replicas):
+    replicas._on_error(MagicMock(is_disconnect=True, engine=replica_a))
+
+    assert [replicas.next() for _ in range(3)] == [replica_b] * 3
+
+    replicas._on_error(MagicMock(is_disconnect=True, engine=replica_b))
+    assert make_session().get_bind(clause=select(Account)) is read_only_primary
+
+
+def test_read_only_sessions_begin_read_only_transactions():
+    session = make_session()
+
+    assert session.info[READ_ONLY_SESSION_KEY] is True
+    assert session.autoflush is False
+    assert read_only_primary.get_execution_options() == {"postgresql_readonly": True}
+    # one variant per engine, so the session keeps a single connection per bind
+    assert read_only_engine(primary) is read_only_primary
+    assert read_only_primary.pool is primary.pool
+
+
+def test_serializable_read_only_transactions_are_deferrable():
+    engine = create_engine("sqlite://").execution_options(isolation_level="SERIALIZABLE")
+
+    assert read_only_engine(engine).get_execution_options() == {
+        "isolation_level": "SERIALIZABLE",
+        "postgresql_readonly": True,
+        "postgresql_deferrable": True,
+    }
+
+
+def test_read_only_sessions_never_flush():
+    session = make_session()
+    session.add(Account(name="user", email="user@example.com"))
+
+    with pytest.raises(InvalidRequestError, match="read-only"):
+        session.flush()
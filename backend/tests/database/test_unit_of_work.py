@@ -0,0 +1,156 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from database import READ_ONLY_SESSION_KEY, UNIT_OF_WORK_SESSION_KEY, RequestSessionMiddleware, commit_or_flush, db
+from middleware.unit_of_work import COMMIT_COUNT_SESSION_KEY, UnitOfWorkMiddleware, _count_commit
+
+
+def mock_session(info=None, in_transaction=True):
+    session = MagicMock()
+    session.info = {} if info is None else info
+    session.commit = AsyncMock()
+    session.flush = AsyncMock()
+    session.rollback = AsyncMock()
+    session.close = AsyncMock()
+    session.in_transaction.return_value = in_transaction
+    return session
+
+
+@pytest.mark.asyncio
+async def test_commit_or_flush_commits_by_default():
+    session = mock_session()
+
+    await commit_or_flush(session)
+
+    session.commit.assert_awaited_once()
+    session.flush.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_commit_or_flush_only_flushes_unit_of_work():
+    session = mock_session({UNIT_OF_WORK_SESSION_KEY: True})
+
+    await commit_or_flush(session)
+
+    session.flush.assert_awaited_once()
+    session.commit.assert_not_awaited()
+
+
+def test_count_commit_only_counts_request_sessions():
+    request_session = mock_session({COMMIT_COUNT_SESSION_KEY: 0})
+    other_session = mock_session()
+
+    _count_commit(request_session)
+    _count_commit(request_session)
+    _count_commit(other_session)
+
+    assert request_session.info[COMMIT_COUNT_SESSION_KEY] == 2
+    assert COMMIT_COUNT_SESSION_KEY not in other_session.info
+
+
+@pytest.fixture
+def session():
+    return mock_session()
+
+
+@pytest.fixture
+def client(session):
+    app = FastAPI()
+    app.add_middleware(UnitOfWorkMiddleware)
+    app.add_middleware(RequestSessionMiddleware, session_factory=lambda: session)
+
+    @app.api_route("/ok", methods=["GET", "POST"])
+    async def ok():
+        db.session
+        return {"ok": True}
+
+    @app.post("/client-error")
+    async def client_error():
+        db.session
+        return JSONResponse({"ok": False}, status_code=400)
+
+    @app.post("/server-error")
+    async def server_error():
+        db.session
+        return JSONResponse({"ok": False}, status_code=500)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(("path", "committed"), [("/ok", True), ("/client-error", True), ("/server-error", False)])
+def test_middleware_commits_once(client, session, path, committed):
+    client.post(path)
+
+    assert session.info[UNIT_OF_WORK_SESSION_KEY] is True
+    assert session.commit.await_count == int(committed)
+    assert session.rollback.await_count == int(not committed)
+    session.close.assert_awaited_once()
+
+
+def test_middleware_drops_unflushed_changes_on_client_error(client, session):
+    pending = object()
+    session.new = [pending]
+
+    client.post("/client-error")
+
+    session.expunge.assert_called_once_with(pending)
+    session.expire_all.assert_called_once()
+    session.commit.assert_awaited_once()
+
+
+def test_middleware_skips_requests_without_transaction(client, session):
+    session.in_transaction.return_value = False
+
+    client.post("/ok")
+
+    session.commit.assert_not_awaited()
+    session.rollback.assert_not_awaited()
+
+
+def test_middleware_never_creates_unused_sessions():
+    factory = MagicMock()
+    app = FastAPI()
+    app.add_middleware(UnitOfWorkMiddleware)
+    app.add_middleware(RequestSessionMiddleware, session_factory=factory)
+    app.get("/health")(lambda: {"ok": True})
+
+    assert TestClient(app).get("/health").status_code == 200
+    factory.assert_not_called()
+
+
+def test_middleware_disabled_keeps_per_call_commits(client, session):
+    with patch("middleware.unit_of_work.funiq_ai_config") as config:
+        config.DATABASE_UNIT_OF_WORK = False
+        client.post("/ok")
+
+    assert UNIT_OF_WORK_SESSION_KEY not in session.info
+    session.commit.assert_not_awaited()
+
+
+def test_middleware_rolls_back_read_only_requests(client, session):
+    client.get("/ok")
+
+    assert session.info[READ_ONLY_SESSION_KEY] is True
+    assert session.autoflush is False
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
+
+
+def test_session_is_rolled_back_on_unhandled_exception(session):
+    app = FastAPI()
+    app.add_middleware(RequestSessionMiddleware, session_factory=lambda: session)
+
+    @app.get("/fail")
+    async def fail():
+        db.session
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        TestClient(app).get("/fail")
+
+    session.rollback.assert_awaited_once()
+    session.close.assert_awaited_once()
@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
 from test_data.data import hello_john, hello_world, hello_zhang
 
 from configs import funiq_ai_config
@@ -165,3 +168,17 @@ def test_test_i18n_translations():
     set_current_locale("zh_CN")
     assert str(hello_world) == "你好 世界"
     assert str(hello_zhang) == "你好 张三"
+
+
+def test_locale_is_isolated_between_threads():
+    translation_registry.load_translations("templates")
+    barrier = Barrier(2)
+
+    def render_in(locale_code):
+        set_current_locale(locale_code)
+        # both threads have set their locale before either reads it
+        barrier.wait(timeout=5)
+        return get_current_locale_code()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(render_in, ["en", "zh_CN"])) == ["en", "zh"]
@@ -1,3 +1,6 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -9,3 +12,13 @@ def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+
+
+def test_pool_metrics_require_the_token():
+    client = TestClient(app)
+
+    assert client.get("/health/pools").status_code == 404
+    with patch("app.main.funiq_ai_config", SimpleNamespace(POOL_METRICS_TOKEN="secret")):
+        assert client.get("/health/pools").status_code == 401
+        assert client.get("/health/pools", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get("/health/pools", headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,66 @@
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from fastapi import FastAPI
+from kombu import serialization
+
+from services.celery import create_celery_app, record_queue_wait, stamp_published_at
+from tasks.email_tasks import (
+    send_batch_email_task,
+    send_reset_password_verification_email_task,
+    send_signup_verification_email_task,
+)
+
+
+def test_celery_app_uses_tuned_profile():
+    celery_app = create_celery_app(FastAPI(title="FuniqAI"))
+
+    assert celery_app.conf.task_serializer == "orjson"
+    assert "json" in celery_app.conf.accept_content
+    assert celery_app.conf.task_ignore_result is True
+    assert celery_app.conf.task_acks_late is True
+    assert celery_app.conf.worker_prefetch_multiplier == 4
+    assert celery_app.conf.broker_pool_limit == 10
+    assert celery_app.conf.worker_pool == "threads"
+    assert celery_app.conf.worker_concurrency == 32
+
+
+def test_orjson_serializer_roundtrip():
+    create_celery_app(FastAPI(title="FuniqAI"))
+    body = ((), {"to": "user@example.com", "id": str(uuid4()), "at": datetime(2025, 1, 1).isoformat()}, {})
+
+    content_type, content_encoding, data = serialization.dumps(body, serializer="orjson")
+
+    assert content_type == "application/x-orjson"
+    assert serialization.loads(data, content_type, content_encoding) == [[], body[1], {}]
+
+
+def test_email_tasks_opt_in_to_results():
+    assert send_signup_verification_email_task.ignore_result is True
+    assert send_batch_email_task.ignore_result is False
+
+
+def test_verification_emails_use_priority_queue():
+    assert send_signup_verification_email_task.queue == "mail_priority"
+    assert send_reset_password_verification_email_task.queue == "mail_priority"
+    assert send_batch_email_task.queue == "mail"
+
+
+def test_queue_wait_is_measured_from_publish():
+    headers = {}
+    stamp_published_at(headers=headers)
+    task = MagicMock()
+    task.request.published_at = headers["published_at"] - 1.5
+    task.request.delivery_info = {"routing_key": "mail_priority"}
+    task.request.eta = None
+
+    with patch("services.celery.sync_redis") as redis_client:
+        record_queue_wait(task=task)
+
+    pipeline = redis_client.pipeline.return_value.__enter__.return_value
+    pipeline.hincrby.assert_called_once_with("celery_queue_metrics:mail_priority", "started", 1)
+    key, field, wait = pipeline.hincrbyfloat.call_args.args
+    assert (key, field) == ("celery_queue_metrics:mail_priority", "wait_seconds_total")
+    assert 1.5 <= wait < time.time() - task.request.published_at + 0.1
@@ -0,0 +1,119 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from celery.exceptions import Retry
+
+from database import IdempotencyKeyBusyError, RedisIdempotencyKeys
+from tasks.email_tasks import email_idempotency_key, send_signup_verification_email_task
+
+
+@pytest.fixture
+def redis_client():
+    with patch("database.core.sync_redis") as redis_client:
+        yield redis_client
+
+
+def test_generate_key_is_stable_and_hides_token():
+    key = email_idempotency_key("signup_email", "user@example.com", "secret-token")
+
+    assert key == email_idempotency_key("signup_email", "user@example.com", "secret-token")
+    assert key != email_idempotency_key("signup_email", "user@example.com", "other-token")
+    assert "secret-token" not in key
+
+
+def test_claim_counts_suppressed_duplicates(redis_client):
+    keys = RedisIdempotencyKeys(prefix="test_idempotency", ttl=60, lease=10)
+    claim_script = redis_client.register_script.return_value
+    claim_script.side_effect = [1, 0]
+
+    assert keys.claim("key", "signup_email") is True
+    assert keys.claim("key", "signup_email") is False
+
+    claim_script.assert_called_with(
+        keys=["test_idempotency:key"], args=[RedisIdempotencyKeys.PENDING, RedisIdempotencyKeys.DONE, 10]
+    )
+    redis_client.hincrby.assert_called_once_with("test_idempotency:suppressed", "signup_email", 1)
+
+
+def test_claim_of_a_key_in_progress_is_busy(redis_client):
+    keys = RedisIdempotencyKeys(prefix="test_idempotency", ttl=60, lease=10)
+    redis_client.register_script.return_value.return_value = -7
+
+    with pytest.raises(IdempotencyKeyBusyError) as exc_info:
+        keys.claim("key", "signup_email")
+
+    assert exc_info.value.retry_after == 7
+    redis_client.hincrby.assert_not_called()
+
+
+def test_complete_suppresses_duplicates_for_the_ttl(redis_client):
+    RedisIdempotencyKeys(prefix="test_idempotency", ttl=60, lease=10).complete("key")
+
+    redis_client.set.assert_called_once_with("test_idempotency:key", RedisIdempotencyKeys.DONE, ex=60)
+
+
+def test_get_suppressed_counts(redis_client):
+    redis_client.hgetall.return_value = {b"signup_email": b"3"}
+
+    assert RedisIdempotencyKeys().get_suppressed_counts() == {"signup_email": 3}
+
+
+@pytest.fixture
+def email_service():
+    with patch("tasks.email_tasks.email_service") as email_service:
+        email_service.is_initialized = True
+        yield email_service
+
+
+def test_task_skips_duplicate_before_rendering(email_service):
+    with (
+        patch("tasks.email_tasks.email_idempotency_keys.claim", return_value=False),
+        patch("tasks.email_tasks.template_renderer") as renderer,
+    ):
+        result = send_signup_verification_email_task("en", "user@example.com", "123456", idempotency_key="key")
+
+    assert result == "Duplicate"
+    renderer.render.assert_not_called()
+    email_service.send.assert_not_called()
+
+
+def test_task_releases_key_when_sending_fails(email_service):
+    email_service.send.side_effect = ConnectionError("smtp down")
+    keys = MagicMock()
+    keys.claim.return_value = True
+
+    with (
+        patch("tasks.email_tasks.email_idempotency_keys", keys),
+        patch("tasks.email_tasks.template_renderer"),
+        pytest.raises(ConnectionError),
+    ):
+        send_signup_verification_email_task("en", "user@example.com", "123456", idempotency_key="key")
+
+    keys.release.assert_called_once_with("key")
+
+
+def test_task_completes_key_after_sending(email_service):
+    keys = MagicMock()
+    keys.claim.return_value = True
+
+    with patch("tasks.email_tasks.email_idempotency_keys", keys), patch("tasks.email_tasks.template_renderer"):
+        send_signup_verification_email_task("en", "user@example.com", "123456", idempotency_key="key")
+
+    keys.complete.assert_called_once_with("key")
+    keys.release.assert_not_called()
+
+
+def test_task_is_deferred_while_another_worker_sends(email_service):
+    keys = MagicMock()
+    keys.claim.side_effect = IdempotencyKeyBusyError("key", 5)
+
+    with (
+        patch("tasks.email_tasks.email_idempotency_keys", keys),
+        patch.object(send_signup_verification_email_task, "retry", side_effect=Retry) as retry,
+        pytest.raises(Retry),
+    ):
+        send_signup_verification_email_task("en", "user@example.com", "123456", idempotency_key="key")
+
+    email_service.send.assert_not_called()
+    assert 5 <= retry.call_args.kwargs["countdown"] <= 6
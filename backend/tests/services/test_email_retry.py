@@ -0,0 +1,96 @@
+import smtplib
+from unittest.mock import patch
+
+import pytest
+
+from tasks.email_tasks import (
+    SIGNUP_VERIFICATION_EMAIL_TEMPLATE,
+    send_batch_email_task,
+    send_reset_password_verification_email_task,
+)
+
+
+@pytest.fixture
+def email_service():
+    with (
+        patch("tasks.email_tasks.email_service") as email_service,
+        patch("tasks.email_tasks.template_renderer"),
+    ):
+        email_service.is_initialized = True
+        yield email_service
+
+
+def test_email_task_retry_policy():
+    task = send_reset_password_verification_email_task
+    assert smtplib.SMTPException in task.autoretry_for
+    assert TimeoutError in task.autoretry_for
+    assert task.retry_backoff
+    assert task.retry_jitter is True
+
+
+def test_transient_smtp_error_is_retried(email_service):
+    email_service.send.side_effect = [smtplib.SMTPServerDisconnected("closed"), None]
+
+    with patch("tasks.email_tasks.add_dead_letter") as add_dead_letter:
+        result = send_reset_password_verification_email_task.apply(
+            kwargs={"language": "en", "to": "user@example.com", "code": "123456"}
+        )
+
+    assert email_service.send.call_count == 2
+    assert result.successful()
+    add_dead_letter.assert_not_called()
+
+
+def test_permanent_failure_is_dead_lettered(email_service):
+    email_service.send.side_effect = smtplib.SMTPRecipientsRefused({"user@example.com": (550, b"No such user")})
+
+    with patch("tasks.email_tasks.add_dead_letter") as add_dead_letter:
+        result = send_reset_password_verification_email_task.apply(
+            args=("en",), kwargs={"to": "user@example.com", "code": "123456"}
+        )
+
+    assert result.failed()
+    assert email_service.send.call_count == 1
+    task_name, kwargs, error = add_dead_letter.call_args.args
+    assert task_name == send_reset_password_verification_email_task.name
+    # the code is not written to the dead-letter queue
+    assert kwargs == {"language": "en", "to": "user@example.com"}
+    assert error.startswith("SMTPRecipientsRefused")
+
+
+def batch_items(count: int) -> list[dict]:
+    return [
+        {"template": SIGNUP_VERIFICATION_EMAIL_TEMPLATE, "locale": "en", "to": f"user{i}@example.com"}
+        for i in range(count)
+    ]
+
+
+def test_batch_broken_halfway_retries_only_the_unsent_emails(email_service):
+    disconnected = smtplib.SMTPServerDisconnected("closed")
+    email_service.send_many.side_effect = [[None, disconnected, disconnected], [None, None]]
+
+    with patch("tasks.email_tasks.add_dead_letter") as add_dead_letter:
+        result = send_batch_email_task.apply(args=(batch_items(3),))
+
+    assert result.successful()
+    retried = email_service.send_many.call_args_list[1].args[0]
+    assert [email["to"] for email in retried] == ["user1@example.com", "user2@example.com"]
+    assert [item["status"] for item in result.result] == ["sent", "sent"]
+    add_dead_letter.assert_not_called()
+
+
+def test_batch_unsent_emails_are_dead_lettered_once_retries_are_exhausted(email_service):
+    email_service.send_many.side_effect = lambda emails: [None] + [ConnectionError("reset")] * (len(emails) - 1)
+    items = batch_items(3)
+
+    with (
+        patch("tasks.email_tasks.add_dead_letter") as add_dead_letter,
+        patch.object(send_batch_email_task, "max_retries", 0),
+    ):
+        result = send_batch_email_task.apply(args=(items,))
+
+    assert [item["status"] for item in result.result] == ["sent", "failed", "failed"]
+    task_name, kwargs, error = add_dead_letter.call_args.args
+    assert task_name == send_batch_email_task.name
+    assert kwargs == {"items": items[1:]}
+    assert error.startswith("ConnectionError")
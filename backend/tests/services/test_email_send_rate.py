@@ -0,0 +1,129 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from celery.exceptions import Retry
+
+from services.email_service import EmailService, SendRateLimitError
+from tasks.email_tasks import (
+    SIGNUP_VERIFICATION_EMAIL_TEMPLATE,
+    send_batch_email_task,
+    send_signup_verification_email_task,
+)
+
+
+@pytest.fixture
+def email_service():
+    service = EmailService()
+    service._client = MagicMock()
+    service._default_send_from = "noreply@funiq.ai"
+    return service
+
+
+def test_send_acquires_sender_domain_limiter(email_service):
+    limiter = MagicMock()
+    limiter.try_acquire.return_value = 0
+    email_service._send_rate_limiters = {"funiq.ai": limiter}
+
+    email_service.send(to="user@example.com", subject="Hi", html="<p>Hi</p>")
+
+    limiter.try_acquire.assert_called_once_with("funiq.ai")
+    email_service._client.send.assert_called_once()
+
+
+def test_send_raises_when_rate_exhausted(email_service):
+    limiter = MagicMock()
+    limiter.try_acquire.return_value = 0.25
+    email_service._send_rate_limiters = {"*": limiter}
+
+    with pytest.raises(SendRateLimitError) as exc_info:
+        email_service.send(to="user@example.com", subject="Hi", html="<p>Hi</p>")
+
+    assert exc_info.value.domain == "funiq.ai"
+    assert exc_info.value.retry_after == 0.25
+    email_service._client.send.assert_not_called()
+
+
+def test_sender_domain_ignores_display_name(email_service):
+    limiter = MagicMock()
+    limiter.try_acquire.return_value = 0
+    email_service._send_rate_limiters = {"funiq.ai": limiter}
+    email_service._default_send_from = "no-reply <noreply@Funiq.ai>"
+
+    email_service.send(to="user@example.com", subject="Hi", html="<p>Hi</p>")
+
+    limiter.try_acquire.assert_called_once_with("funiq.ai")
+
+
+def test_send_many_defers_chunks_over_the_rate(email_service):
+    limiter = MagicMock(capacity=2)
+    limiter.try_acquire.side_effect = [0, 1.5]
+    email_service._send_rate_limiters = {"funiq.ai": limiter}
+    email_service._client.send_many.side_effect = lambda mails: [None] * len(mails)
+    emails = [{"to": f"user{i}@example.com", "subject": "Hi", "html": "<p>Hi</p>"} for i in range(5)]
+
+    errors = email_service.send_many(emails)
+
+    assert errors[:2] == [None, None]
+    assert all(isinstance(error, SendRateLimitError) and error.retry_after == 1.5 for error in errors[2:])
+    assert email_service._client.send_many.call_count == 1
+
+
+def test_send_many_fails_only_unsent_chunks(email_service):
+    email_service._send_rate_limiters = {"funiq.ai": MagicMock(capacity=2, **{"try_acquire.return_value": 0})}
+    email_service._client.send_many.side_effect = [[None, None], ConnectionError("smtp down")]
+    emails = [{"to": f"user{i}@example.com", "subject": "Hi", "html": "<p>Hi</p>"} for i in range(5)]
+
+    errors = email_service.send_many(emails)
+
+    assert errors[:2] == [None, None]
+    assert all(isinstance(error, ConnectionError) for error in errors[2:])
+
+
+async def test_send_async_raises_when_rate_exhausted(email_service):
+    email_service._async_client = MagicMock(send=AsyncMock())
+    limiter = MagicMock()
+    limiter.try_acquire.return_value = 0.5
+    email_service._send_rate_limiters = {"*": limiter}
+
+    with pytest.raises(SendRateLimitError):
+        await email_service.send_async(to="user@example.com", subject="Hi", html="<p>Hi</p>")
+
+    email_service._async_client.send.assert_not_awaited()
+
+
+def test_batch_task_defers_throttled_emails():
+    items = [
+        {"template": SIGNUP_VERIFICATION_EMAIL_TEMPLATE, "locale": "en", "to": f"user{i}@example.com"} for i in range(3)
+    ]
+    with (
+        patch("tasks.email_tasks.email_service") as email_service,
+        patch("tasks.email_tasks.template_renderer"),
+        patch.object(send_batch_email_task, "apply_async") as apply_async,
+    ):
+        email_service.is_initialized = True
+        email_service.send_many.return_value = [None, SendRateLimitError("funiq.ai", 2.0), None]
+
+        results = send_batch_email_task(items)
+
+    assert [result["status"] for result in results] == ["sent", "deferred", "sent"]
+    assert apply_async.call_args.kwargs["args"] == ([items[1]],)
+    assert 2.0 <= apply_async.call_args.kwargs["countdown"] <= 3.0
+
+
+def test_task_defers_throttled_send():
+    with (
+        patch("tasks.email_tasks.email_service") as email_service,
+        patch("tasks.email_tasks.email_idempotency_keys") as keys,
+        patch("tasks.email_tasks.template_renderer"),
+        patch.object(send_signup_verification_email_task, "retry", side_effect=Retry) as retry,
+    ):
+        email_service.is_initialized = True
+        email_service.send.side_effect = SendRateLimitError("funiq.ai", 2.0)
+        keys.claim.return_value = True
+
+        with pytest.raises(Retry):
+            send_signup_verification_email_task("en", "user@example.com", "123456", idempotency_key="key")
+
+    keys.release.assert_called_once_with("key")
+    assert 2.0 <= retry.call_args.kwargs["countdown"] <= 3.0
+    assert retry.call_args.kwargs["max_retries"] is None
@@ -0,0 +1,145 @@
+import contextlib
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.outbox import OutboxMessage, OutboxMessageStatus
+from tasks.email_tasks import (
+    SIGNUP_VERIFICATION_EMAIL_TEMPLATE,
+    deliver_template_email,
+    send_signup_verification_email_task,
+)
+from services.outbox import OUTBOX_PENDING_SESSION_KEY, OutboxRelay, _wake_outbox_relay, add_outbox_message
+
+
+@pytest.fixture
+def celery_app():
+    app = MagicMock()
+    app.producer_or_acquire.return_value.__enter__.return_value = MagicMock(name="producer")
+    return app
+
+
+@pytest.fixture
+def relay(celery_app):
+    relay = OutboxRelay()
+    relay.init(celery_app)
+    relay.max_attempts = 2
+    relay.retry_backoff = 2.0
+    return relay
+
+
+def mock_transactional_session(messages):
+    session = MagicMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = messages
+    session.execute = AsyncMock(return_value=result)
+
+    @contextlib.asynccontextmanager
+    async def transactional_session():
+        yield session
+
+    return session, transactional_session
+
+
+def test_add_outbox_message_flags_session():
+    session = MagicMock()
+    session.info = {}
+
+    message = add_outbox_message(session, "tasks.send", {"to": "user@example.com"})
+
+    session.add.assert_called_once_with(message)
+    assert message.task_name == "tasks.send"
+    assert message.payload == {"to": "user@example.com"}
+    assert session.info[OUTBOX_PENDING_SESSION_KEY] is True
+
+
+def test_after_commit_wakes_relay_once():
+    session = MagicMock()
+    session.info = {OUTBOX_PENDING_SESSION_KEY: True}
+
+    with patch("services.outbox.outbox_relay") as relay:
+        _wake_outbox_relay(session)
+        _wake_outbox_relay(session)
+
+    relay.wake.assert_called_once()
+
+
+def test_publish_uses_one_producer(relay, celery_app):
+    errors = relay._publish([("tasks.a", {"to": "a@example.com"}), ("tasks.b", {"to": "b@example.com"})])
+
+    assert errors == [None, None]
+    celery_app.producer_or_acquire.assert_called_once()
+    producer = celery_app.producer_or_acquire.return_value.__enter__.return_value
+    for call in celery_app.tasks.__getitem__.return_value.apply_async.call_args_list:
+        assert call.kwargs["producer"] is producer
+
+
+@pytest.mark.asyncio
+async def test_relay_once_deletes_published_and_backs_off_failed(relay):
+    published = OutboxMessage(task_name="tasks.a", payload={}, attempts=0, status=OutboxMessageStatus.PENDING)
+    retried = OutboxMessage(task_name="tasks.b", payload={}, attempts=0, status=OutboxMessageStatus.PENDING)
+    exhausted = OutboxMessage(task_name="tasks.c", payload={}, attempts=1, status=OutboxMessageStatus.PENDING)
+    session, transactional_session = mock_transactional_session([published, retried, exhausted])
+    error = ConnectionError("broker unavailable")
+
+    with (
+        patch("services.outbox.transactional_session", transactional_session),
+        patch.object(relay, "_publish", return_value=[None, error, error]),
+    ):
+        assert await relay.relay_once() == 3
+
+    # select, then delete of the published message
+    assert session.execute.await_count == 2
+    assert retried.attempts == 1
+    assert retried.status == OutboxMessageStatus.PENDING
+    assert retried.last_error == "broker unavailable"
+    assert exhausted.attempts == 2
+    assert exhausted.status == OutboxMessageStatus.FAILED
+
+
+@pytest.mark.asyncio
+async def test_relay_once_without_messages(relay):
+    session, transactional_session = mock_transactional_session([])
+
+    with patch("services.outbox.transactional_session", transactional_session), patch.object(
+        relay, "_publish"
+    ) as publish:
+        assert await relay.relay_once() == 0
+
+    publish.assert_not_called()
+
+
+async def test_outbox_stores_the_verification_token_instead_of_the_code():
+    session = MagicMock(info={})
+
+    with patch("tasks.email_tasks.email_service", is_async_enabled=False):
+        await deliver_template_email(
+            session, SIGNUP_VERIFICATION_EMAIL_TEMPLATE, language="en", to="user@example.com", code="123456", token="t"
+        )
+
+    message = session.add.call_args.args[0]
+    assert message.payload == {"language": "en", "to": "user@example.com", "token": "t"}
+
+
+def test_task_reads_the_code_from_the_token():
+    with (
+        patch("tasks.email_tasks.email_service") as email_service,
+        patch("tasks.email_tasks.template_renderer") as renderer,
+        patch("tasks.email_tasks.token_manager.get_token_data_sync", return_value={"code": "123456"}) as get_data,
+    ):
+        email_service.is_initialized = True
+        assert send_signup_verification_email_task("en", "user@example.com", token="t") == "Success"
+
+    get_data.assert_called_once_with("t", "signup_email")
+    assert renderer.render.call_args.kwargs["code"] == "123456"
+
+
+def test_task_skips_expired_tokens():
+    with (
+        patch("tasks.email_tasks.email_service") as email_service,
+        patch("tasks.email_tasks.token_manager.get_token_data_sync", return_value=None),
+    ):
+        email_service.is_initialized = True
+        assert send_signup_verification_email_task("en", "user@example.com", token="t") == "Expired"
+
+    email_service.send.assert_not_called()
@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from utils.async_smtp import AsyncMailQueue, AsyncSMTPClient
+
+pytest.importorskip("aiosmtplib")
+
+
+@pytest.fixture
+def async_smtp_client():
+    return AsyncSMTPClient(
+        server="smtp.example.com",
+        port=465,
+        username="test@example.com",
+        password="password",  # noqa: S106
+        _from="sender@example.com",
+        use_tls=True,
+        max_concurrency=2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_send_with_tls(async_smtp_client):
+    with patch("aiosmtplib.send", new_callable=AsyncMock) as mock_send:
+        await async_smtp_client.send({"to": "recipient@example.com", "subject": "Test", "html": "<p>Test</p>"})
+
+    mock_send.assert_awaited_once()
+    kwargs = mock_send.call_args.kwargs
+    assert kwargs["hostname"] == "smtp.example.com"
+    assert kwargs["recipients"] == ["recipient@example.com"]
+    assert kwargs["use_tls"] is True
+    assert kwargs["start_tls"] is False
+
+
+@pytest.mark.asyncio
+async def test_async_send_concurrency_is_bounded(async_smtp_client):
+    in_flight, peak = 0, 0
+
+    async def slow_send(*args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    mail = {"to": "recipient@example.com", "subject": "Test", "html": "<p>Test</p>"}
+    with patch("aiosmtplib.send", side_effect=slow_send):
+        await asyncio.gather(*(async_smtp_client.send(mail) for _ in range(6)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_mail_queue_applies_backpressure_and_drains():
+    release = asyncio.Event()
+    delivered = []
+
+    async def send(mail):
+        await release.wait()
+        delivered.append(mail["to"])
+
+    queue = AsyncMailQueue(send, workers=1, max_size=1)
+    queue.start()
+
+    await queue.put({"to": "a@example.com"})  # picked up by the worker
+    await queue.put({"to": "b@example.com"})  # fills the queue
+    blocked = asyncio.create_task(queue.put({"to": "c@example.com"}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    await blocked
+    await queue.stop()
+    assert delivered == ["a@example.com", "b@example.com", "c@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_mail_queue_defers_throttled_emails():
+    class Throttled(Exception):
+        retry_after = 0
+
+    attempts = []
+
+    async def send(mail):
+        attempts.append(mail["to"])
+        if len(attempts) == 1:
+            raise Throttled()
+
+    queue = AsyncMailQueue(send, workers=1)
+    queue.start()
+    with patch("utils.async_smtp.random.uniform", return_value=0):
+        await queue.put({"to": "a@example.com"})
+        await queue.stop()
+
+    assert attempts == ["a@example.com", "a@example.com"]
@@ -1,3 +1,4 @@
+import smtplib
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -34,3 +35,123 @@ def test_send_email_with_tls(mock_smtp, smtp_client):
     mock_smtp_instance.login.assert_called_once_with("test@example.com", "password")
     assert mock_smtp_instance.sendmail.called
     mock_smtp_instance.quit.assert_called_once()
+
+
+@pytest.fixture
+def pooled_smtp_client():
+    return SMTPClient(
+        server="smtp.example.com",
+        port=587,
+        username="test@example.com",
+        password="password",  # noqa: S106
+        _from="sender@example.com",
+        use_tls=True,
+        pool_size=2,
+        pool_keepalive_interval=0,
+    )
+
+
+@patch("smtplib.SMTP_SSL")
+def test_pooled_client_reuses_connection(mock_smtp, pooled_smtp_client):
+    mock_smtp_instance = MagicMock()
+    mock_smtp_instance.noop.return_value = (250, b"OK")
+    mock_smtp.return_value = mock_smtp_instance
+
+    mail = {"to": "recipient@example.com", "subject": "Test Subject", "html": "<p>Test content</p>"}
+    pooled_smtp_client.send(mail)
+    pooled_smtp_client.send(mail)
+
+    # One handshake and login for both messages, the connection is health-checked before reuse
+    mock_smtp.assert_called_once()
+    mock_smtp_instance.login.assert_called_once()
+    mock_smtp_instance.noop.assert_called_once()
+    assert mock_smtp_instance.sendmail.call_count == 2
+    mock_smtp_instance.quit.assert_not_called()
+
+    pooled_smtp_client.close()
+    mock_smtp_instance.quit.assert_called_once()
+
+
+@patch("smtplib.SMTP_SSL")
+def test_pooled_client_reconnects_stale_connection(mock_smtp, pooled_smtp_client):
+    stale, fresh = MagicMock(), MagicMock()
+    stale.noop.side_effect = smtplib.SMTPServerDisconnected()
+    mock_smtp.side_effect = [stale, fresh]
+
+    mail = {"to": "recipient@example.com", "subject": "Test Subject", "html": "<p>Test content</p>"}
+    pooled_smtp_client.send(mail)
+    pooled_smtp_client.send(mail)
+
+    assert mock_smtp.call_count == 2
+    stale.sendmail.assert_called_once()
+    fresh.sendmail.assert_called_once()
+
+
+@patch("smtplib.SMTP_SSL")
+def test_pooled_client_retries_once_on_disconnect(mock_smtp, pooled_smtp_client):
+    dropped, fresh = MagicMock(), MagicMock()
+    dropped.sendmail.side_effect = smtplib.SMTPServerDisconnected()
+    mock_smtp.side_effect = [dropped, fresh]
+
+    mail = {"to": "recipient@example.com", "subject": "Test Subject", "html": "<p>Test content</p>"}
+    pooled_smtp_client.send(mail)
+
+    fresh.sendmail.assert_called_once()
+    assert pooled_smtp_client._pool.idle_count == 1
+
+
+@patch("smtplib.SMTP_SSL")
+def test_send_many_uses_one_session(mock_smtp, smtp_client):
+    mock_smtp_instance = MagicMock()
+    mock_smtp_instance.sendmail.side_effect = [
+        {},
+        smtplib.SMTPRecipientsRefused({"bad@example.com": (550, b"No such user")}),
+        {},
+    ]
+    mock_smtp.return_value = mock_smtp_instance
+
+    mails = [
+        {"to": to, "subject": "Test Subject", "html": "<p>Test content</p>"}
+        for to in ("a@example.com", "bad@example.com", "c@example.com")
+    ]
+    errors = smtp_client.send_many(mails)
+
+    mock_smtp.assert_called_once()
+    mock_smtp_instance.login.assert_called_once()
+    mock_smtp_instance.quit.assert_called_once()
+    assert mock_smtp_instance.sendmail.call_count == 3
+    assert errors[0] is None
+    assert isinstance(errors[1], smtplib.SMTPRecipientsRefused)
+    assert errors[2] is None
+
+
+@patch("smtplib.SMTP_SSL")
+def test_send_many_reconnects_once_after_disconnect(mock_smtp, smtp_client):
+    dropped, fresh = MagicMock(), MagicMock()
+    dropped.sendmail.side_effect = [{}, smtplib.SMTPServerDisconnected()]
+    mock_smtp.side_effect = [dropped, fresh]
+
+    mails = [
+        {"to": to, "subject": "Test Subject", "html": "<p>Test content</p>"}
+        for to in ("a@example.com", "b@example.com", "c@example.com")
+    ]
+    errors = smtp_client.send_many(mails)
+
+    assert errors == [None, None, None]
+    assert fresh.sendmail.call_count == 2
+
+
+@patch("smtplib.SMTP_SSL")
+def test_send_many_fails_only_unsent_messages(mock_smtp, smtp_client):
+    smtp = MagicMock()
+    smtp.sendmail.side_effect = [{}, RuntimeError("boom")]
+    mock_smtp.return_value = smtp
+
+    mails = [
+        {"to": to, "subject": "Test Subject", "html": "<p>Test content</p>"}
+        for to in ("a@example.com", "b@example.com", "c@example.com")
+    ]
+    errors = smtp_client.send_many(mails)
+
+    assert errors[0] is None
+    assert all(isinstance(error, RuntimeError) for error in errors[1:])
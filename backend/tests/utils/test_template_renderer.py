@@ -1,5 +1,8 @@
+from unittest.mock import MagicMock, patch
+
 import pytest
 
+from utils.i18n import translation_registry
 from utils.template_renderer import TemplateRenderer
 
 
@@ -38,4 +41,56 @@ def test_template_not_found(template_dir):
 def test_invalid_template_syntax(template_dir):
     renderer = TemplateRenderer(template_dir)
     with pytest.raises(RuntimeError):
-        renderer.render_string("{% invalid syntax %}") 
\ No newline at end of file
+        renderer.render_string("{% invalid syntax %}") 
+
+@pytest.fixture
+def i18n_template_dir(template_dir):
+    (template_dir / "i18n.html").write_text('<p>{{ _("Signup Verification Code") }}</p><span>{{ code }}</span>')
+    return template_dir
+
+
+def test_render_with_precompiled_translations(i18n_template_dir):
+    translations = MagicMock()
+    translations.ugettext.side_effect = lambda message: f"zh:{message}"
+    renderer = TemplateRenderer(i18n_template_dir)
+
+    with patch.dict(translation_registry.translations, {"templates": {"zh_CN": translations}}), patch.object(
+        type(translation_registry), "supported_locales", {"en", "zh_CN"}
+    ):
+        result = renderer.render("i18n.html", locale="zh-CN", code="123456")
+        assert result == "<p>zh:Signup Verification Code</p><span>123456</span>"
+
+        # Rendering again reuses the compiled template and does not translate again
+        translations.ugettext.reset_mock()
+        renderer.render("i18n.html", locale="zh_CN", code="654321")
+        translations.ugettext.assert_not_called()
+
+
+def test_render_unsupported_locale_falls_back_to_default(i18n_template_dir):
+    renderer = TemplateRenderer(i18n_template_dir)
+    result = renderer.render("i18n.html", locale="xx", code="1")
+    assert result == "<p>Signup Verification Code</p><span>1</span>"
+
+
+def test_template_cache_is_bounded(template_dir):
+    renderer = TemplateRenderer(template_dir, cache_size=1)
+    (template_dir / "other.html").write_text("Bye {{ name }}!")
+
+    renderer.render("test.html", locale="en", name="World")
+    renderer.render("other.html", locale="en", name="World")
+    assert len(renderer._templates) == 1
+
+
+def test_bytecode_cache_shared_between_renderers(template_dir, tmp_path):
+    cache_dir = tmp_path / "bytecode"
+    TemplateRenderer(template_dir, bytecode_cache_dir=cache_dir).precompile(["en"])
+    assert len(list(cache_dir.glob("__jinja2_en_*.cache"))) == 1
+
+    # A fresh renderer (e.g. another worker process) loads the cached bytecode
+    renderer = TemplateRenderer(template_dir, bytecode_cache_dir=cache_dir)
+    assert renderer.render("test.html", locale="en", name="World") == "Hello World!"
+
+    # Changing the template source invalidates the cached bytecode
+    (template_dir / "test.html").write_text("Hi {{ name }}!")
+    renderer = TemplateRenderer(template_dir, bytecode_cache_dir=cache_dir)
+    assert renderer.render("test.html", locale="en", name="World") == "Hi World!"
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Optional
+
+from utils.smtp import build_message
+
+try:
+    import aiosmtplib
+except ImportError:  # optional, only needed by the async mail delivery backend
+    aiosmtplib = None
+
+
+class AsyncSMTPClient:
+    """
+    Asyncio-native SMTP client built on aiosmtplib.
+
+    At most ``max_concurrency`` deliveries run at the same time; further callers wait on a
+    semaphore instead of opening more connections to the SMTP server.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        username: str,
+        password: str,
+        _from: str,
+        use_tls=False,
+        opportunistic_tls=False,
+        max_concurrency: int = 4,
+    ):
+        if aiosmtplib is None:
+            raise ValueError("aiosmtplib is required for the async mail delivery backend")
+
+        self.server = server
+        self.port = port
+        self._from = _from
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.opportunistic_tls = opportunistic_tls
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def send(self, mail: dict):
+        message = build_message(mail, self._from, self.username)
+        async with self.semaphore:
+            try:
+                await aiosmtplib.send(
+                    message,
+                    sender=self._from,
+                    recipients=[mail["to"]],
+                    hostname=self.server,
+                    port=self.port,
+                    username=self.username or None,
+                    password=self.password or None,
+                    use_tls=self.use_tls and not self.opportunistic_tls,
+                    start_tls=self.use_tls and self.opportunistic_tls,
+                    timeout=10,
+                )
+            except aiosmtplib.SMTPException as e:
+                logging.error(f"SMTP error occurred: {e!s}")
+                raise
+            except TimeoutError as e:
+                logging.error(f"Timeout occurred while sending email: {e!s}")
+                raise
+
+
+class AsyncMailQueue:
+    """
+    In-process mail queue drained by a fixed number of worker coroutines.
+
+    ``put`` waits while the queue is full, so producers slow down instead of buffering an
+    unbounded backlog in memory. An email whose send fails with a ``retry_after`` (e.g. a
+    ``SendRateLimitError``) is deferred: queued again after that delay.
+    """
+
+    def __init__(self, send: Callable[[dict], Awaitable[None]], workers: int = 4, max_size: int = 1000):
+        """
+        Initialize the mail queue.
+
+        :param send: Coroutine function delivering a single email.
+        :param workers: Number of worker coroutines delivering emails concurrently.
+        :param max_size: Maximum number of queued emails before ``put`` applies backpressure.
+        """
+        self._send = send
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._deferred: set[asyncio.Task] = set()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        """Start the worker coroutines on the running event loop."""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10):
+        """Deliver queued emails for up to ``timeout`` seconds, then stop the workers."""
+        if not self.is_running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Mail queue stopped with {self._queue.qsize()} undelivered emails")
+        for task in [*self._tasks, *self._deferred]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._deferred, return_exceptions=True)
+        self._tasks = []
+        self._deferred = set()
+
+    async def put(self, mail: dict):
+        """Queue an email, waiting for free space when the queue is full."""
+        if not self.is_running:
+            raise ValueError("Mail queue is not running")
+        await self._queue.put(mail)
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            mail = await self._queue.get()
+            try:
+                await self._send(mail)
+            except Exception as e:
+                if getattr(e, "retry_after", None) is not None:
+                    # e.g. a throttled send: deliver it later without holding up this worker
+                    logging.info(f"Deferring queued email to {mail.get('to')} by {e.retry_after:.2f}s: {e!s}")
+                    self._deferred.add(asyncio.create_task(self._defer(mail, e.retry_after)))
+                    continue
+                logging.exception(f"Failed to deliver queued email to {mail.get('to')}. Error: {e!s}")
+                self._queue.task_done()
+            else:
+                self._queue.task_done()
+
+    async def _defer(self, mail: dict, delay: float):
+        try:
+            await asyncio.sleep(delay + random.uniform(0, 1))  # noqa: S311
+            await self._queue.put(mail)
+        finally:
+            # only now, so that stop() waits for deferred emails too
+            self._queue.task_done()
+            self._deferred.discard(asyncio.current_task())
@@ -8,10 +8,10 @@ class ContextStorage:
 
     def __init__(self):
         self._values: ContextVar = ContextVar(self.CONTEXT_KEY_NAME, default=self.DEFAULT_VALUE)
-        self._token_id = None
 
     def get(self) -> Any:
         return self._values.get()
 
     def set(self, value: Any):
-        self._token_id = self._values.set(value)
+        """Set the value in the current context only."""
+        self._values.set(value)
@@ -166,7 +166,7 @@ class LocaleTranslator:
 class LocaleContext(ContextStorage):
     """
     Context manager for handling locale information in the current context.
-    Provides thread-local storage for the current locale.
+    Provides context-local storage for the current locale.
     """
     DEFAULT_VALUE = LocaleTranslator.get(funiq_ai_config.DEFAULT_LOCALE)
     CONTEXT_KEY_NAME = "locale"
@@ -240,7 +240,12 @@ def register_translation_domains(domains: list[str]) -> None:
 
 
 def set_current_locale(locale_code: str) -> None:
-    """Set the current locale in the context."""
+    """
+    Set the current locale in the context.
+
+    The locale is stored in a context variable, so it is isolated per request, asyncio task
+    and worker thread.
+    """
     locale = LocaleTranslator.get(locale_code)
     _locale_ctx.set(locale)
 
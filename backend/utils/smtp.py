@@ -1,14 +1,170 @@
+import contextlib
 import logging
+import os
 import smtplib
+import threading
+import time
+from collections import deque
 from email.header import Header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formataddr, make_msgid
+from typing import Callable, Iterator, Optional
+
+
+def build_message(mail: dict, from_: str, message_id_domain: str) -> MIMEMultipart:
+    """
+    Build the MIME message for an email.
+
+    :param mail: Email with ``to``, ``subject`` and ``html`` keys.
+    :param from_: Envelope sender address.
+    :param message_id_domain: Domain used to generate the Message-ID header.
+    :return: MIME message ready to be sent.
+    """
+    msg = MIMEMultipart()
+    msg["Message-ID"] = make_msgid(domain=message_id_domain)
+    msg["Subject"] = Header(mail["subject"], "utf-8").encode()
+    msg["From"] = formataddr((Header("Funiq AI", "utf-8").encode(), from_))
+    msg["To"] = formataddr((Header(mail["to"], "utf-8").encode(), mail["to"]))
+
+    msg.attach(MIMEText(mail["html"], "html", "utf-8"))
+    return msg
+
+
+class SMTPConnectionPool:
+    """
+    A thread-safe pool of authenticated SMTP connections.
+
+    Idle connections are reused LIFO. A connection idle for longer than ``keepalive_interval``
+    is health-checked with ``NOOP`` before reuse, and one idle for longer than ``idle_timeout``
+    is closed and replaced. The pool is bound to the process that created it, so a forked
+    worker never reuses a socket inherited from its parent.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], smtplib.SMTP],
+        max_size: int = 4,
+        idle_timeout: float = 60,
+        keepalive_interval: float = 10,
+    ):
+        """
+        Initialize the connection pool.
+
+        :param connect: Factory that opens and authenticates a new SMTP connection.
+        :param max_size: Maximum number of connections open at the same time.
+        :param idle_timeout: Seconds after which an idle connection is closed instead of reused.
+        :param keepalive_interval: Seconds of idleness after which a NOOP check precedes reuse.
+        """
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self._idle: deque[tuple[smtplib.SMTP, float]] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self) -> None:
+        """Drop connections inherited from a parent process without closing the shared sockets."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._idle = deque()
+                    self._slots = threading.BoundedSemaphore(self.max_size)
+                    self._pid = os.getpid()
+
+    def _checkout(self) -> smtplib.SMTP:
+        """Return a healthy idle connection, or open a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                smtp, last_used_at = self._idle.pop()
+
+            idle_for = time.monotonic() - last_used_at
+            if idle_for > self.idle_timeout:
+                _close_quietly(smtp)
+                continue
+            if idle_for > self.keepalive_interval and not _is_alive(smtp):
+                _close_quietly(smtp)
+                continue
+            return smtp
+
+        return self._connect()
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """
+        Check out a connection for the duration of the block.
+
+        The connection is returned to the pool if the block succeeds or fails with a
+        recipient/data level error; it is discarded if the server disconnected or the
+        error leaves the session in an unknown state.
+        """
+        self._reset_after_fork()
+        slots = self._slots
+        slots.acquire()
+        smtp = None
+        reusable = False
+        try:
+            smtp = self._checkout()
+            yield smtp
+            reusable = True
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            reusable = True
+            raise
+        finally:
+            if smtp is not None:
+                if reusable:
+                    with self._lock:
+                        self._idle.append((smtp, time.monotonic()))
+                else:
+                    _close_quietly(smtp)
+            slots.release()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for smtp, _ in idle:
+            _close_quietly(smtp)
+
+    @property
+    def idle_count(self) -> int:
+        """Number of idle connections currently held by the pool."""
+        return len(self._idle)
+
+
+def _is_alive(smtp: smtplib.SMTP) -> bool:
+    """Check an SMTP connection with a NOOP command."""
+    try:
+        return smtp.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def _close_quietly(smtp: smtplib.SMTP) -> None:
+    """Close an SMTP connection, ignoring errors from an already broken session."""
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
 
 
 class SMTPClient:
     def __init__(
-        self, server: str, port: int, username: str, password: str, _from: str, use_tls=False, opportunistic_tls=False
+        self,
+        server: str,
+        port: int,
+        username: str,
+        password: str,
+        _from: str,
+        use_tls=False,
+        opportunistic_tls=False,
+        pool_size: int = 0,
+        pool_idle_timeout: float = 60,
+        pool_keepalive_interval: float = 10,
     ):
         self.server = server
         self.port = port
@@ -17,31 +173,67 @@ class SMTPClient:
         self.password = password
         self.use_tls = use_tls
         self.opportunistic_tls = opportunistic_tls
+        # pool_size=0 keeps the one-connection-per-message behaviour
+        self._pool: Optional[SMTPConnectionPool] = None
+        if pool_size > 0:
+            self._pool = SMTPConnectionPool(
+                self._connect,
+                max_size=pool_size,
+                idle_timeout=pool_idle_timeout,
+                keepalive_interval=pool_keepalive_interval,
+            )
 
-    def send(self, mail: dict):
-        smtp = None
-        try:
-            if self.use_tls:
-                if self.opportunistic_tls:
-                    smtp = smtplib.SMTP(self.server, self.port, timeout=10)
-                    smtp.starttls()
-                else:
-                    smtp = smtplib.SMTP_SSL(self.server, self.port, timeout=10)
-            else:
+    def _connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP connection."""
+        if self.use_tls:
+            if self.opportunistic_tls:
                 smtp = smtplib.SMTP(self.server, self.port, timeout=10)
+                smtp.starttls()
+            else:
+                smtp = smtplib.SMTP_SSL(self.server, self.port, timeout=10)
+        else:
+            smtp = smtplib.SMTP(self.server, self.port, timeout=10)
 
+        try:
             if self.username and self.password:
                 smtp.login(self.username, self.password)
+        except Exception:
+            _close_quietly(smtp)
+            raise
+        return smtp
 
-            msg = MIMEMultipart()
-            msg["Message-ID"] = make_msgid(domain=self.username)
-            msg["Subject"] = Header(mail["subject"], "utf-8").encode()
-            msg["From"] = formataddr((Header("Funiq AI", "utf-8").encode(), self._from))
-            msg["To"] = formataddr((Header(mail["to"], "utf-8").encode(), mail["to"]))
-            
-            msg.attach(MIMEText(mail["html"], "html", "utf-8"))
+    def _build_message(self, mail: dict) -> str:
+        return build_message(mail, self._from, self.username).as_string()
 
-            smtp.sendmail(self._from, mail["to"], msg.as_string())
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[smtplib.SMTP]:
+        """Yield a pooled connection, or a dedicated one that is closed afterwards."""
+        if self._pool:
+            with self._pool.connection() as smtp:
+                yield smtp
+            return
+
+        smtp = None
+        try:
+            smtp = self._connect()
+            yield smtp
+        finally:
+            if smtp:
+                _close_quietly(smtp)
+
+    def send(self, mail: dict):
+        try:
+            message = self._build_message(mail)
+            try:
+                with self._connection() as smtp:
+                    smtp.sendmail(self._from, mail["to"], message)
+            except smtplib.SMTPServerDisconnected:
+                if not self._pool:
+                    raise
+                # a pooled connection may have been dropped by the server; retry once on a fresh one
+                logging.warning("SMTP connection was closed by the server, reconnecting")
+                with self._connection() as smtp:
+                    smtp.sendmail(self._from, mail["to"], message)
         except smtplib.SMTPException as e:
             logging.error(f"SMTP error occurred: {e!s}")
             raise
@@ -51,6 +243,55 @@ class SMTPClient:
         except Exception as e:
             logging.error(f"Unexpected error occurred while sending email: {e!s}")
             raise
-        finally:
-            if smtp:
-                smtp.quit()
+
+    def send_many(self, mails: list[dict]) -> list[Optional[Exception]]:
+        """
+        Send several messages over a single SMTP session.
+
+        Messages rejected by the server are recorded and the session moves on to the next one.
+        If the server drops the connection, the remaining messages are retried once on a new
+        connection. Any other error fails the messages not sent yet, and only those.
+
+        :param mails: Messages with ``to``, ``subject`` and ``html`` keys.
+        :return: Per-message error, aligned with ``mails``; None for delivered messages.
+        """
+        errors: list[Optional[Exception]] = [None] * len(mails)
+        pending = deque(range(len(mails)))
+        reconnected = False
+
+        while pending:
+            try:
+                with self._connection() as smtp:
+                    while pending:
+                        index = pending[0]
+                        mail = mails[index]
+                        try:
+                            smtp.sendmail(self._from, mail["to"], self._build_message(mail))
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                            logging.error(f"SMTP server rejected email to {mail['to']}: {e!s}")
+                            errors[index] = e
+                        pending.popleft()
+            except smtplib.SMTPServerDisconnected as e:
+                if not reconnected:
+                    logging.warning("SMTP connection was closed by the server, reconnecting")
+                    reconnected = True
+                    continue
+                logging.error(f"SMTP error occurred: {e!s}")
+                error = e
+            except Exception as e:
+                # the messages before this one were delivered, only the pending ones failed
+                logging.error(f"SMTP error occurred: {e!s}")
+                error = e
+            else:
+                break
+
+            for index in pending:
+                errors[index] = error
+            break
+
+        return errors
+
+    def close(self):
+        """Close pooled connections, if any."""
+        if self._pool:
+            self._pool.close()
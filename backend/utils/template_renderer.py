@@ -1,51 +1,191 @@
+import hashlib
+import os
 import pathlib
-from functools import cache
-from typing import Union
+import threading
+from typing import Iterator, Optional, Union
 
 import jinja2
+from jinja2.bccache import FileSystemBytecodeCache
+from jinja2.ext import Extension
+from jinja2.lexer import Token, TokenStream
+from jinja2.utils import LRUCache
 
+from configs import funiq_ai_config
 from utils.i18n import NullTranslations, get_current_locale_translator, translation_registry
 
+TEMPLATE_TRANSLATION_DOMAIN = "templates"
+
+
+class PrecompiledTranslationsExtension(Extension):
+    """
+    Resolve constant gettext calls such as ``{{ _("Hello") }}`` at compile time.
+
+    The extension rewrites ``_("literal")`` / ``gettext("literal")`` into a plain string token
+    translated with the translations bound to the environment, so rendering a compiled
+    template no longer calls into the translation machinery. Calls that are not a single
+    string literal are left untouched and fall back to the installed gettext callables.
+    """
+
+    GETTEXT_NAMES = ("_", "gettext")
+
+    def __init__(self, environment: jinja2.Environment):
+        super().__init__(environment)
+        environment.extend(precompiled_translations=NullTranslations())
+
+    def filter_stream(self, stream: TokenStream) -> Iterator[Token]:
+        translations = self.environment.precompiled_translations
+        pending: list[Token] = []
+        previous_type = None
+
+        for token in stream:
+            if not pending:
+                # attribute access such as ``obj._("x")`` is not a gettext call
+                if token.type == "name" and token.value in self.GETTEXT_NAMES and previous_type != "dot":
+                    pending.append(token)
+                else:
+                    yield token
+                previous_type = token.type
+                continue
+
+            pending.append(token)
+            expected = ("name", "lparen", "string", "rparen")[: len(pending)]
+            if tuple(t.type for t in pending) != expected:
+                yield from pending
+                pending = []
+                previous_type = token.type
+            elif len(pending) == len(expected) == 4:
+                yield Token(pending[0].lineno, "string", translations.ugettext(pending[2].value))
+                pending = []
+                previous_type = "string"
+
+        yield from pending
+
+
+class LocaleBytecodeCache(FileSystemBytecodeCache):
+    """
+    Filesystem bytecode cache for templates compiled against one locale's translations.
+
+    Entries are stored per locale, and the checksum covers both the template source and the
+    modification times of the translation catalogs, so editing a template or recompiling a
+    ``.mo`` file invalidates the cached bytecode in every process sharing the directory.
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path], locale_code: str, translations: NullTranslations):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(str(directory), pattern=f"__jinja2_{locale_code}_%s.cache")
+        self.catalog_fingerprint = self._get_catalog_fingerprint(translations)
+
+    @staticmethod
+    def _get_catalog_fingerprint(translations: NullTranslations) -> str:
+        """Build a fingerprint from the catalog files the translations were loaded from."""
+        parts = []
+        for file in sorted(getattr(translations, "files", [])):
+            try:
+                parts.append(f"{file}:{os.stat(file).st_mtime_ns}")
+            except OSError:
+                parts.append(file)
+        return "|".join(parts)
+
+    def get_source_checksum(self, source: str) -> str:
+        return hashlib.sha1(f"{self.catalog_fingerprint}\0{source}".encode(), usedforsecurity=False).hexdigest()
+
 
 class TemplateRenderer:
-    def __init__(self, template_dir: Union[str, pathlib.Path]):
+    def __init__(
+        self,
+        template_dir: Union[str, pathlib.Path],
+        cache_size: int = 128,
+        bytecode_cache_dir: Optional[Union[str, pathlib.Path]] = None,
+    ):
         """
         Initialize the template renderer.
 
         :param template_dir: Path to the directory containing template files.
+        :param cache_size: Maximum number of compiled (locale, template) pairs kept in memory.
+        :param bytecode_cache_dir: Directory for the shared bytecode cache; disabled when None.
         """
-        self.template_dir = pathlib.Path(__file__).resolve().parent.parent / template_dir
-        self.environment = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(self.template_dir),
-            autoescape=True,
-            extensions=["jinja2.ext.i18n"],
-        )
+        base_dir = pathlib.Path(__file__).resolve().parent.parent
+        self.template_dir = base_dir / template_dir
+        self.bytecode_cache_dir = base_dir / bytecode_cache_dir if bytecode_cache_dir else None
+        self.loader = jinja2.FileSystemLoader(self.template_dir)
+        self._environments: dict[str, jinja2.Environment] = {}
+        self._environments_lock = threading.Lock()
+        self._templates = LRUCache(cache_size)
+
+    def _create_environment(self, locale_code: str, translations: NullTranslations) -> jinja2.Environment:
+        """
+        Create a Jinja2 environment bound to a single locale's translations.
 
-        def get_translations():
-            locale_translator = get_current_locale_translator()
+        :param locale_code: Locale code the environment compiles templates for.
+        :param translations: Translations used to resolve gettext calls of this environment.
+        :return: Configured Jinja2 environment.
+        """
+        bytecode_cache = None
+        if self.bytecode_cache_dir:
+            bytecode_cache = LocaleBytecodeCache(self.bytecode_cache_dir, locale_code, translations)
 
-            locale_code = locale_translator.language
-            if locale_translator.territory:
-                locale_code = f"{locale_translator.language}_{locale_translator.territory}"
+        environment = jinja2.Environment(
+            loader=self.loader,
+            autoescape=True,
+            # compiled templates are cached per locale by the renderer itself
+            cache_size=0,
+            bytecode_cache=bytecode_cache,
+            extensions=["jinja2.ext.i18n", PrecompiledTranslationsExtension],
+        )
+        environment.precompiled_translations = translations
+        environment.install_gettext_translations(translations)
+        return environment
 
-            return translation_registry.translations.get("templates", {}).get(locale_code, NullTranslations())
+    def get_environment(self, locale_code: str) -> jinja2.Environment:
+        """
+        Return the Jinja2 environment for a locale, creating it on first use.
 
-        # install translations
-        self.environment.install_gettext_callables(
-            lambda x: get_translations().ugettext(x),
-            lambda s, p, n: get_translations().ungettext(s, p, n),
-        )
+        :param locale_code: Supported locale code (e.g., 'en', 'zh_CN').
+        :return: Jinja2 environment with that locale's translations installed.
+        """
+        environment = self._environments.get(locale_code)
+        if environment is None:
+            with self._environments_lock:
+                environment = self._environments.get(locale_code)
+                if environment is None:
+                    translations = translation_registry.translations.get(TEMPLATE_TRANSLATION_DOMAIN, {}).get(
+                        locale_code, NullTranslations()
+                    )
+                    environment = self._create_environment(locale_code, translations)
+                    self._environments[locale_code] = environment
+        return environment
+
+    def precompile(self, locale_codes: list[str]) -> int:
+        """
+        Compile every template for the given locales, filling the bytecode cache.
 
-    def render(self, template_name: str, **context) -> str:
+        :param locale_codes: Locale codes to compile templates for.
+        :return: Number of compiled (locale, template) pairs.
+        """
+        compiled = 0
+        for locale_code in locale_codes:
+            for template_name in self.loader.list_templates():
+                self._get_template(locale_code, template_name)
+                compiled += 1
+        return compiled
+
+    def clear_cache(self) -> None:
+        """Drop all compiled templates and per-locale environments (e.g., after reloading translations)."""
+        with self._environments_lock:
+            self._environments.clear()
+            self._templates.clear()
+
+    def render(self, template_name: str, locale: Optional[str] = None, **context) -> str:
         """
         Render a template file with the given context.
 
         :param template_name: Name of the template file.
+        :param locale: Locale to render with; defaults to the current context locale.
         :param context: Context variables to be passed to the template.
         :return: Rendered template as a string.
         """
         try:
-            template = _get_template(self, template_name)
+            template = self._get_template(resolve_locale_code(locale), template_name)
             return template.render(**context)
         except jinja2.TemplateError as e:
             raise RuntimeError(f"Error rendering template '{template_name}': {e}") from e
@@ -64,19 +204,50 @@ class TemplateRenderer:
         except jinja2.TemplateError as e:
             raise RuntimeError(f"Error rendering template string: {e}") from e
 
+    def _get_template(self, locale_code: str, template_name: str) -> jinja2.Template:
+        """
+        Load and cache the Jinja2 template compiled for a locale.
 
-@cache
-def _get_template(template_renderer: TemplateRenderer, template_name: str) -> jinja2.Template:
-    """
-    Load and cache the Jinja2 template by name.
+        :param locale_code: Supported locale code.
+        :param template_name: Name of the template file.
+        :return: Compiled Jinja2 template.
+        """
+        key = (locale_code, template_name)
+        template = self._templates.get(key)
+        if template is not None:
+            return template
 
-    :param template_name: Name of the template file.
-    :return: Compiled Jinja2 template.
-    """
-    try:
-        return template_renderer.environment.get_template(template_name)
-    except jinja2.TemplateNotFound as err:
-        raise FileNotFoundError(f"Template '{template_name}' not found in {template_renderer.template_dir}") from err
+        try:
+            template = self.get_environment(locale_code).get_template(template_name)
+        except jinja2.TemplateNotFound as err:
+            raise FileNotFoundError(f"Template '{template_name}' not found in {self.template_dir}") from err
 
+        self._templates[key] = template
+        return template
 
-template_renderer = TemplateRenderer("templates")
+
+def resolve_locale_code(locale: Optional[str] = None) -> str:
+    """
+    Resolve the locale code used to select a compiled template.
+
+    :param locale: Requested locale code; unsupported codes fall back to the default locale.
+    :return: Locale code matching a loaded translation catalog.
+    """
+    if locale is None:
+        locale_translator = get_current_locale_translator()
+        locale = locale_translator.language
+        if locale_translator.territory:
+            locale = f"{locale_translator.language}_{locale_translator.territory}"
+        return locale
+
+    locale = locale.replace("-", "_")
+    if locale not in translation_registry.supported_locales:
+        return translation_registry.default_locale
+    return locale
+
+
+template_renderer = TemplateRenderer(
+    "templates",
+    cache_size=funiq_ai_config.TEMPLATE_CACHE_SIZE,
+    bytecode_cache_dir=funiq_ai_config.TEMPLATE_BYTECODE_CACHE_DIR,
+)
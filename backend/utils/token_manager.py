@@ -5,7 +5,7 @@ from enum import Enum
 from typing import Optional
 
 from configs import funiq_ai_config
-from database import redis
+from database import redis, sync_redis
 
 
 class TokenManager:
@@ -50,6 +50,18 @@ class TokenManager:
             return json.loads(token_data)
         return None
 
+    def get_token_data_sync(self, token: str, namespace: str = 'funiq_ai') -> Optional[dict]:
+        """
+        Retrieve the data associated with a token, from synchronous code such as Celery tasks.
+
+        :param token: Token to fetch data for
+        :return: Token data if valid, else None
+        """
+        token_data = sync_redis.get(self._get_token_key(token, namespace))
+        if token_data:
+            return json.loads(token_data)
+        return None
+
     async def validate_token(self, token: str, namespace: str = 'funiq_ai') -> bool:
         """
         Check if a token is still valid.